@@ -11,6 +11,22 @@ current_dir = Path(__file__).parent
 src_dir = current_dir / "src"
 sys.path.insert(0, str(src_dir))
 
+def _event_loop() -> str:
+    """uvloop si disponible (pas sous Windows), sinon la boucle asyncio par défaut"""
+    try:
+        import uvloop  # noqa: F401
+        return "uvloop"
+    except ImportError:
+        return "auto"
+
+def _http_parser() -> str:
+    """Parseur HTTP httptools si disponible, sinon h11"""
+    try:
+        import httptools  # noqa: F401
+        return "httptools"
+    except ImportError:
+        return "auto"
+
 def main():
     """Lance le serveur FastAPI"""
     
@@ -19,11 +35,16 @@ def main():
     port = int(os.getenv("PORT", 8000))
     reload = os.getenv("DEBUG", "True").lower() == "true"
     log_level = os.getenv("LOG_LEVEL", "info").lower()
+    # Le rechargement automatique impose un seul worker
+    workers = 1 if reload else int(os.getenv("WORKERS", "4"))
+    loop = _event_loop()
+    http = _http_parser()
     
     print(f"🚀 Lancement du backend OrientaBot")
     print(f"   Host: {host}")
     print(f"   Port: {port}")
     print(f"   Reload: {reload}")
+    print(f"   Workers: {workers} (loop: {loop}, http: {http})")
     print(f"   Log Level: {log_level}")
     print(f"   Environment: {os.getenv('ENVIRONMENT', 'development')}")
     
@@ -33,8 +54,12 @@ def main():
         host=host,
         port=port,
         reload=reload,
+        workers=workers,
+        loop=loop,
+        http=http,
         log_level=log_level,
-        access_log=True
+        # Journal d'accès uniquement en développement
+        access_log=reload
     )
 
 if __name__ == "__main__":
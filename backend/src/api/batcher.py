@@ -0,0 +1,174 @@
+"""
+Micro-batchers de l'API OrientaBot
+Regroupent les requêtes arrivées dans une courte fenêtre: les requêtes de chat sont
+exécutées en parallèle, les encodages de requêtes de recherche en un seul appel au modèle
+"""
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ChatBatcher:
+    """
+    File d'attente à fenêtre de regroupement (style DataLoader).
+
+    Chaque requête soumise reçoit un Future; une tâche de fond dépile jusqu'à
+    `max_batch` requêtes par fenêtre de `window_ms` et lance le lot dans sa propre tâche
+    (sur le pool de connexions partagé du client Groq), puis reprend aussitôt la collecte.
+    Chaque Future est résolu dès que sa requête aboutit: une complétion lente ne retarde
+    ni les autres requêtes de son lot, ni les lots suivants.
+    """
+
+    def __init__(self,
+                 process_fn: Callable[..., Dict[str, Any]],
+                 window_ms: int = 20,
+                 max_batch: int = 8):
+        """
+        Args:
+            process_fn: Fonction de traitement, coroutine (ex: SimpleChatHandler.aprocess_message)
+                ou synchrone (exécutée alors dans le threadpool)
+            window_ms: Durée de la fenêtre de regroupement en millisecondes
+            max_batch: Nombre maximum de requêtes par lot
+        """
+        self.process_fn = process_fn
+        self._is_async = asyncio.iscoroutinefunction(process_fn)
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Lots en cours (référence forte: la boucle ne garde que des références faibles)
+        self._dispatches: Set[asyncio.Task] = set()
+
+    async def submit(self, **kwargs) -> Dict[str, Any]:
+        """Soumet une requête et attend son résultat"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((kwargs, future))
+        return await future
+
+    def _ensure_worker(self) -> None:
+        """Démarre la tâche de fond au premier appel (il faut une boucle active)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Nouvelle boucle (tests, rechargement): file et tâche liées à l'ancienne sont inutilisables
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = None
+            self._dispatches = set()
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def _collect_batch(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        """Attend une première requête puis complète le lot jusqu'à la fin de la fenêtre"""
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+
+        while len(batch) < self.max_batch:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _call(self, kwargs: Dict[str, Any]):
+        """Coroutine d'exécution d'une requête du lot"""
+        if self._is_async:
+            return self.process_fn(**kwargs)
+        return asyncio.to_thread(self.process_fn, **kwargs)
+
+    async def _run(self) -> None:
+        """Boucle de collecte: chaque lot part dans sa propre tâche"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]) -> None:
+        """Exécute les requêtes d'un lot en parallèle; chaque Future est résolu dès sa réponse"""
+        await asyncio.gather(*(self._resolve(kwargs, future) for kwargs, future in batch))
+
+        if len(batch) > 1:
+            logger.debug(f"Lot de {len(batch)} requêtes de chat traité")
+
+    async def _resolve(self, kwargs: Dict[str, Any], future: asyncio.Future) -> None:
+        """Exécute une requête et transmet son résultat (ou son exception) à son Future"""
+        try:
+            result = await self._call(kwargs)
+        except asyncio.CancelledError:
+            # Batcher arrêté (close): ne pas laisser l'appelant attendre indéfiniment
+            future.cancel()
+            raise
+        except Exception as e:
+            # Le client a pu se déconnecter entre-temps
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def close(self) -> None:
+        """Arrête la tâche de fond et les lots en cours"""
+        for task in list(self._dispatches):
+            task.cancel()
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+
+class EmbeddingBatcher(ChatBatcher):
+    """
+    Regroupe les textes à encoder: un seul appel `encode_fn(textes)` par lot, soit un
+    produit matriciel (GEMM) au lieu d'autant de produits matrice-vecteur que de requêtes.
+    """
+
+    def __init__(self,
+                 encode_fn: Callable[[List[str]], Any],
+                 window_ms: int = 5,
+                 max_batch: int = 32):
+        """
+        Args:
+            encode_fn: Fonction synchrone textes -> matrice d'embeddings (une ligne par texte),
+                exécutée dans le threadpool
+            window_ms: Durée de la fenêtre de regroupement en millisecondes
+            max_batch: Nombre maximum de textes par lot
+        """
+        super().__init__(encode_fn, window_ms=window_ms, max_batch=max_batch)
+
+    async def submit(self, text: str) -> Any:
+        """Soumet un texte et attend son embedding"""
+        return await super().submit(text=text)
+
+    async def _run(self) -> None:
+        """Boucle d'encodage des lots"""
+        while True:
+            batch = await self._collect_batch()
+            texts = [kwargs["text"] for kwargs, _ in batch]
+            try:
+                vectors = await asyncio.to_thread(self.process_fn, texts)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+            if len(batch) > 1:
+                logger.debug(f"Lot de {len(batch)} requêtes encodé")
@@ -0,0 +1,55 @@
+"""
+Horloge à précision réduite pour les horodatages des réponses API
+Une tâche de fond rafraîchit l'heure courante deux fois par seconde
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+TICK_INTERVAL = 0.5
+
+_now = datetime.now(timezone.utc)
+_now_iso = _now.isoformat()
+_ticker: Optional[asyncio.Task] = None
+
+
+def cached_now() -> datetime:
+    """Heure UTC courante, à la demi-seconde près quand l'horloge tourne"""
+    if _ticker is None or _ticker.done():
+        # Horloge non démarrée (scripts, tests): lecture directe
+        return datetime.now(timezone.utc)
+    return _now
+
+
+def now_iso() -> str:
+    """Horodatage ISO 8601 (UTC) de cached_now, formaté une fois par tick et partagé"""
+    if _ticker is None or _ticker.done():
+        return datetime.now(timezone.utc).isoformat()
+    return _now_iso
+
+
+async def _tick() -> None:
+    global _now, _now_iso
+    while True:
+        _now = datetime.now(timezone.utc)
+        _now_iso = _now.isoformat()
+        await asyncio.sleep(TICK_INTERVAL)
+
+
+def start_clock() -> None:
+    """Démarre la tâche de rafraîchissement dans la boucle courante"""
+    global _ticker
+    if _ticker is None or _ticker.done():
+        _ticker = asyncio.get_running_loop().create_task(_tick())
+
+
+async def stop_clock() -> None:
+    """Arrête la tâche de rafraîchissement"""
+    global _ticker
+    if _ticker is not None:
+        _ticker.cancel()
+        try:
+            await _ticker
+        except asyncio.CancelledError:
+            pass
+        _ticker = None
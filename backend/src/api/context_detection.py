@@ -0,0 +1,96 @@
+"""
+Détection du contexte utilisateur par mots-clés pour l'API OrientaBot
+Automate Aho-Corasick construit une fois (pyahocorasick), regex compilée en repli
+"""
+import re
+from functools import lru_cache
+from typing import Tuple
+
+# Catégories par ordre de priorité et leurs mots-clés (en minuscules)
+CONTEXT_KEYWORDS = {
+    "anxious_student": frozenset({"stress", "anxieux", "peur"}),
+    "parent_pressure": frozenset({"parents", "famille"}),
+    "high_achiever": frozenset({"excellent", "18", "19", "20"}),
+    "uncertain": frozenset({"ne sais pas", "hésit", "confus"}),
+}
+CONTEXT_PRIORITY = tuple(CONTEXT_KEYWORDS)
+
+# Mots-clés qui doivent être des mots entiers (une note "18", pas "2018")
+_WHOLE_WORDS = frozenset({"18", "19", "20"})
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+def _build_automaton():
+    automaton = ahocorasick.Automaton()
+    for category, keywords in CONTEXT_KEYWORDS.items():
+        for keyword in sorted(keywords):
+            automaton.add_word(keyword, (category, keyword))
+    automaton.make_automaton()
+    return automaton
+
+
+def _build_regex() -> re.Pattern:
+    groups = []
+    for category, keywords in CONTEXT_KEYWORDS.items():
+        alternatives = [
+            rf"\b{re.escape(k)}\b" if k in _WHOLE_WORDS else re.escape(k)
+            for k in sorted(keywords, key=lambda k: (-len(k), k))
+        ]
+        groups.append(f"(?P<{category}>{'|'.join(alternatives)})")
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+
+_AUTOMATON = _build_automaton() if ahocorasick is not None else None
+_CONTEXT_RE = _build_regex()
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+# Messages courts et répétés (relances, formules types): résultat mis en cache
+_SCAN_CACHE_MAX_LENGTH = 512
+Hits = Tuple[Tuple[str, str], ...]
+
+
+def scan_context(message: str) -> Hits:
+    """Retourne les couples (catégorie, mot-clé) trouvés dans le message, en une passe"""
+    if len(message) <= _SCAN_CACHE_MAX_LENGTH:
+        return _scan_cached(message)
+    return _scan(message)
+
+
+@lru_cache(maxsize=4096)
+def _scan_cached(message: str) -> Hits:
+    return _scan(message)
+
+
+def _scan(message: str) -> Hits:
+    if _AUTOMATON is None:
+        return tuple((m.lastgroup, m.group(0).lower()) for m in _CONTEXT_RE.finditer(message))
+
+    text = message.lower()
+    hits = []
+    for end, (category, keyword) in _AUTOMATON.iter(text):
+        if keyword in _WHOLE_WORDS:
+            start = end - len(keyword) + 1
+            if (start > 0 and _is_word_char(text[start - 1])) or \
+               (end + 1 < len(text) and _is_word_char(text[end + 1])):
+                continue
+        hits.append((category, keyword))
+    return tuple(hits)
+
+
+def pick_context(hits: Hits) -> str:
+    """Catégorie prioritaire parmi les correspondances, 'general' si aucune"""
+    found = {category for category, _ in hits}
+    return next((c for c in CONTEXT_PRIORITY if c in found), "general")
+
+
+def detect_context(message: str) -> str:
+    """Retourne le contexte prioritaire détecté dans le message"""
+    return pick_context(scan_context(message))
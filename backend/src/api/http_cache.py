@@ -0,0 +1,98 @@
+"""
+Validation HTTP conditionnelle (ETag / If-None-Match) pour les routes de lecture de l'API
+"""
+import gzip
+import hashlib
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from api.json_response import JSON_OPTIONS
+
+DEFAULT_CACHE_CONTROL = "private, max-age=30"
+
+
+def make_etag(*parts: Any) -> str:
+    """ETag à partir de valeurs de version (ex: user_id + updated_at), sans encoder le contenu"""
+    digest = hashlib.blake2b(":".join(map(str, parts)).encode("utf-8"), digest_size=8).hexdigest()
+    return f'"{digest}"'
+
+
+def content_etag(body: bytes) -> str:
+    """ETag d'un contenu déjà encodé (ex: réponse statique calculée à l'import)"""
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def precompress(body: bytes) -> bytes:
+    """Variante gzip d'une réponse statique, compressée une fois à l'import"""
+    return gzip.compress(body, compresslevel=6)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    return "gzip" in request.headers.get("accept-encoding", "")
+
+
+def _matches(request: Request, etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match du client contient cet ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Comparaison faible: W/"x" et "x" désignent la même version
+    candidates = (tag.strip().removeprefix("W/") for tag in header.split(","))
+    return etag in candidates
+
+
+def conditional_response(request: Request,
+                         payload: Any,
+                         etag: Optional[str] = None,
+                         cache_control: str = DEFAULT_CACHE_CONTROL,
+                         gzipped: Optional[bytes] = None) -> Response:
+    """
+    Réponse JSON avec ETag; 304 Not Modified sans corps si le client a déjà cette version.
+
+    Args:
+        request: Requête entrante (lecture de If-None-Match)
+        payload: Contenu JSON (dict, bytes déjà encodés, ou callable sans argument les produisant)
+        etag: ETag précalculé (make_etag); si None, hash du contenu encodé
+        cache_control: Valeur de l'en-tête Cache-Control
+        gzipped: Variante précompressée (precompress) du contenu, envoyée telle quelle aux
+            clients qui acceptent gzip; nécessite un ETag précalculé
+    """
+    if gzipped is not None and etag is not None and _accepts_gzip(request):
+        # Représentation distincte: ETag propre, le middleware GZip la laisse passer
+        headers = {
+            "ETag": f'{etag[:-1]}-gzip"',
+            "Cache-Control": cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if _matches(request, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(
+            content=gzipped,
+            media_type="application/json",
+            headers={**headers, "Content-Encoding": "gzip"}
+        )
+
+    # ETag connu d'avance: 304 possible sans produire ni encoder le contenu
+    if etag is not None and _matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    content = payload() if callable(payload) else payload
+    if isinstance(content, bytes):
+        body = content
+    else:
+        body = orjson.dumps(content, default=str, option=JSON_OPTIONS)
+    if etag is None:
+        etag = content_etag(body)
+        if _matches(request, etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": cache_control}
+    )
@@ -0,0 +1,19 @@
+"""
+Classe de réponse JSON basée sur orjson pour l'API OrientaBot
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+# Options orjson communes aux réponses de l'API: clés non-str et types numpy (scores
+# float32/float64, tableaux) sérialisés nativement, sans conversion Python préalable
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+class ORJSONResponse(JSONResponse):
+    """Réponse JSON sérialisée avec orjson (plus rapide que json de la stdlib)"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=str, option=JSON_OPTIONS)
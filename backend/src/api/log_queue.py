@@ -0,0 +1,64 @@
+"""
+Journalisation hors du chemin des requêtes
+Les handlers du logger racine sont déplacés derrière une file: les coroutines ne font
+qu'un put, l'écriture (stderr, agent de logs) se fait dans un thread d'arrière-plan
+"""
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import List, Optional
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[QueueHandler] = None
+_sinks: List[logging.Handler] = []
+_file_handler: Optional[logging.FileHandler] = None
+
+# Format du fichier LOG_FILE, relu par /api/system/logs (champs séparés par des tabulations)
+LOG_FILE_FORMAT = "%(asctime)s\t%(levelname)s\t%(name)s\t%(message)s"
+
+
+def start_log_listener() -> None:
+    """Remplace les handlers du logger racine par un QueueHandler et démarre le listener"""
+    global _listener, _queue_handler, _sinks, _file_handler
+    if _listener is not None:
+        return
+
+    root = logging.getLogger()
+    _sinks = list(root.handlers) or [logging.StreamHandler()]
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+    log_file = os.getenv("LOG_FILE")
+    if log_file:
+        _file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        _file_handler.setFormatter(logging.Formatter(LOG_FILE_FORMAT))
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    _queue_handler = QueueHandler(log_queue)
+    root.addHandler(_queue_handler)
+
+    # respect_handler_level: chaque sortie garde son propre niveau de filtrage
+    handlers = _sinks + [_file_handler] if _file_handler is not None else _sinks
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def stop_log_listener() -> None:
+    """Vide la file, arrête le listener et rétablit les handlers d'origine"""
+    global _listener, _queue_handler, _sinks, _file_handler
+    if _listener is None:
+        return
+
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    _listener.stop()
+    if _file_handler is not None:
+        _file_handler.close()
+        _file_handler = None
+    for handler in _sinks:
+        root.addHandler(handler)
+
+    _listener = None
+    _queue_handler = None
+    _sinks = []
@@ -3,31 +3,67 @@ FastAPI backend pour OrientaBot - API de conseil d'orientation
 """
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import Response
 import logging
+import orjson
+from contextlib import asynccontextmanager
 
+from api.clock import start_clock, stop_clock
+from core.http import open_shared_http_clients, close_shared_http_clients
+from api.log_queue import start_log_listener, stop_log_listener
+from api.json_response import ORJSONResponse
 from api.routes import chat, profile, search, system
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Démarrage/arrêt: journalisation via file d'attente, horloge partagée des horodatages
+    de réponse, pools de connexions HTTP partagés, échantillonnage CPU et gestionnaire de chat
+    créés une fois puis fermés proprement
+    """
+    start_log_listener()
+    start_clock()
+    open_shared_http_clients()
+    system.start_cpu_sampler()
+    await chat.initialize_chat_handlers()
+    yield
+    await chat.shutdown_chat_handlers()
+    await close_shared_http_clients()
+    await system.stop_cpu_sampler()
+    await stop_clock()
+    stop_log_listener()
+
 # Création de l'application FastAPI
 app = FastAPI(
     title="OrientaBot API",
     description="API de conseil d'orientation académique pour le Maroc",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configuration CORS pour permettre les connexions depuis le frontend
+# frozenset: test d'appartenance en O(1) pour chaque requête cross-origin
+ALLOWED_ORIGINS = frozenset({"http://localhost:8501", "http://localhost:3000"})  # Ports Streamlit et React
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:8501", "http://localhost:3000"],  # Ports Streamlit et React
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    max_age=86400,  # Les navigateurs gardent le preflight en cache 24h
 )
 
+# Compression des réponses JSON volumineuses (/search, /sources, /logs, /stats); les flux SSE
+# et les réponses déjà compressées (/config, /models précompressés) ne sont pas retouchés
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
 # Inclusion des routes
 app.include_router(chat.router, prefix="/api/chat", tags=["chat"])
 app.include_router(profile.router, prefix="/api/profile", tags=["profile"])
@@ -37,33 +73,28 @@ app.include_router(system.router, prefix="/api/system", tags=["system"])
 # Route pour compatibilité OpenAI API (éviter les 404)
 app.include_router(system.router, prefix="/v1", tags=["openai-compatibility"])
 
+# Réponses constantes sérialisées une seule fois au démarrage
+_ROOT_BYTES = orjson.dumps({
+    "message": "OrientaBot API - Conseiller d'orientation Maroc",
+    "version": "1.0.0",
+    "status": "running"
+})
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "message": "API opérationnelle"
+})
+
 @app.get("/")
 async def root():
     """Point d'entrée racine de l'API"""
-    return {
-        "message": "OrientaBot API - Conseiller d'orientation Maroc",
-        "version": "1.0.0",
-        "status": "running"
-    }
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 @app.get("/health")
 async def health_check():
     """Vérification de l'état de l'API"""
-    try:
-        # Ici on peut ajouter des vérifications de santé (base de données, services externes, etc.)
-        return {
-            "status": "healthy",
-            "message": "API opérationnelle"
-        }
-    except Exception as e:
-        logger.error(f"Erreur lors du health check: {e}")
-        return JSONResponse(
-            status_code=503,
-            content={
-                "status": "unhealthy", 
-                "message": f"Erreur: {str(e)}"
-            }
-        )
+    # Ici on peut ajouter des vérifications de santé (base de données, services externes, etc.)
+    # en renvoyant un statut 503 en cas d'échec
+    return Response(content=_HEALTH_BYTES, media_type="application/json")
 
 if __name__ == "__main__":
     import uvicorn
@@ -1,18 +1,21 @@
 """
 Modèles Pydantic pour les requêtes API
 """
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, List, Any
+from pydantic import BaseModel, Field, SkipValidation, StringConstraints
+from typing import Annotated, Optional, Dict, List, Any, Literal
 from datetime import datetime
 
 class ChatRequest(BaseModel):
     """Modèle pour les requêtes de chat"""
     message: str = Field(..., description="Message de l'utilisateur")
     session_id: Optional[str] = Field(None, description="ID de session pour le suivi")
-    user_profile: Optional[Dict[str, Any]] = Field(None, description="Profil utilisateur")
+    # Dictionnaires transmis tels quels à la logique métier: pas de parcours de validation
+    user_profile: Optional[SkipValidation[Dict[str, Any]]] = Field(None, description="Profil utilisateur")
     temperature: float = Field(0.7, ge=0.0, le=2.0, description="Température du modèle")
     stream: bool = Field(False, description="Streaming de la réponse")
-    conversation_history: Optional[List[Dict[str, str]]] = Field([], description="Historique de conversation")
+    conversation_history: Optional[List[Dict[str, str]]] = Field(default_factory=list, description="Historique de conversation")
+    max_tokens: Optional[int] = Field(None, ge=1, le=4096, description="Nombre maximum de tokens générés")
+    tier: Optional[Literal["instant", "balanced"]] = Field(None, description="Niveau de modèle: 'instant' ou 'balanced' (choisi automatiquement si absent)")
     
 class UserProfileRequest(BaseModel):
     """Modèle pour les requêtes de profil utilisateur"""
@@ -21,15 +24,16 @@ class UserProfileRequest(BaseModel):
     filiere: Optional[str] = Field(None, description="Filière d'études")
     niveau_scolaire: Optional[str] = Field(None, description="Niveau scolaire")
     ville: Optional[str] = Field(None, description="Ville de résidence")
-    interets: Optional[List[str]] = Field([], description="Centres d'intérêt")
-    competences: Optional[List[str]] = Field([], description="Compétences")
+    interets: Optional[List[str]] = Field(default_factory=list, description="Centres d'intérêt")
+    competences: Optional[List[str]] = Field(default_factory=list, description="Compétences")
     resultats_academiques: Optional[Dict[str, Any]] = Field(None, description="Résultats académiques")
-    contraintes: Optional[List[str]] = Field([], description="Contraintes")
-    objectifs: Optional[List[str]] = Field([], description="Objectifs")
+    contraintes: Optional[List[str]] = Field(default_factory=list, description="Contraintes")
+    objectifs: Optional[List[str]] = Field(default_factory=list, description="Objectifs")
     
 class SearchRequest(BaseModel):
     """Modèle pour les requêtes de recherche RAG"""
-    query: str = Field(..., description="Requête de recherche")
+    # Espaces retirés et requête vide rejetée (422) par pydantic-core, avant la route
+    query: Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)] = Field(..., description="Requête de recherche")
     mode: str = Field("hybrid", description="Mode de recherche: 'semantic', 'keyword', ou 'hybrid'")
     max_results: int = Field(5, ge=1, le=20, description="Nombre maximum de résultats")
     min_score: float = Field(0.0, ge=0.0, le=1.0, description="Score minimum pour filtrer les résultats")
@@ -39,7 +43,7 @@ class SessionRequest(BaseModel):
     """Modèle pour les requêtes de session"""
     session_id: str = Field(..., description="ID de session")
     action: str = Field(..., description="Action: 'create', 'get', 'update', 'delete'")
-    data: Optional[Dict[str, Any]] = Field(None, description="Données de session")
+    data: Optional[SkipValidation[Dict[str, Any]]] = Field(None, description="Données de session")
 
 class SystemStatsRequest(BaseModel):
     """Modèle pour les requêtes de statistiques système"""
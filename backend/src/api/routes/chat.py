@@ -1,13 +1,15 @@
 """
 Routes API pour la gestion des conversations de chat
 """
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
+from sse_starlette.sse import EventSourceResponse
 import asyncio
-import json
-import time
+import orjson
+import os
+from time import perf_counter
+from uuid import uuid4
 import logging
-from typing import Dict, Any, AsyncGenerator
+from typing import Dict, Any, AsyncGenerator, Optional
 
 from api.models import (
     ChatRequest, 
@@ -17,33 +19,94 @@ from api.models import (
 )
 
 # Importation du module backend simplifié
-from api.simple_chat_handler import SimpleChatHandler
+from api.simple_chat_handler import SimpleChatHandler, get_handler
+from api.batcher import ChatBatcher
+from api.json_response import JSON_OPTIONS, ORJSONResponse
+from api.http_cache import conditional_response, make_etag
+from api.context_detection import CONTEXT_PRIORITY, detect_context, pick_context, scan_context
+from core.config import SPEED_MAP
+from core.session_memory import SessionMemory
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-# Instance globale du gestionnaire
+# Les approches suggérées ne dépendent que du contexte: 5 valeurs possibles, construites une fois
+_SUGGESTED_APPROACHES = {
+    context: f"Approche adaptée pour {context}"
+    for context in ("general", *CONTEXT_PRIORITY)
+}
+
+# Routage par niveau: messages courts de réassurance/hésitation, ou premières questions
+# courtes sans historique à exploiter -> modèle rapide
+_INSTANT_CONTEXTS = frozenset({"anxious_student", "uncertain"})
+_INSTANT_MAX_LENGTH = 120
+_INSTANT_FIRST_TURN_MAX_LENGTH = 200
+_INSTANT_MAX_HISTORY = 2
+
+def select_model(request: ChatRequest) -> str:
+    """Choisit le modèle Groq selon le niveau demandé ou, à défaut, la complexité de l'échange"""
+    tier = request.tier
+    if tier is None:
+        length = len(request.message)
+        fresh = len(request.conversation_history or ()) < _INSTANT_MAX_HISTORY
+        if fresh and length < _INSTANT_FIRST_TURN_MAX_LENGTH:
+            tier = "instant"
+        elif length < _INSTANT_MAX_LENGTH and detect_context(request.message) in _INSTANT_CONTEXTS:
+            tier = "instant"
+        else:
+            tier = "balanced"
+    return SPEED_MAP[tier]
+
+# Instances globales du gestionnaire, du micro-batcher et de la mémoire des sessions
 chat_handler = None
+chat_batcher = None
+session_memory = None
 
-def get_or_create_chat_handler():
-    """Récupère ou crée l'instance du chat handler"""
+# Une seule création du gestionnaire même si plusieurs premières requêtes arrivent ensemble
+_handler_lock = asyncio.Lock()
+
+async def get_or_create_chat_handler() -> SimpleChatHandler:
+    """Récupère ou crée l'instance du chat handler (normalement créée au démarrage)"""
     global chat_handler
-    if chat_handler is None:
-        try:
-            chat_handler = SimpleChatHandler()
-            logger.info("✅ Simple chat handler initialisé")
-        except Exception as e:
-            logger.error(f"❌ Erreur lors de l'initialisation du chat handler: {e}")
-            raise
+    if chat_handler is not None:
+        return chat_handler
+    async with _handler_lock:
+        if chat_handler is None:
+            try:
+                # Chargement du modèle d'embeddings et du cache: hors de la boucle d'événements
+                chat_handler = await asyncio.to_thread(get_handler)
+                logger.info("✅ Simple chat handler initialisé")
+            except Exception as e:
+                logger.error(f"❌ Erreur lors de l'initialisation du chat handler: {e}")
+                raise
     return chat_handler
 
+async def get_or_create_chat_batcher() -> ChatBatcher:
+    """Récupère ou crée le micro-batcher partagé des requêtes non streamées"""
+    global chat_batcher
+    if chat_batcher is None:
+        handler = await get_or_create_chat_handler()
+        if chat_batcher is None:
+            chat_batcher = ChatBatcher(handler.aprocess_message)
+    return chat_batcher
+
+def get_or_create_session_memory() -> SessionMemory:
+    """Récupère ou crée la mémoire des sessions (L2/L3 dans le dossier de cache, partagés entre workers)"""
+    global session_memory
+    if session_memory is None:
+        session_memory = SessionMemory(
+            directory=os.path.join(os.getenv("CACHE_DIR", "./.orientabot_cache"), "sessions"),
+            ttl=int(os.getenv("SESSION_TTL", "604800"))
+        )
+    return session_memory
+
 @router.post("/message", response_model=ChatResponse)
-async def send_message(request: ChatRequest):
+async def send_message(request: ChatRequest, background_tasks: BackgroundTasks):
     """
     Envoie un message au chatbot et récupère la réponse
     """
     try:
-        start_time = time.time()
+        start_time = perf_counter()
         
         # Validation de la requête
         if not request.message.strip():
@@ -53,18 +116,29 @@ async def send_message(request: ChatRequest):
             )
         
         # Utiliser le chat handler simple
-        session_id = request.session_id or f"session_{int(time.time())}"
+        session_id = request.session_id or uuid4().hex
         
-        # Récupérer le chat handler
-        handler = get_or_create_chat_handler()
+        query = {
+            "message": request.message,
+            "conversation_history": request.conversation_history or [],
+            "temperature": request.temperature,
+            "session_id": session_id,
+            "user_profile": request.user_profile,
+            "model": select_model(request),
+            "max_tokens": request.max_tokens
+        }
         
-        # Traiter le message
-        result = handler.process_message(
-            message=request.message,
-            conversation_history=request.conversation_history or [],
-            temperature=request.temperature,
-            session_id=session_id
-        )
+        # Cache sémantique avant tout appel LLM (l'encodage tourne hors de la boucle)
+        handler = await get_or_create_chat_handler()
+        result = await asyncio.to_thread(handler.lookup_cached, **query)
+        if result is None:
+            # Traiter le message (regroupé avec les requêtes simultanées), mise en cache après l'envoi
+            batcher = await get_or_create_chat_batcher()
+            result = await batcher.submit(
+                **query,
+                check_cache=False,
+                defer=background_tasks.add_task
+            )
         
         if result["status"] == "error":
             raise HTTPException(
@@ -72,6 +146,8 @@ async def send_message(request: ChatRequest):
                 detail=f"Erreur du chat handler: {result.get('error', 'Erreur inconnue')}"
             )
         
+        background_tasks.add_task(get_or_create_session_memory().record_turn, session_id, request.message, result["response"])
+        
         # Préparer la réponse API
         api_response = {
             "status": StatusEnum.SUCCESS,
@@ -79,10 +155,11 @@ async def send_message(request: ChatRequest):
             "session_id": session_id,
             "recommendations": result.get("recommendations"),
             "context_used": [],  # Simple handler doesn't use RAG yet
-            "processing_time": time.time() - start_time
+            "processing_time": perf_counter() - start_time
         }
         
-        return ChatResponse(**api_response)
+        # Données construites par le serveur: pas de revalidation Pydantic ni de jsonable_encoder
+        return ORJSONResponse(ChatResponse.model_construct(**api_response).model_dump())
         
     except HTTPException:
         raise
@@ -93,69 +170,81 @@ async def send_message(request: ChatRequest):
             detail=f"Erreur interne: {str(e)}"
         )
 
+def _sse_frame(event: bytes, payload: Dict[str, Any]) -> bytes:
+    """Événement SSE complet, déjà encodé (transmis tel quel par EventSourceResponse)"""
+    return b"event: " + event + b"\r\ndata: " + orjson.dumps(payload, default=str, option=JSON_OPTIONS) + b"\r\n\r\n"
+
 @router.post("/stream")
-async def stream_message(request: ChatRequest):
+async def stream_message(request: ChatRequest, background_tasks: BackgroundTasks):
     """
-    Envoie un message et stream la réponse en temps réel
+    Envoie un message et stream la réponse en temps réel (Server-Sent Events)
     """
-    async def generate_response() -> AsyncGenerator[str, None]:
+    async def generate_response() -> AsyncGenerator[bytes, None]:
         try:
-            session_id = request.session_id or f"session_{int(time.time())}"
+            session_id = request.session_id or uuid4().hex
             
             # Récupérer le chat handler
-            handler = get_or_create_chat_handler()
+            handler = await get_or_create_chat_handler()
+            collected = []
+            # Préfixe SSE encodé une seule fois: chaque fragment (deltas regroupés par le handler)
+            # ne coûte qu'un orjson.dumps + concaténation
+            token_prefix = b'event: token\r\ndata: {"session_id":' + orjson.dumps(session_id) + b',"content":'
             
-            # Streamer la réponse
-            for chunk in handler.stream_message(
+            # Streamer la réponse (flux Groq asynchrone), la mise en cache est faite après l'envoi.
+            # Si le client se déconnecte, EventSourceResponse annule ce générateur et le flux Groq avec lui.
+            async for chunk in handler.astream_message(
                 message=request.message,
                 conversation_history=request.conversation_history or [],
                 temperature=request.temperature,
-                session_id=session_id
+                session_id=session_id,
+                user_profile=request.user_profile,
+                model=select_model(request),
+                max_tokens=request.max_tokens,
+                defer=background_tasks.add_task
             ):
-                yield f"data: {json.dumps({'content': chunk, 'session_id': session_id})}\n\n"
+                collected.append(chunk)
+                yield token_prefix + orjson.dumps(chunk) + b"}\r\n\r\n"
+            
+            background_tasks.add_task(get_or_create_session_memory().record_turn, session_id, request.message, "".join(collected))
                 
-            yield f"data: {json.dumps({'done': True, 'session_id': session_id})}\n\n"
+            yield _sse_frame(b"done", {"done": True, "session_id": session_id})
             
         except Exception as e:
             logger.error(f"Erreur lors du streaming: {e}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
+            yield _sse_frame(b"error", {"error": str(e)})
     
-    return StreamingResponse(
+    # Ping toutes les 15s pour que les proxies ne coupent pas les longues générations
+    return EventSourceResponse(
         generate_response(),
-        media_type="text/plain",
+        ping=15,
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
-            "Content-Type": "text/event-stream"
+            # Désactive la mise en tampon de Nginx pour que chaque token parte immédiatement
+            "X-Accel-Buffering": "no"
         }
     )
 
 @router.get("/history/{session_id}")
-async def get_chat_history(session_id: str):
+async def get_chat_history(request: Request, session_id: str, budget_tokens: Optional[int] = Query(None, ge=1)):
     """
     Récupère l'historique de conversation pour une session
+    (messages récents; les plus anciens sont signalés par archived_messages)
     """
     try:
-        # TODO: Implémenter avec le vrai système de mémoire
-        mock_history = {
-            "session_id": session_id,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "Bonjour, je cherche une orientation",
-                    "timestamp": "2024-01-01T10:00:00"
-                },
-                {
-                    "role": "assistant", 
-                    "content": "Bonjour ! Je suis ravi de vous aider...",
-                    "timestamp": "2024-01-01T10:00:05"
-                }
-            ],
-            "created_at": "2024-01-01T10:00:00",
-            "last_activity": "2024-01-01T10:00:05"
-        }
-        
-        return mock_history
+        history = await asyncio.to_thread(get_or_create_session_memory().get, session_id, budget_tokens)
+        if history is None:
+            history = {
+                "session_id": session_id,
+                "messages": [],
+                "created_at": None,
+                "last_activity": None,
+                "archived_messages": 0
+            }
+        # last_activity change à chaque message: version de la session sans hacher son contenu
+        etag = make_etag(session_id, history["last_activity"], len(history["messages"]),
+                         history["archived_messages"], budget_tokens)
+        return conditional_response(request, history, etag=etag)
         
     except Exception as e:
         logger.error(f"Erreur lors de la récupération de l'historique: {e}")
@@ -164,13 +253,33 @@ async def get_chat_history(session_id: str):
             detail=f"Erreur lors de la récupération de l'historique: {str(e)}"
         )
 
+@router.get("/history/{session_id}/expand")
+async def expand_chat_history(session_id: str, turn: int = Query(0, ge=0), count: Optional[int] = Query(None, ge=1)):
+    """
+    Réhydrate les messages archivés d'une session à partir du message `turn`
+    """
+    try:
+        messages = await asyncio.to_thread(get_or_create_session_memory().expand, session_id, turn, count)
+        return {
+            "session_id": session_id,
+            "start": turn,
+            "messages": messages
+        }
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la réhydratation de l'historique: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Erreur lors de la réhydratation de l'historique: {str(e)}"
+        )
+
 @router.delete("/history/{session_id}")
 async def clear_chat_history(session_id: str):
     """
     Efface l'historique de conversation pour une session
     """
     try:
-        # TODO: Implémenter avec le vrai système de mémoire
+        await asyncio.to_thread(get_or_create_session_memory().clear, session_id)
         return {
             "status": "success",
             "message": f"Historique de la session {session_id} effacé"
@@ -191,24 +300,15 @@ async def analyze_user_context(request: ChatRequest):
     try:
         # TODO: Implémenter l'analyse contextuelle réelle
         
-        # Simulation de détection de contexte
-        message_lower = request.message.lower()
-        
-        context = "general"
-        if any(word in message_lower for word in ["stress", "anxieux", "peur"]):
-            context = "anxious_student"
-        elif any(word in message_lower for word in ["parents", "famille"]):
-            context = "parent_pressure"
-        elif any(word in message_lower for word in ["excellent", "18", "19", "20"]):
-            context = "high_achiever"
-        elif any(word in message_lower for word in ["ne sais pas", "hésit", "confus"]):
-            context = "uncertain"
+        # Détection de contexte en une passe
+        hits = scan_context(request.message)
+        context = pick_context(hits)
             
         return {
             "context_detected": context,
             "confidence": 0.85,
-            "suggested_approach": f"Approche adaptée pour {context}",
-            "keywords_found": ["exemple", "mots-clés"]
+            "suggested_approach": _SUGGESTED_APPROACHES[context],
+            "keywords_found": sorted({keyword for _, keyword in hits})
         }
         
     except Exception as e:
@@ -221,14 +321,24 @@ async def analyze_user_context(request: ChatRequest):
 # Fonction d'initialisation pour les gestionnaires de chat
 async def initialize_chat_handlers():
     """
-    Initialize les gestionnaires de chat
+    Initialize les gestionnaires de chat au démarrage, avant le premier trafic
     """
-    global chat_handler
-    
     try:
-        chat_handler = get_or_create_chat_handler()
+        await get_or_create_chat_handler()
+        await get_or_create_chat_batcher()
         logger.info("✅ Gestionnaires de chat initialisés avec succès")
         
     except Exception as e:
         logger.error(f"❌ Erreur lors de l'initialisation des gestionnaires: {e}")
-        raise
\ No newline at end of file
+        raise
+
+async def shutdown_chat_handlers():
+    """
+    Arrête le micro-batcher (les pools de connexions sont fermés par le lifespan)
+    """
+    global chat_handler, chat_batcher
+    
+    if chat_batcher is not None:
+        await chat_batcher.close()
+    chat_batcher = None
+    chat_handler = None
\ No newline at end of file
@@ -1,56 +1,150 @@
 """
 Routes API pour la gestion des profils utilisateurs
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 import time
+import hashlib
 import logging
+import os
+from datetime import datetime
 from typing import Dict, Any
 
+import orjson
+
 from api.models import (
     UserProfileRequest,
     UserProfileResponse,
     StatusEnum
 )
+from api.http_cache import conditional_response, make_etag
+from api.json_response import ORJSONResponse
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Dates des profils fictifs, déjà typées pour construire les réponses sans validation
+_MOCK_CREATED_AT = datetime(2024, 1, 1, 9, 0)
+_MOCK_UPDATED_AT = datetime(2024, 1, 1, 10, 0)
+
+# Réponses fictives (phase de démo): gabarits construits et encodés une seule fois à l'import.
+# Par requête, seul l'identifiant est substitué dans les bytes (aucun dict, validation ni encodage).
+# PROFILE_STATIC_MOCKS=false repasse par les modèles Pydantic (une fois la base branchée).
+PROFILE_STATIC_MOCKS = os.getenv("PROFILE_STATIC_MOCKS", "True").lower() == "true"
+_UID_PLACEHOLDER = "__UID__"
+
+_MOCK_PROFILE = {
+    "status": StatusEnum.SUCCESS,
+    "user_id": _UID_PLACEHOLDER,
+    "profile_data": {
+        "nom": "Utilisateur Test",
+        "filiere": "Sciences Mathématiques",
+        "niveau_scolaire": "Terminale",
+        "ville": "Casablanca",
+        "interets": ["Informatique", "Mathématiques", "Innovation"],
+        "competences": ["Programmation", "Analyse", "Résolution de problèmes"],
+        "resultats_academiques": {
+            "moyenne_generale": 16.5,
+            "matieres_fortes": ["Mathématiques", "Physique"],
+            "matieres_faibles": ["Littérature"]
+        },
+        "contraintes": ["Budget limité", "Rester au Maroc"],
+        "objectifs": ["Devenir ingénieur", "Travailler dans la tech"]
+    },
+    "nombre_conversations": 5,
+    "derniere_activite": _MOCK_UPDATED_AT,
+    "preferences": {
+        "langue": "français",
+        "niveau_detail": "détaillé"
+    },
+    "created_at": _MOCK_CREATED_AT,
+    "updated_at": _MOCK_UPDATED_AT
+}
+
+_MOCK_RECOMMENDATIONS = {
+    "user_id": _UID_PLACEHOLDER,
+    "ecoles_recommandees": [
+        {
+            "nom": "ENSA El Jadida",
+            "score": 0.92,
+            "raisons": ["Excellence en génie", "Proximité géographique"],
+            "programmes": ["Génie Informatique", "Génie Civil"]
+        },
+        {
+            "nom": "EMSI Casablanca", 
+            "score": 0.88,
+            "raisons": ["Focus tech", "Partenariats entreprises"],
+            "programmes": ["Informatique", "Réseaux"]
+        }
+    ],
+    "filieres_adaptees": [
+        {
+            "nom": "Génie Informatique",
+            "compatibilite": 0.95,
+            "debouches": ["Développeur", "Ingénieur logiciel", "Data Scientist"]
+        },
+        {
+            "nom": "Génie Civil",
+            "compatibilite": 0.78,
+            "debouches": ["Ingénieur BTP", "Chef de projet", "Bureau d'études"]
+        }
+    ],
+    "conseils_personnalises": [
+        "Renforcez vos compétences en programmation",
+        "Explorez les stages en entreprise",
+        "Participez à des projets open source"
+    ]
+}
+
+_MOCK_STATS = {
+    "user_id": _UID_PLACEHOLDER,
+    "nombre_conversations": 12,
+    "temps_total_utilisation": 180,  # en minutes
+    "sujets_abordes": [
+        "Orientation post-bac",
+        "Écoles d'ingénieurs", 
+        "Filières informatiques"
+    ],
+    "progression": {
+        "clarification_objectifs": 0.85,
+        "connaissance_options": 0.70,
+        "preparation_candidatures": 0.30
+    },
+    "derniere_activite": "2024-01-01T10:00:00",
+    "engagement_score": 0.78
+}
+
+_PROFILE_BYTES = orjson.dumps(UserProfileResponse.model_construct(**_MOCK_PROFILE).model_dump())
+_RECOMMENDATIONS_BYTES = orjson.dumps(_MOCK_RECOMMENDATIONS)
+_STATS_BYTES = orjson.dumps(_MOCK_STATS)
+# Version des recommandations: hash du gabarit calculé une fois, pas à chaque requête
+_RECOMMENDATIONS_VERSION = hashlib.blake2b(_RECOMMENDATIONS_BYTES, digest_size=8).hexdigest()
+
+def _with_user(template: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """Copie d'un gabarit avec le vrai identifiant utilisateur"""
+    return {**template, "user_id": user_id}
+
+def _render(template: bytes, user_id: str) -> bytes:
+    """Substitue l'identifiant (échappé JSON) dans un gabarit préencodé"""
+    return template.replace(_UID_PLACEHOLDER.encode(), orjson.dumps(user_id)[1:-1])
+
 @router.get("/{user_id}", response_model=UserProfileResponse)
-async def get_user_profile(user_id: str):
+async def get_user_profile(user_id: str, request: Request):
     """
     Récupère le profil d'un utilisateur
     """
     try:
         # TODO: Remplacer par la vraie logique une fois les modules déplacés
-        mock_profile = {
-            "status": StatusEnum.SUCCESS,
-            "user_id": user_id,
-            "profile_data": {
-                "nom": "Utilisateur Test",
-                "filiere": "Sciences Mathématiques",
-                "niveau_scolaire": "Terminale",
-                "ville": "Casablanca",
-                "interets": ["Informatique", "Mathématiques", "Innovation"],
-                "competences": ["Programmation", "Analyse", "Résolution de problèmes"],
-                "resultats_academiques": {
-                    "moyenne_generale": 16.5,
-                    "matieres_fortes": ["Mathématiques", "Physique"],
-                    "matieres_faibles": ["Littérature"]
-                },
-                "contraintes": ["Budget limité", "Rester au Maroc"],
-                "objectifs": ["Devenir ingénieur", "Travailler dans la tech"]
-            },
-            "nombre_conversations": 5,
-            "derniere_activite": "2024-01-01T10:00:00",
-            "preferences": {
-                "langue": "français",
-                "niveau_detail": "détaillé"
-            },
-            "created_at": "2024-01-01T09:00:00",
-            "updated_at": "2024-01-01T10:00:00"
-        }
+        if PROFILE_STATIC_MOCKS:
+            payload = lambda: _render(_PROFILE_BYTES, user_id)
+        else:
+            payload = lambda: UserProfileResponse(**_with_user(_MOCK_PROFILE, user_id)).model_dump(mode="json")
         
-        return UserProfileResponse(**mock_profile)
+        # Version du profil = updated_at: le 304 ne nécessite ni validation ni encodage
+        return conditional_response(
+            request,
+            payload,
+            etag=make_etag(user_id, _MOCK_PROFILE["updated_at"])
+        )
         
     except Exception as e:
         logger.error(f"Erreur lors de la récupération du profil: {e}")
@@ -70,16 +164,17 @@ async def update_user_profile(user_id: str, request: UserProfileRequest):
         updated_profile = {
             "status": StatusEnum.SUCCESS,
             "user_id": user_id,
-            "profile_data": request.dict(exclude_unset=True),
+            "profile_data": request.model_dump(exclude_unset=True),
             "nombre_conversations": 1,
-            "derniere_activite": "2024-01-01T10:00:00",
+            "derniere_activite": _MOCK_UPDATED_AT,
             "preferences": {},
-            "created_at": "2024-01-01T10:00:00", 
-            "updated_at": "2024-01-01T10:00:00"
+            "created_at": _MOCK_UPDATED_AT,
+            "updated_at": _MOCK_UPDATED_AT
         }
         
         logger.info(f"Profil mis à jour pour l'utilisateur {user_id}")
-        return UserProfileResponse(**updated_profile)
+        # Profil construit par le serveur à partir d'une requête déjà validée
+        return ORJSONResponse(UserProfileResponse.model_construct(**updated_profile).model_dump())
         
     except Exception as e:
         logger.error(f"Erreur lors de la mise à jour du profil: {e}")
@@ -110,49 +205,18 @@ async def delete_user_profile(user_id: str):
         )
 
 @router.get("/{user_id}/recommendations")
-async def get_user_recommendations(user_id: str):
+async def get_user_recommendations(user_id: str, request: Request):
     """
     Génère des recommandations personnalisées pour un utilisateur
     """
     try:
         # TODO: Implémenter le système de recommandations
+        if PROFILE_STATIC_MOCKS:
+            payload = lambda: _render(_RECOMMENDATIONS_BYTES, user_id)
+        else:
+            payload = lambda: _with_user(_MOCK_RECOMMENDATIONS, user_id)
         
-        mock_recommendations = {
-            "user_id": user_id,
-            "ecoles_recommandees": [
-                {
-                    "nom": "ENSA El Jadida",
-                    "score": 0.92,
-                    "raisons": ["Excellence en génie", "Proximité géographique"],
-                    "programmes": ["Génie Informatique", "Génie Civil"]
-                },
-                {
-                    "nom": "EMSI Casablanca", 
-                    "score": 0.88,
-                    "raisons": ["Focus tech", "Partenariats entreprises"],
-                    "programmes": ["Informatique", "Réseaux"]
-                }
-            ],
-            "filieres_adaptees": [
-                {
-                    "nom": "Génie Informatique",
-                    "compatibilite": 0.95,
-                    "debouches": ["Développeur", "Ingénieur logiciel", "Data Scientist"]
-                },
-                {
-                    "nom": "Génie Civil",
-                    "compatibilite": 0.78,
-                    "debouches": ["Ingénieur BTP", "Chef de projet", "Bureau d'études"]
-                }
-            ],
-            "conseils_personnalises": [
-                "Renforcez vos compétences en programmation",
-                "Explorez les stages en entreprise",
-                "Participez à des projets open source"
-            ]
-        }
-        
-        return mock_recommendations
+        return conditional_response(request, payload, etag=make_etag(user_id, _RECOMMENDATIONS_VERSION))
         
     except Exception as e:
         logger.error(f"Erreur lors de la génération des recommandations: {e}")
@@ -162,30 +226,21 @@ async def get_user_recommendations(user_id: str):
         )
 
 @router.get("/{user_id}/stats")
-async def get_user_stats(user_id: str):
+async def get_user_stats(user_id: str, request: Request):
     """
     Récupère les statistiques d'utilisation d'un utilisateur
     """
     try:
-        mock_stats = {
-            "user_id": user_id,
-            "nombre_conversations": 12,
-            "temps_total_utilisation": 180,  # en minutes
-            "sujets_abordes": [
-                "Orientation post-bac",
-                "Écoles d'ingénieurs", 
-                "Filières informatiques"
-            ],
-            "progression": {
-                "clarification_objectifs": 0.85,
-                "connaissance_options": 0.70,
-                "preparation_candidatures": 0.30
-            },
-            "derniere_activite": "2024-01-01T10:00:00",
-            "engagement_score": 0.78
-        }
+        if PROFILE_STATIC_MOCKS:
+            payload = lambda: _render(_STATS_BYTES, user_id)
+        else:
+            payload = lambda: _with_user(_MOCK_STATS, user_id)
         
-        return mock_stats
+        return conditional_response(
+            request,
+            payload,
+            etag=make_etag(user_id, _MOCK_STATS["derniere_activite"], _MOCK_STATS["nombre_conversations"])
+        )
         
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des stats: {e}")
@@ -1,10 +1,18 @@
 """
 Routes API pour le système de recherche RAG
 """
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Query
+from fastapi.responses import Response
+import asyncio
 import time
 import logging
-from typing import List, Optional
+import os
+import re
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+import orjson
 
 from api.models import (
     SearchRequest,
@@ -12,90 +20,195 @@ from api.models import (
     SearchResultItem,
     StatusEnum
 )
+from api.clock import now_iso
+from api.json_response import ORJSONResponse
+from api.batcher import EmbeddingBatcher
+from core.embedding_cache import EmbeddingCache, chunk_embedding_cache
+from core.job_store import JobStore
+from core.response_cache import ResponseCache
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 # Variables globales pour les gestionnaires (sera initialisé après déplacement des modules)
 rag_manager = None
 hybrid_search_engine = None
 
-@router.post("/", response_model=SearchResponse)
+# Cache sémantique des recherches: une requête proche (cosinus >= 0.95) avec les mêmes
+# paramètres réutilise les résultats sans encodage d'index ni parcours ANN.
+# Recréé à chaque (ré)initialisation de la base, donc jamais périmé vis-à-vis de l'index.
+SEARCH_CACHE_SIMILARITY = 0.95
+search_cache: Optional[ResponseCache] = None
+
+# Encodage des requêtes regroupé par lots (fenêtre de 5 ms, 32 requêtes au plus), derrière
+# un cache d'embeddings (texte normalisé): une requête déjà vue ne repasse pas par le modèle
+query_encoder: Optional[EmbeddingBatcher] = None
+embedding_cache: Optional[EmbeddingCache] = None
+
+# Similarité entre chunks (/similar): embeddings du corpus en une matrice contiguë normalisée,
+# un produit matrice-vecteur (BLAS) par requête au lieu d'un parcours du graphe ANN
+_EMB: Optional[np.ndarray] = None
+_CHUNK_IDX: Dict[str, int] = {}
+
+# Tâches de réindexation, suivies dans le dossier de cache (status_url valable sur tous les workers)
+MAX_REINDEX_JOBS = 100
+_jobs: Optional[JobStore] = None
+_reindex_lock = asyncio.Lock()
+
+def _search_cache_messages(request: SearchRequest) -> List[Dict[str, str]]:
+    """
+    Messages de cache: les paramètres forment le contexte (jamais de hit croisé entre
+    modes ou filtres différents), la requête est la question comparée sémantiquement
+    """
+    scope = orjson.dumps(
+        [request.mode, request.max_results, request.min_score, request.filters or {}],
+        option=orjson.OPT_SORT_KEYS,
+        default=str
+    ).decode()
+    return [
+        {"role": "system", "content": scope},
+        {"role": "user", "content": request.query}
+    ]
+
+def _search_knowledge_base(request: SearchRequest, vector) -> List[SearchResultItem]:
+    """
+    Recherche vectorielle avec cache sémantique (appelée hors de la boucle d'événements);
+    `vector` est l'embedding de la requête, partagé par le cache et l'index
+    """
+    messages = _search_cache_messages(request) if search_cache is not None else None
+    if messages is not None:
+        cached = search_cache.get(messages, vector=vector)
+        if cached is not None:
+            return [SearchResultItem.model_construct(**item) for item in orjson.loads(cached)]
+    
+    hits = rag_manager.vector_store.search_by_vector(
+        vector, request.max_results, request.min_score, filters=request.filters
+    )
+    results = [
+        SearchResultItem(
+            content=chunk.content,
+            score=score,
+            source=chunk.source,
+            metadata=chunk.metadata,
+            chunk_id=chunk.chunk_id
+        )
+        for chunk, score in hits
+    ]
+    
+    if messages is not None and results:
+        search_cache.set(messages, orjson.dumps([item.model_dump() for item in results]).decode(), vector=vector)
+    return results
+
+# Réponses fictives construites une seule fois à l'import (aucune validation par requête)
+_MOCK_RESULTS = (
+    SearchResultItem(
+        content="L'École Nationale des Sciences Appliquées (ENSA) d'El Jadida offre des formations d'excellence en génie informatique, génie civil et génie industriel. Les diplômés bénéficient d'une insertion professionnelle remarquable avec un taux d'emploi de 95% dans les six mois suivant l'obtention du diplôme.",
+        score=0.92,
+        source="ENSA El Jadida - Brochure officielle",
+        metadata={
+            "type": "école",
+            "ville": "El Jadida",
+            "niveau": "ingénieur",
+            "page": 1
+        },
+        chunk_id="ensa_ej_001"
+    ),
+    SearchResultItem(
+        content="L'École Marocaine des Sciences de l'Ingénieur (EMSI) propose des formations en informatique, réseaux et télécommunications. Située à Casablanca, elle dispose de partenariats avec de nombreuses entreprises pour faciliter les stages et l'insertion professionnelle.",
+        score=0.85,
+        source="EMSI Casablanca - Guide étudiant",
+        metadata={
+            "type": "école",
+            "ville": "Casablanca", 
+            "niveau": "ingénieur",
+            "page": 3
+        },
+        chunk_id="emsi_casa_002"
+    ),
+    SearchResultItem(
+        content="Les formations en génie informatique requièrent de solides bases en mathématiques et en logique. Les débouchés incluent le développement logiciel, l'intelligence artificielle, la cybersécurité et l'administration des systèmes d'information.",
+        score=0.78,
+        source="Guide des formations - Informatique",
+        metadata={
+            "type": "filière",
+            "domaine": "informatique",
+            "page": 12
+        },
+        chunk_id="guide_info_003"
+    )
+)
+
+# Scores en tableau contigu (float64: mêmes comparaisons que les scores Python)
+_MOCK_SCORES = np.array([result.score for result in _MOCK_RESULTS], dtype=np.float64)
+
+_MOCK_SIMILAR = (
+    {
+        "chunk_id": "similar_001",
+        "content": "Contenu similaire 1...",
+        "score": 0.88,
+        "source": "Document similaire 1"
+    },
+    {
+        "chunk_id": "similar_002", 
+        "content": "Contenu similaire 2...",
+        "score": 0.82,
+        "source": "Document similaire 2"
+    }
+)
+
+# Entités nommées d'une requête: sigles et noms propres (ENSA, Casablanca)
+_ENTITY_RE = re.compile(r"\b[A-ZÀ-Ý][\w-]+")
+
+_SOURCES_BYTES = orjson.dumps({
+    "sources": [
+        {
+            "name": "ENSA El Jadida",
+            "type": "école",
+            "document_count": 15,
+            "last_updated": "2024-01-01T10:00:00",
+            "topics": ["génie informatique", "génie civil", "génie industriel"]
+        },
+        {
+            "name": "EMSI Casablanca",
+            "type": "école", 
+            "document_count": 12,
+            "last_updated": "2024-01-01T09:30:00",
+            "topics": ["informatique", "réseaux", "télécommunications"]
+        },
+        {
+            "name": "ISPITS",
+            "type": "école",
+            "document_count": 8,
+            "last_updated": "2024-01-01T08:45:00",
+            "topics": ["technologies spécialisées", "formation continue"]
+        }
+    ],
+    "total_documents": 35,
+    "total_chunks": 1250,
+    "last_indexing": "2024-01-01T10:00:00"
+})
+
+@router.post("/", response_model=SearchResponse, response_model_exclude_none=True)
 async def search_documents(request: SearchRequest):
     """
     Effectue une recherche dans la base de connaissances
     """
     try:
-        start_time = time.time()
-        
-        if not request.query.strip():
-            raise HTTPException(
-                status_code=400,
-                detail="La requête de recherche ne peut pas être vide"
-            )
-        
-        # TODO: Remplacer par la vraie logique de recherche
-        # Simulation de résultats de recherche
-        mock_results = [
-            SearchResultItem(
-                content="L'École Nationale des Sciences Appliquées (ENSA) d'El Jadida offre des formations d'excellence en génie informatique, génie civil et génie industriel. Les diplômés bénéficient d'une insertion professionnelle remarquable avec un taux d'emploi de 95% dans les six mois suivant l'obtention du diplôme.",
-                score=0.92,
-                source="ENSA El Jadida - Brochure officielle",
-                metadata={
-                    "type": "école",
-                    "ville": "El Jadida",
-                    "niveau": "ingénieur",
-                    "page": 1
-                },
-                chunk_id="ensa_ej_001"
-            ),
-            SearchResultItem(
-                content="L'École Marocaine des Sciences de l'Ingénieur (EMSI) propose des formations en informatique, réseaux et télécommunications. Située à Casablanca, elle dispose de partenariats avec de nombreuses entreprises pour faciliter les stages et l'insertion professionnelle.",
-                score=0.85,
-                source="EMSI Casablanca - Guide étudiant",
-                metadata={
-                    "type": "école",
-                    "ville": "Casablanca", 
-                    "niveau": "ingénieur",
-                    "page": 3
-                },
-                chunk_id="emsi_casa_002"
-            ),
-            SearchResultItem(
-                content="Les formations en génie informatique requièrent de solides bases en mathématiques et en logique. Les débouchés incluent le développement logiciel, l'intelligence artificielle, la cybersécurité et l'administration des systèmes d'information.",
-                score=0.78,
-                source="Guide des formations - Informatique",
-                metadata={
-                    "type": "filière",
-                    "domaine": "informatique",
-                    "page": 12
-                },
-                chunk_id="guide_info_003"
-            )
-        ]
+        start_time = time.perf_counter()
         
-        # Filtrage par score minimum
-        filtered_results = [
-            result for result in mock_results 
-            if result.score >= request.min_score
-        ]
+        if rag_manager is not None:
+            # Encodage par lot avec les requêtes simultanées, puis cache sémantique et index
+            # vectoriel (HNSW) hors de la boucle d'événements
+            vector = await query_encoder.submit(request.query)
+            limited_results = await asyncio.to_thread(_search_knowledge_base, request, vector)
+            return _search_response(request, limited_results, time.perf_counter() - start_time)
         
-        # Limitation du nombre de résultats
-        limited_results = filtered_results[:request.max_results]
+        # Simulation de résultats de recherche (base de connaissances non initialisée)
+        # Filtrage par score minimum (masque vectorisé) puis limitation du nombre de résultats
+        selected = np.flatnonzero(_MOCK_SCORES >= request.min_score)[:request.max_results]
+        limited_results = [_MOCK_RESULTS[i] for i in selected.tolist()]
         
-        search_time = time.time() - start_time
-        
-        response = SearchResponse(
-            status=StatusEnum.SUCCESS,
-            query=request.query,
-            results=limited_results,
-            total_results=len(limited_results),
-            search_time=search_time,
-            mode_used=request.mode,
-            filters_applied=request.filters
-        )
-        
-        return response
+        return _search_response(request, limited_results, time.perf_counter() - start_time)
         
     except HTTPException:
         raise
@@ -106,6 +219,44 @@ async def search_documents(request: SearchRequest):
             detail=f"Erreur lors de la recherche: {str(e)}"
         )
 
+def _load_similarity_matrix(vector_store) -> None:
+    """Charge la matrice des embeddings du corpus et l'index chunk_id -> ligne"""
+    global _EMB, _CHUNK_IDX
+    matrix = vector_store.get_embedding_matrix()
+    _CHUNK_IDX = {chunk.chunk_id: i for i, chunk in enumerate(vector_store.chunks)} if matrix is not None else {}
+    _EMB = matrix
+
+def _similar_chunks(chunk_index: int, max_results: int) -> List[Dict[str, Any]]:
+    """Chunks les plus proches d'un chunk du corpus (le chunk lui-même exclu)"""
+    scores = _EMB @ _EMB[chunk_index]
+    k = min(max_results + 1, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+    top = top[np.argsort(-scores[top])]
+    top = top[top != chunk_index][:max_results]
+    
+    chunks = rag_manager.vector_store.chunks
+    return [
+        {
+            "chunk_id": chunks[i].chunk_id,
+            "content": chunks[i].content,
+            "score": score,
+            "source": chunks[i].source
+        }
+        for i, score in zip(top.tolist(), scores[top].tolist())
+    ]
+
+def _search_response(request: SearchRequest, results: List[SearchResultItem], search_time: float) -> SearchResponse:
+    """Construit la réponse de recherche"""
+    return SearchResponse(
+        status=StatusEnum.SUCCESS,
+        query=request.query,
+        results=results,
+        total_results=len(results),
+        search_time=search_time,
+        mode_used=request.mode,
+        filters_applied=request.filters
+    )
+
 @router.get("/similar/{chunk_id}")
 async def find_similar_documents(
     chunk_id: str,
@@ -115,29 +266,26 @@ async def find_similar_documents(
     Trouve des documents similaires à un chunk donné
     """
     try:
-        # TODO: Implémenter la recherche de similarité
-        
-        mock_similar = [
-            {
-                "chunk_id": "similar_001",
-                "content": "Contenu similaire 1...",
-                "score": 0.88,
-                "source": "Document similaire 1"
-            },
-            {
-                "chunk_id": "similar_002", 
-                "content": "Contenu similaire 2...",
-                "score": 0.82,
-                "source": "Document similaire 2"
+        if rag_manager is not None and _EMB is not None:
+            chunk_index = _CHUNK_IDX.get(chunk_id)
+            if chunk_index is None:
+                raise HTTPException(status_code=404, detail=f"Chunk {chunk_id} introuvable")
+            similar = await asyncio.to_thread(_similar_chunks, chunk_index, max_results)
+            return {
+                "source_chunk_id": chunk_id,
+                "similar_documents": similar,
+                "total_found": len(similar)
             }
-        ]
         
+        # Simulation (base de connaissances non initialisée)
         return {
             "source_chunk_id": chunk_id,
-            "similar_documents": mock_similar[:max_results],
-            "total_found": len(mock_similar)
+            "similar_documents": list(_MOCK_SIMILAR[:max_results]),
+            "total_found": len(_MOCK_SIMILAR)
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la recherche de similarité: {e}")
         raise HTTPException(
@@ -151,7 +299,17 @@ async def extract_keywords(query: str):
     Extrait les mots-clés importants d'une requête
     """
     try:
-        # TODO: Implémenter l'extraction de mots-clés réelle
+        if hybrid_search_engine is not None and hybrid_search_engine.idf is not None:
+            keywords = hybrid_search_engine.weight_query_keywords(query)
+            return {
+                "query": query,
+                "keywords": [
+                    {"term": term, "weight": weight, "type": category}
+                    for term, weight, category in keywords
+                ],
+                "topics": list(dict.fromkeys(c for _, _, c in keywords if c != "terme")),
+                "entities": _ENTITY_RE.findall(query)
+            }
         
         # Simulation d'extraction de mots-clés
         keywords_mock = {
@@ -181,37 +339,7 @@ async def list_available_sources():
     """
     try:
         # TODO: Implémenter la liste réelle des sources
-        
-        mock_sources = {
-            "sources": [
-                {
-                    "name": "ENSA El Jadida",
-                    "type": "école",
-                    "document_count": 15,
-                    "last_updated": "2024-01-01T10:00:00",
-                    "topics": ["génie informatique", "génie civil", "génie industriel"]
-                },
-                {
-                    "name": "EMSI Casablanca",
-                    "type": "école", 
-                    "document_count": 12,
-                    "last_updated": "2024-01-01T09:30:00",
-                    "topics": ["informatique", "réseaux", "télécommunications"]
-                },
-                {
-                    "name": "ISPITS",
-                    "type": "école",
-                    "document_count": 8,
-                    "last_updated": "2024-01-01T08:45:00",
-                    "topics": ["technologies spécialisées", "formation continue"]
-                }
-            ],
-            "total_documents": 35,
-            "total_chunks": 1250,
-            "last_indexing": "2024-01-01T10:00:00"
-        }
-        
-        return mock_sources
+        return Response(content=_SOURCES_BYTES, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des sources: {e}")
@@ -220,31 +348,36 @@ async def list_available_sources():
             detail=f"Erreur lors de la récupération des sources: {str(e)}"
         )
 
-@router.post("/reindex")
-async def reindex_documents(force: bool = Query(False, description="Forcer la réindexation complète")):
+def _get_job_store() -> JobStore:
+    """Récupère ou crée le suivi des tâches de réindexation"""
+    global _jobs
+    if _jobs is None:
+        _jobs = JobStore(
+            directory=os.path.join(os.getenv("CACHE_DIR", "./.orientabot_cache"), "jobs"),
+            max_jobs=MAX_REINDEX_JOBS
+        )
+    return _jobs
+
+@router.post("/reindex", status_code=202)
+async def reindex_documents(background_tasks: BackgroundTasks,
+                            force: bool = Query(False, description="Forcer la réindexation complète")):
     """
-    Réindexe les documents dans la base de connaissances
+    Lance la réindexation des documents en tâche de fond (202 + identifiant de tâche)
     """
     try:
-        # TODO: Implémenter la réindexation réelle
-        
-        start_time = time.time()
-        
-        # Simulation de réindexation
-        import asyncio
-        await asyncio.sleep(1)  # Simule le temps de traitement
-        
-        indexing_time = time.time() - start_time
-        
-        return {
-            "status": "success",
-            "message": "Réindexation terminée",
+        job_id = uuid4().hex
+        await asyncio.to_thread(_get_job_store().create, job_id, {
+            "job_id": job_id,
+            "status": "pending",
             "force_reindex": force,
-            "documents_processed": 35,
-            "chunks_created": 1250,
-            "indexing_time": indexing_time,
-            "timestamp": "2024-01-01T10:00:00"
-        }
+            "created_at": now_iso()
+        })
+        
+        background_tasks.add_task(_run_reindex, job_id, force)
+        return ORJSONResponse(
+            {"job_id": job_id, "status": "pending", "status_url": f"/api/search/reindex/status/{job_id}"},
+            status_code=202
+        )
         
     except Exception as e:
         logger.error(f"Erreur lors de la réindexation: {e}")
@@ -253,21 +386,96 @@ async def reindex_documents(force: bool = Query(False, description="Forcer la r
             detail=f"Erreur lors de la réindexation: {str(e)}"
         )
 
+@router.get("/reindex/status/{job_id}")
+async def get_reindex_status(job_id: str):
+    """
+    Retourne l'état d'une tâche de réindexation
+    """
+    job = await asyncio.to_thread(_get_job_store().get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche de réindexation introuvable")
+    return job
+
+async def _run_reindex(job_id: str, force: bool) -> None:
+    """Réindexation effective, exécutée après l'envoi de la réponse 202"""
+    global hybrid_search_engine
+    
+    jobs = _get_job_store()
+    await asyncio.to_thread(jobs.update, job_id, status="running")
+    start_time = time.perf_counter()
+    result: Dict[str, Any] = {}
+    
+    try:
+        async with _reindex_lock:
+            if rag_manager is None:
+                await initialize_search_engines()
+                success = rag_manager is not None
+            else:
+                # Extraction, encodage et index.add hors de la boucle d'événements
+                success = await asyncio.to_thread(rag_manager.initialize_knowledge_base, force)
+                if success:
+                    from rag.hybrid_search import create_hybrid_search_engine
+                    hybrid_search_engine = await asyncio.to_thread(
+                        create_hybrid_search_engine, rag_manager.vector_store
+                    )
+                    if search_cache is not None:
+                        search_cache.clear()
+                    await asyncio.to_thread(_load_similarity_matrix, rag_manager.vector_store)
+        
+        result["indexing_time"] = time.perf_counter() - start_time
+        if success:
+            stats = rag_manager.vector_store.get_stats()
+            result.update(
+                status="completed",
+                message="Réindexation terminée",
+                chunks_created=stats.get("total_chunks", 0)
+            )
+        else:
+            result.update(status="failed", message="Base de connaissances indisponible")
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la réindexation: {e}")
+        result.update(status="failed", message=str(e), indexing_time=time.perf_counter() - start_time)
+    
+    await asyncio.to_thread(jobs.update, job_id, finished_at=now_iso(), **result)
+
 # Fonction d'initialisation
 async def initialize_search_engines():
     """
     Initialise les moteurs de recherche avec les vrais modules
     """
-    global rag_manager, hybrid_search_engine
+    global rag_manager, hybrid_search_engine, search_cache, query_encoder, embedding_cache
     
     try:
-        # TODO: À implémenter une fois les modules déplacés
-        # from rag.manager import RAGManager
-        # from rag.hybrid_search import HybridSearchEngine
-        # rag_manager = RAGManager()
-        # hybrid_search_engine = HybridSearchEngine()
+        from rag.manager import RAGManager
+        from rag.hybrid_search import create_hybrid_search_engine
+        
+        # Chargement du modèle d'embeddings et construction de l'index: hors de la boucle
+        manager = await asyncio.to_thread(RAGManager)
+        # Reconstruction de l'index (première fois, /reindex): seuls les chunks modifiés sont réencodés
+        manager.vector_store.embedding_cache = chunk_embedding_cache(manager.vector_store)
+        if not await asyncio.to_thread(manager.initialize_knowledge_base):
+            logger.warning("Base de connaissances indisponible - recherche en mode simulation")
+            return
         
-        logger.info("Moteurs de recherche initialisés (simulation)")
+        hybrid_search_engine = await asyncio.to_thread(create_hybrid_search_engine, manager.vector_store)
+        await asyncio.to_thread(_load_similarity_matrix, manager.vector_store)
+        embedding_cache = EmbeddingCache(
+            encode_fn=lambda texts: manager.vector_store.create_embeddings(texts, show_progress_bar=False),
+            namespace=manager.vector_store.embedding_model_name,
+            directory=os.path.join(os.getenv("CACHE_DIR", "./.orientabot_cache"), "embeddings")
+        )
+        search_cache = ResponseCache(
+            max_entries=1024,
+            similarity_threshold=SEARCH_CACHE_SIMILARITY,
+            embed_fn=embedding_cache.encode,
+            context_turns=None
+        )
+        if query_encoder is not None:
+            await query_encoder.close()
+        query_encoder = EmbeddingBatcher(embedding_cache.encode_many)
+        rag_manager = manager
+        logger.info("Moteurs de recherche initialisés")
         
     except Exception as e:
         logger.error(f"Erreur lors de l'initialisation des moteurs de recherche: {e}")
@@ -1,12 +1,19 @@
 """
 Routes API pour les informations et statistiques système
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+import asyncio
 import time
 import psutil
 import os
 import logging
-from datetime import datetime
+import platform
+from collections import deque
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import orjson
 
 from api.models import (
     SystemStatsRequest,
@@ -15,12 +22,121 @@ from api.models import (
     InitializationResponse,
     StatusEnum
 )
+from api.http_cache import conditional_response, content_etag, precompress
+from api.clock import now_iso
+from api.json_response import ORJSONResponse
+from api.routes import search
+from core.config import SPEED_MAP
+
+try:
+    from file_read_backwards import FileReadBackwards
+except ImportError:
+    FileReadBackwards = None
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 logger = logging.getLogger(__name__)
 
 # Variable pour tracker le temps de démarrage
-start_time = time.time()
+start_time = time.perf_counter()
+
+# Informations invariantes du processus, lues une fois à l'import
+PYTHON_VERSION = platform.python_version()
+PSUTIL_VERSION = psutil.__version__
+PLATFORM = os.name
+
+# Utilisation CPU échantillonnée en arrière-plan: /stats lit la dernière mesure au lieu
+# de bloquer la boucle d'événements pendant psutil.cpu_percent(interval=1)
+CPU_SAMPLE_INTERVAL = 1.0
+_cpu_percent = 0.0
+_cpu_sampler: Optional[asyncio.Task] = None
+
+async def _sample_cpu() -> None:
+    global _cpu_percent
+    psutil.cpu_percent(interval=None)  # Référence initiale
+    while True:
+        await asyncio.sleep(CPU_SAMPLE_INTERVAL)
+        # Sans intervalle: mesure depuis l'appel précédent, donc sur la dernière seconde
+        _cpu_percent = psutil.cpu_percent(interval=None)
+
+def start_cpu_sampler() -> None:
+    """Démarre l'échantillonnage CPU dans la boucle courante"""
+    global _cpu_sampler
+    if _cpu_sampler is None or _cpu_sampler.done():
+        _cpu_sampler = asyncio.get_running_loop().create_task(_sample_cpu())
+
+async def stop_cpu_sampler() -> None:
+    """Arrête l'échantillonnage CPU"""
+    global _cpu_sampler
+    if _cpu_sampler is not None:
+        _cpu_sampler.cancel()
+        try:
+            await _cpu_sampler
+        except asyncio.CancelledError:
+            pass
+        _cpu_sampler = None
+
+# Mémoire et disque: une mesure sert pendant PROBE_TTL secondes (rafales de scrapes de monitoring)
+PROBE_TTL = 2.0
+_probes: Dict[str, Tuple[float, Any]] = {}
+
+async def _probe(name: str, fn, *args) -> Any:
+    """Mesure psutil mémorisée PROBE_TTL secondes; l'appel système se fait hors de la boucle"""
+    cached = _probes.get(name)
+    now = time.monotonic()
+    if cached is not None and now - cached[0] < PROBE_TTL:
+        return cached[1]
+    value = await asyncio.to_thread(fn, *args)
+    _probes[name] = (now, value)
+    return value
+
+# Réponses fictives construites une seule fois à l'import
+# Réponses statiques interrogées en boucle (frontends, sondes): ETag/304 pour les relectures
+STATIC_CACHE_CONTROL = "public, max-age=30"
+
+# Modèles réellement utilisés par /message et /stream: niveaux de SPEED_MAP, équilibré (défaut) en tête
+_MODEL_IDS = tuple(dict.fromkeys((SPEED_MAP["balanced"], *SPEED_MAP.values())))
+
+_MODELS_BYTES = orjson.dumps({
+    "object": "list",
+    "data": [
+        {
+            "id": model,
+            "object": "model",
+            "created": 1687882411,
+            "owned_by": "groq",
+            "permission": [],
+            "root": model,
+            "parent": None
+        }
+        for model in _MODEL_IDS
+    ]
+})
+_MODELS_ETAG = content_etag(_MODELS_BYTES)
+_MODELS_GZ = precompress(_MODELS_BYTES)
+
+# Taille du tampon de lecture des logs quand file_read_backwards n'est pas installé
+LOG_TAIL_MAX_LINES = 10_000
+
+_MOCK_LOGS = (
+    {
+        "timestamp": "2024-01-01T10:00:00",
+        "level": "INFO",
+        "component": "api",
+        "message": "API démarrée avec succès"
+    },
+    {
+        "timestamp": "2024-01-01T10:01:00", 
+        "level": "INFO",
+        "component": "rag",
+        "message": "Index vectoriel chargé"
+    },
+    {
+        "timestamp": "2024-01-01T10:02:00",
+        "level": "WARNING",
+        "component": "chat",
+        "message": "Température élevée détectée dans les paramètres"
+    }
+)
 
 @router.get("/health")
 async def health_check():
@@ -30,8 +146,8 @@ async def health_check():
     try:
         health_info = {
             "status": "healthy",
-            "timestamp": datetime.now().isoformat(),
-            "uptime_seconds": time.time() - start_time,
+            "timestamp": now_iso(),
+            "uptime_seconds": time.perf_counter() - start_time,
             "version": "1.0.0",
             "environment": os.getenv("ENVIRONMENT", "development"),
             "components": {
@@ -42,28 +158,30 @@ async def health_check():
             }
         }
         
-        return health_info
+        return ORJSONResponse(health_info)
         
     except Exception as e:
         logger.error(f"Erreur lors du health check: {e}")
         return {
             "status": "unhealthy",
             "error": str(e),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
 
-@router.post("/stats", response_model=SystemStatsResponse)
+@router.post("/stats", response_model=SystemStatsResponse, response_model_exclude_none=True)
 async def get_system_stats(request: SystemStatsRequest):
     """
     Récupère les statistiques détaillées du système
     """
     try:
-        # Statistiques système de base
-        memory = psutil.virtual_memory()
-        cpu = psutil.cpu_percent(interval=1)
-        disk = psutil.disk_usage('/')
+        # Statistiques système de base (lectures /proc et statvfs mémorisées, hors de la boucle)
+        memory, disk = await asyncio.gather(
+            _probe("memory", psutil.virtual_memory),
+            _probe("disk", psutil.disk_usage, '/')
+        )
+        cpu = _cpu_percent
         
-        uptime = time.time() - start_time
+        uptime = time.perf_counter() - start_time
         
         stats = {
             "status": StatusEnum.SUCCESS,
@@ -81,8 +199,9 @@ async def get_system_stats(request: SystemStatsRequest):
                 "disk_used": disk.used, 
                 "disk_free": disk.free,
                 "disk_percent": (disk.used / disk.total) * 100,
-                "python_version": f"{psutil.version_info}",
-                "platform": os.name
+                "python_version": PYTHON_VERSION,
+                "psutil_version": PSUTIL_VERSION,
+                "platform": PLATFORM
             },
             "rag_stats": {},
             "chat_stats": {}
@@ -121,13 +240,13 @@ async def get_system_stats(request: SystemStatsRequest):
             detail=f"Erreur lors de la récupération des statistiques: {str(e)}"
         )
 
-@router.post("/initialize", response_model=InitializationResponse)
+@router.post("/initialize", response_model=InitializationResponse, response_model_exclude_none=True)
 async def initialize_system(request: InitializationRequest):
     """
     Initialise ou réinitialise les composants du système
     """
     try:
-        start_init = time.time()
+        start_init = time.perf_counter()
         components_initialized = []
         warnings = []
         
@@ -141,8 +260,11 @@ async def initialize_system(request: InitializationRequest):
         for component in components_to_init:
             try:
                 if component == "rag":
-                    # TODO: Initialiser le système RAG
-                    components_initialized.append("rag_system")
+                    await search.initialize_search_engines()
+                    if search.rag_manager is None:
+                        warnings.append("Système RAG indisponible - recherche en mode simulation")
+                    else:
+                        components_initialized.append("rag_system")
                     
                 elif component == "chat":
                     # TODO: Initialiser les gestionnaires de chat
@@ -161,7 +283,7 @@ async def initialize_system(request: InitializationRequest):
                 warnings.append(warning_msg)
                 logger.warning(warning_msg)
         
-        initialization_time = time.time() - start_init
+        initialization_time = time.perf_counter() - start_init
         
         response = InitializationResponse(
             status=StatusEnum.SUCCESS if components_initialized else StatusEnum.WARNING,
@@ -184,43 +306,83 @@ async def initialize_system(request: InitializationRequest):
             detail=f"Erreur lors de l'initialisation: {str(e)}"
         )
 
+# Configuration: encodée une fois, régénérée après un POST /config ou un changement d'index
+_config_overrides: Dict[str, Any] = {}
+_config_lock = asyncio.Lock()
+
+def _current_index_type() -> str:
+    # hnsw: faible latence; ivfpq: vecteurs compressés pour les gros corpus
+    if search.rag_manager is not None:
+        return search.rag_manager.vector_store.effective_index_type
+    return os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+
+def _build_config(index_type: str) -> Tuple[bytes, str, bytes]:
+    """Encode la réponse de /config, son ETag et sa variante gzip"""
+    # TODO: Récupérer la vraie configuration
+    config = {
+        "environment": os.getenv("ENVIRONMENT", "development"),
+        "groq_model": SPEED_MAP["balanced"],
+        "model_tiers": dict(SPEED_MAP),
+        "max_tokens": int(os.getenv("MAX_TOKENS", "4000")),
+        "temperature_default": float(os.getenv("TEMPERATURE_DEFAULT", "0.7")),
+        "rag_config": {
+            "index_type": index_type,
+            "chunk_size": 1000,
+            "chunk_overlap": 200,
+            "max_results": 5,
+            "min_score": 0.7
+        },
+        "chat_config": {
+            "max_history_length": 20,
+            "stream_enabled": True,
+            "context_window": 8000
+        },
+        "system_config": {
+            "log_level": "INFO",
+            "debug_mode": False,
+            "cache_enabled": True,
+            "async_processing": True
+        }
+    }
+    
+    # Surcharges runtime: les sections sont fusionnées, les autres clés remplacées
+    for key, value in _config_overrides.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key] = {**config[key], **value}
+        else:
+            config[key] = value
+    
+    body = orjson.dumps({
+        "status": "success",
+        "config": config,
+        "config_sources": ["environment_variables", "default_values"] + (["runtime_updates"] if _config_overrides else []),
+        "last_updated": now_iso()
+    }, default=str)
+    return body, content_etag(body), precompress(body)
+
+_config_index_type = _current_index_type()
+_CONFIG_BYTES, _CONFIG_ETAG, _CONFIG_GZ = _build_config(_config_index_type)
+
 @router.get("/config")
-async def get_system_config():
+async def get_system_config(request: Request):
     """
     Récupère la configuration actuelle du système
     """
+    global _config_index_type, _CONFIG_BYTES, _CONFIG_ETAG, _CONFIG_GZ
+    
     try:
-        # TODO: Récupérer la vraie configuration
-        config = {
-            "environment": os.getenv("ENVIRONMENT", "development"),
-            "groq_model": os.getenv("GROQ_MODEL", "llama3-70b-8192"),
-            "max_tokens": int(os.getenv("MAX_TOKENS", "4000")),
-            "temperature_default": float(os.getenv("TEMPERATURE_DEFAULT", "0.7")),
-            "rag_config": {
-                "chunk_size": 1000,
-                "chunk_overlap": 200,
-                "max_results": 5,
-                "min_score": 0.7
-            },
-            "chat_config": {
-                "max_history_length": 20,
-                "stream_enabled": True,
-                "context_window": 8000
-            },
-            "system_config": {
-                "log_level": "INFO",
-                "debug_mode": False,
-                "cache_enabled": True,
-                "async_processing": True
-            }
-        }
+        # Le type d'index change quand la base de connaissances est (ré)initialisée
+        index_type = _current_index_type()
+        if index_type != _config_index_type:
+            async with _config_lock:
+                if index_type != _config_index_type:
+                    _CONFIG_BYTES, _CONFIG_ETAG, _CONFIG_GZ = _build_config(index_type)
+                    _config_index_type = index_type
         
-        return {
-            "status": "success",
-            "config": config,
-            "config_sources": ["environment_variables", "default_values"],
-            "last_updated": datetime.now().isoformat()
-        }
+        return conditional_response(
+            request, _CONFIG_BYTES, etag=_CONFIG_ETAG,
+            cache_control=STATIC_CACHE_CONTROL, gzipped=_CONFIG_GZ
+        )
         
     except Exception as e:
         logger.error(f"Erreur lors de la récupération de la configuration: {e}")
@@ -234,17 +396,23 @@ async def update_system_config(config_updates: dict):
     """
     Met à jour la configuration système (runtime uniquement)
     """
+    global _config_index_type, _CONFIG_BYTES, _CONFIG_ETAG, _CONFIG_GZ
+    
     try:
-        # TODO: Implémenter la mise à jour de configuration
-        
         updated_keys = list(config_updates.keys())
         
+        # Régénère la réponse mise en cache: les clients reçoivent un nouvel ETag
+        async with _config_lock:
+            _config_overrides.update(config_updates)
+            _config_index_type = _current_index_type()
+            _CONFIG_BYTES, _CONFIG_ETAG, _CONFIG_GZ = _build_config(_config_index_type)
+        
         return {
             "status": "success",
             "message": "Configuration mise à jour (session en cours uniquement)",
             "updated_keys": updated_keys,
             "note": "Ces modifications sont temporaires et seront perdues au redémarrage",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": now_iso()
         }
         
     except Exception as e:
@@ -255,26 +423,15 @@ async def update_system_config(config_updates: dict):
         )
 
 @router.get("/models")
-async def get_available_models():
+async def get_available_models(request: Request):
     """
     Retourne les modèles disponibles (compatibilité OpenAI API)
     """
     try:
-        models = {
-            "object": "list",
-            "data": [
-                {
-                    "id": os.getenv("GROQ_MODEL", "llama3-70b-8192"),
-                    "object": "model",
-                    "created": 1687882411,
-                    "owned_by": "groq",
-                    "permission": [],
-                    "root": os.getenv("GROQ_MODEL", "llama3-70b-8192"),
-                    "parent": None
-                }
-            ]
-        }
-        return models
+        return conditional_response(
+            request, _MODELS_BYTES, etag=_MODELS_ETAG,
+            cache_control=STATIC_CACHE_CONTROL, gzipped=_MODELS_GZ
+        )
         
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des modèles: {e}")
@@ -283,6 +440,57 @@ async def get_available_models():
             detail=f"Erreur lors de la récupération des modèles: {str(e)}"
         )
 
+def _parse_log_line(line: str) -> Optional[Dict[str, str]]:
+    """Entrée de log à partir d'une ligne au format LOG_FILE_FORMAT (None pour les suites de traceback)"""
+    fields = line.rstrip("\n").split("\t", 3)
+    if len(fields) != 4:
+        return None
+    timestamp, log_level, name, message = fields
+    return {
+        "timestamp": timestamp,
+        "level": log_level,
+        "component": name.split(".", 1)[0],
+        "message": message
+    }
+
+def _read_log_entries(log_file: Optional[str]) -> Iterator[Dict[str, str]]:
+    """Entrées du fichier de logs de la plus récente à la plus ancienne (logs simulés sans fichier)"""
+    if not log_file or not os.path.exists(log_file):
+        yield from reversed(_MOCK_LOGS)
+        return
+    
+    if FileReadBackwards is not None:
+        # Lecture depuis la fin du fichier: coût proportionnel aux lignes renvoyées
+        with FileReadBackwards(log_file, encoding="utf-8") as lines:
+            for line in lines:
+                entry = _parse_log_line(line)
+                if entry is not None:
+                    yield entry
+        return
+    
+    # Repli: lecture avant avec un tampon circulaire borné
+    with open(log_file, encoding="utf-8", errors="replace") as f:
+        tail = deque(f, maxlen=LOG_TAIL_MAX_LINES)
+    for line in reversed(tail):
+        entry = _parse_log_line(line)
+        if entry is not None:
+            yield entry
+
+def _select_log_entries(log_file: Optional[str], lines: int, level: str,
+                        component: Optional[str]) -> List[Dict[str, str]]:
+    """Les `lines` dernières entrées retenues par les filtres, de la plus ancienne à la plus récente"""
+    entries = _read_log_entries(log_file)
+    selected = list(islice(
+        (
+            entry for entry in entries
+            if (not component or entry["component"] == component)
+            and (level == "ALL" or entry["level"] == level)
+        ),
+        max(lines, 0)
+    ))
+    selected.reverse()
+    return selected
+
 @router.get("/logs")
 async def get_system_logs(
     lines: int = 100,
@@ -290,51 +498,19 @@ async def get_system_logs(
     component: str = None
 ):
     """
-    Récupère les logs système récents
+    Récupère les logs système récents, en NDJSON (une entrée par ligne, de la plus ancienne
+    à la plus récente des `lines` dernières entrées retenues)
     """
     try:
-        # TODO: Implémenter la lecture des logs réels
-        
-        mock_logs = [
-            {
-                "timestamp": "2024-01-01T10:00:00",
-                "level": "INFO",
-                "component": "api",
-                "message": "API démarrée avec succès"
-            },
-            {
-                "timestamp": "2024-01-01T10:01:00", 
-                "level": "INFO",
-                "component": "rag",
-                "message": "Index vectoriel chargé"
-            },
-            {
-                "timestamp": "2024-01-01T10:02:00",
-                "level": "WARNING",
-                "component": "chat",
-                "message": "Température élevée détectée dans les paramètres"
-            }
-        ]
-        
-        # Filtrage par composant si spécifié
-        if component:
-            mock_logs = [log for log in mock_logs if log["component"] == component]
-        
-        # Filtrage par niveau
-        mock_logs = [log for log in mock_logs if log["level"] == level or level == "ALL"]
-        
-        # Limitation du nombre de lignes
-        mock_logs = mock_logs[-lines:]
-        
-        return {
-            "logs": mock_logs,
-            "total_entries": len(mock_logs),
-            "filters_applied": {
-                "lines": lines,
-                "level": level,
-                "component": component
-            }
-        }
+        # Lecture et filtrage avant la réponse (hors de la boucle): une erreur de lecture
+        # donne un 500 au lieu d'un flux coupé en cours de route
+        selected = await asyncio.to_thread(
+            _select_log_entries, os.getenv("LOG_FILE"), lines, level, component
+        )
+        return StreamingResponse(
+            (orjson.dumps(entry) + b"\n" for entry in selected),
+            media_type="application/x-ndjson"
+        )
         
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des logs: {e}")
@@ -2,38 +2,309 @@
 Simple chat handler for API routes - lightweight version without complex dependencies
 """
 import os
+import re
 import json
+import time
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Optional, Any, Generator
-from groq import Groq
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from typing import List, Dict, Optional, Any, AsyncGenerator, Callable, Generator, Tuple
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 
+from core.http import get_shared_http_client, get_shared_async_http_client
+from core.config import SPEED_MAP
+from core.session_memory import estimate_tokens
+from core.response_cache import (
+    ResponseCache,
+    PersistentResponseCache,
+    build_state_key,
+    replay_stream
+)
+
 # Load environment variables
 load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# Environment, read once at import (not per handler instance)
+_GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+_GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-70b-8192")
+_MAX_TOKENS = int(os.getenv("MAX_TOKENS", "4000"))
+_CACHE_ENABLED = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+_CACHE_TTL = int(os.getenv("CACHE_TTL", "3600"))
+_CACHE_DIR = os.getenv("CACHE_DIR", "./.orientabot_cache")
+_EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Completion budgets by intent when the request sets none; MAX_TOKENS from the environment
+# is the hard ceiling. Decode time grows with the cap, so short intents get short caps.
+GREETING_MAX_TOKENS = 256
+DEFAULT_MAX_TOKENS = 512
+DETAILED_MAX_TOKENS = 1500
+
+# A run of blank lines ends the answer (cuts runaway generations short)
+STOP_SEQUENCES = ["\n\n\n"]
+
+_GREETING_RE = re.compile(
+    r"^\W*(?:bonjour|bonsoir|salut|coucou|hello|hi|merci|ok|d'accord)\b[\s\w]{0,20}\W*$",
+    re.IGNORECASE
+)
+_DETAILED_RE = re.compile(
+    r"en d[ée]tail|d[ée]taill[ée]|liste compl[èe]te|toutes les (?:[ée]coles|fili[èe]res)|[ée]tape par [ée]tape",
+    re.IGNORECASE
+)
+
+# Model -> tier name, to report which tier answered
+MODEL_TIERS = {model: tier for tier, model in SPEED_MAP.items()}
+
+# Streamed deltas are coalesced and flushed once this many characters are buffered or
+# this much time has passed since the last flush (fewer SSE frames, same perceived speed)
+STREAM_FLUSH_CHARS = 32
+STREAM_FLUSH_INTERVAL = 0.02
+
+# Token budget for previous turns sent to Groq: the oldest turns are dropped beyond it,
+# so prefill cost stays bounded however long the session grows
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+
+# Paragraphs of previous assistant turns at least this long that were already sent earlier
+# in the conversation are replaced by a short [ref:<id>] marker
+DEDUP_MIN_BLOCK_CHARS = 200
+
+# Bounded pool for the blocking work left in the async paths (disk cache tier, semantic
+# cache embedding), so it never runs on the event loop
+_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("GROQ_WORKERS", "32")), thread_name_prefix="groq")
+
+# Below this temperature the request is treated as deterministic and sent with temperature=0,
+# so equivalent requests share one cache key and an identical provider-side prefix
+DETERMINISTIC_TEMPERATURE = 0.3
+
+_HORIZONTAL_SPACE_RE = re.compile(r"[ \t\r\f\v]+")
+_BLANK_LINES_RE = re.compile(r" *\n\s*\n+")
+_TRAILING_SPACE_RE = re.compile(r" +\n")
+
+# Schools recognised in answers, in the order they are reported
+SCHOOLS = ("ENSA", "EMSI", "ISPITS", "ENCG", "ENSAM", "ENSIAS", "EHTP", "INPT")
+_SCHOOL_RE = re.compile(r"\b(" + "|".join(SCHOOLS) + r")\b")
+
+# System prompt, built once and sent verbatim on every call (stable prefix for provider-side
+# caching). Kept terse: every input token adds to prefill time and TPM usage.
+_SYSTEM_PROMPT = (
+    "Tu es Dr. Karima Benjelloun, conseillère d'orientation spécialiste du système éducatif marocain: "
+    "écoles d'ingénieurs (ENSA, EMSI, ISPITS...), seuils et critères d'admission, filières et débouchés, "
+    "orientation post-bac, carrières en IA, informatique et ingénierie.\n"
+    "Seuils indicatifs: ENSA 16-18/20 selon spécialité et concours, EMSI 12-14/20, ISPITS 14-16/20.\n"
+    "Méthode: analyse le profil (filière, moyenne, intérêts), donne des conseils personnalisés et concrets, "
+    "propose des alternatives et un plan B, encourage en restant réaliste.\n"
+    "Réponds en français, avec empathie et réalisme."
+)
+# Shared system message, and its JSON serialized once (reused when hashing requests)
+_SYSTEM_MESSAGE = {"role": "system", "content": _SYSTEM_PROMPT}
+_SYSTEM_MSG_BYTES = orjson.dumps(_SYSTEM_MESSAGE)
+
+# Canned answers used when Groq is not configured
+# Anchored lookaheads: the ENSA branch (both words, any order) wins over the IA one
+_FALLBACK_TRIGGERS = re.compile(
+    r"^(?:(?P<ensa>(?=.*seuil)(?=.*ensa))|(?=.*?(?P<ia>\bia\b|intelligence artificielle)))",
+    re.IGNORECASE | re.DOTALL
+)
+
+_FALLBACK_ENSA = """🎓 **Seuils d'admission ENSA (École Nationale des Sciences Appliquées)**
+
+Les seuils ENSA varient selon:
+- **La ville/école**: ENSA Agadir, El Jadida, Fès, Marrakech, etc.
+- **La spécialité**: Informatique, Génie Civil, Électronique, etc.
+- **L'année**: Les seuils évoluent chaque année
+
+**Seuils indicatifs 2023-2024:**
+- **Général**: 16-18/20 selon les spécialités
+- **Informatique/IA**: Souvent 17-18/20 (très demandé)
+- **Génie Civil**: 16-17/20
+- **Électronique**: 16.5-17.5/20
+
+**Avec votre moyenne de 15/20:**
+- C'est en dessous des seuils ENSA habituels
+- Concentrez-vous sur améliorer vos notes en terminale
+- Considérez aussi EMSI, ISPITS comme alternatives excellentes
+- Préparez bien le concours national si applicable
+
+⚠️ *Vérifiez les seuils officiels sur les sites des écoles*"""
+
+_FALLBACK_IA = """🤖 **Devenir Ingénieur en IA au Maroc**
+
+**Écoles recommandées pour l'IA:**
+1. **ENSA** - Génie Informatique/Télécoms (seuil ~17-18/20)
+2. **EMSI** - Intelligence Artificielle (seuil ~14/20)
+3. **ISPITS** - Data Science et IA (seuil ~15/20)
+4. **Université Hassan II** - Master IA (après licence)
+
+**Avec SM-B et 15/20:**
+- ✅ **EMSI**: Excellente option, programmes IA solides
+- ✅ **ISPITS**: Bons programmes, seuil accessible
+- 🎯 **Objectif**: Améliorer à 16-17/20 pour plus d'options
+- 📚 **Conseils**: Renforcez maths/physique, apprenez Python
+
+**Plan d'action:**
+1. Travaillez pour atteindre 16/20 minimum
+2. Explorez EMSI et ISPITS dès maintenant
+3. Développez des projets perso en IA
+4. Préparez-vous aux entretiens techniques"""
+
+_FALLBACK_DEFAULT_TEMPLATE = """👋 Bonjour ! Je suis Dr. Karima Benjelloun, votre conseillère d'orientation.
+
+J'ai bien reçu votre question: "{message}"
+
+Pour vous donner les meilleurs conseils, j'aimerais en savoir plus sur:
+- 📚 Votre filière actuelle et vos résultats
+- 🎯 Vos objectifs de carrière
+- ❤️ Vos passions et centres d'intérêt
+- 🏛️ Les écoles qui vous intéressent
+
+*Note: Pour des conseils plus précis, assurez-vous que l'API Groq est configurée avec une vraie clé.*"""
+
+def _normalize_whitespace(text: str) -> str:
+    """Collapse horizontal whitespace runs and blank-line runs, keeping markdown line breaks"""
+    text = _HORIZONTAL_SPACE_RE.sub(" ", text)
+    text = _BLANK_LINES_RE.sub("\n\n", text)
+    return _TRAILING_SPACE_RE.sub("\n", text).strip()
+
+def _estimate_max_tokens(message: str) -> int:
+    """Completion budget matching the expected answer length for this message"""
+    if _DETAILED_RE.search(message):
+        return DETAILED_MAX_TOKENS
+    if _GREETING_RE.match(message):
+        return GREETING_MAX_TOKENS
+    return DEFAULT_MAX_TOKENS
+
+def _dedupe_blocks(history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    """
+    Replace repeated paragraphs (school lists, thresholds tables...) in assistant turns by
+    [ref:<id>], and label the first occurrence as "[ref:<id>] <paragraph>" so the model can
+    resolve the marker. Run on the already trimmed window: every marker points to a
+    paragraph that is still sent.
+    """
+    turn_blocks = [turn["content"].split("\n\n") for turn in history]
+    # Position of each paragraph's first occurrence, None once it is labelled
+    first_seen: Dict[str, Optional[Tuple[int, int]]] = {}
+    rewritten = set()
+    for t, blocks in enumerate(turn_blocks):
+        for i, block in enumerate(blocks):
+            if len(block) < DEDUP_MIN_BLOCK_CHARS:
+                continue
+            block_id = hashlib.blake2b(block.encode("utf-8"), digest_size=4).hexdigest()
+            if block_id not in first_seen:
+                first_seen[block_id] = (t, i)
+            elif history[t]["role"] == "assistant":
+                blocks[i] = f"[ref:{block_id}]"
+                rewritten.add(t)
+                origin = first_seen[block_id]
+                if origin is not None:
+                    first_t, first_i = origin
+                    turn_blocks[first_t][first_i] = f"[ref:{block_id}] {turn_blocks[first_t][first_i]}"
+                    rewritten.add(first_t)
+                    first_seen[block_id] = None
+    
+    return [
+        {"role": turn["role"], "content": "\n\n".join(turn_blocks[t])} if t in rewritten else turn
+        for t, turn in enumerate(history)
+    ]
+
+def _generation_scope(model: str, temperature: float, max_tokens: int) -> str:
+    """
+    In-memory cache scope of an answer: answers generated by another model tier, at another
+    temperature or with another completion budget are never served for this request
+    """
+    return f"{model}\0{temperature}\0{max_tokens}"
+
+def _trim_history(history: List[Dict[str, str]], budget: int) -> List[Dict[str, str]]:
+    """Most recent turns whose estimated token count fits in the budget"""
+    used = 0
+    for start in range(len(history) - 1, -1, -1):
+        used += estimate_tokens(history[start]["content"])
+        if used > budget:
+            return history[start + 1:]
+    return history
+
+class _GroqCoalescer:
+    """
+    Single-flight for non-streaming Groq completions: concurrent calls with the same
+    (model, temperature, max_tokens, messages) share one in-flight request and its answer
+    """
+    
+    def __init__(self):
+        self.pending: Dict[str, asyncio.Task] = {}
+    
+    @staticmethod
+    def key(model: str, temperature: float, max_tokens: int, messages: List[Dict[str, str]]) -> str:
+        digest = hashlib.blake2b(f"{model}\0{temperature}\0{max_tokens}\0".encode("utf-8"), digest_size=16)
+        if messages[0] is _SYSTEM_MESSAGE:
+            # Static prefix: hash the precomputed bytes, serialize only the turns
+            digest.update(_SYSTEM_MSG_BYTES)
+            messages = messages[1:]
+        digest.update(orjson.dumps(messages))
+        return digest.hexdigest()
+    
+    async def run(self, key: str, call: Callable[[], Any]) -> Any:
+        """Await the in-flight call for this key, starting it if there is none"""
+        task = self.pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self.pending[key] = task
+            task.add_done_callback(lambda _: self.pending.pop(key, None))
+        # A caller disconnecting must not cancel the call the others are waiting on
+        return await asyncio.shield(task)
+
 class SimpleChatHandler:
     """Simple chat handler for API integration"""
     
     def __init__(self):
         """Initialize the simple chat handler"""
-        self.groq_api_key = os.getenv("GROQ_API_KEY")
-        self.groq_model = os.getenv("GROQ_MODEL", "llama3-70b-8192")
-        self.max_tokens = int(os.getenv("MAX_TOKENS", "4000"))
+        self.groq_api_key = _GROQ_API_KEY
+        self.groq_model = _GROQ_MODEL
+        self.max_tokens = _MAX_TOKENS
         
         if not self.groq_api_key or self.groq_api_key == "gsk_placeholder_key_here":
             logger.warning("⚠️ Groq API key not configured - using fallback responses")
-            self.client = None
+            self.async_client = None
         else:
-            self.client = Groq(api_key=self.groq_api_key)
+            # Native async client for the API routes, so the event loop never waits on Groq;
+            # shares the process-wide keep-alive pool instead of reconnecting per request
+            self.async_client = AsyncGroq(api_key=self.groq_api_key, http_client=get_shared_async_http_client())
             logger.info("✅ Groq client initialized successfully")
+        self._coalescer = _GroqCoalescer()
+        
+        # Two-tier response cache (exact + semantic) in front of Groq, with the same
+        # expiry as the persistent tier so memory never serves answers disk has dropped
+        self.cache_enabled = _CACHE_ENABLED
+        self.response_cache = ResponseCache(
+            embed_fn=self._build_embed_fn(),
+            ttl=_CACHE_TTL
+        ) if self.cache_enabled else None
+        
+        # Persistent cache keyed on the full conversation state, survives restarts
+        # and is shared by every worker on the host
+        self.persistent_cache = PersistentResponseCache(
+            directory=_CACHE_DIR,
+            ttl=_CACHE_TTL
+        ) if self.cache_enabled else None
+    
+    @cached_property
+    def client(self) -> Optional[Groq]:
+        """Blocking Groq client for the sync methods (scripts, Streamlit), built on first use"""
+        if self.async_client is None:
+            return None
+        return Groq(api_key=self.groq_api_key, http_client=get_shared_http_client())
     
     def process_message(self, 
                        message: str,
                        conversation_history: List[Dict[str, str]] = None,
                        temperature: float = 0.7,
-                       session_id: str = None) -> Dict[str, Any]:
+                       session_id: str = None,
+                       user_profile: Optional[Dict[str, Any]] = None,
+                       model: Optional[str] = None,
+                       max_tokens: Optional[int] = None) -> Dict[str, Any]:
         """
         Process a chat message and return response
         
@@ -42,71 +313,156 @@ class SimpleChatHandler:
             conversation_history: Previous conversation
             temperature: Model temperature
             session_id: Session identifier
+            user_profile: Optional user profile (part of the cache key)
+            model: Groq model override (defaults to GROQ_MODEL)
+            max_tokens: Completion budget (estimated from the message intent if unset, capped by MAX_TOKENS)
             
         Returns:
             Dict with response and metadata
         """
-        if conversation_history is None:
-            conversation_history = []
-        
         try:
             if not self.client:
                 return self._fallback_response(message, session_id)
             
-            # Build messages for Groq API
-            messages = [
-                {
-                    "role": "system",
-                    "content": self._get_system_prompt()
-                }
-            ]
-            
-            # Add conversation history
-            messages.extend(conversation_history)
-            
-            # Add current message
-            messages.append({"role": "user", "content": message})
+            messages = self._build_messages(message, conversation_history)
+            model = model or self.groq_model
+            temperature = self._effective_temperature(temperature)
+            max_tokens = self._resolve_max_tokens(max_tokens, message)
+            state_key = build_state_key(messages, user_profile, temperature, model, max_tokens)
+            scope = _generation_scope(model, temperature, max_tokens)
+            cached = self._get_cached(messages, state_key, scope)
+            if cached is not None:
+                return self._success_response(cached, session_id, model, cache_hit=True)
             
             # Generate response
             response = self.client.chat.completions.create(
-                model=self.groq_model,
+                model=model,
                 messages=messages,
                 temperature=temperature,
-                max_tokens=self.max_tokens,
+                max_tokens=max_tokens,
+                stop=STOP_SEQUENCES,
                 stream=False
             )
             
             response_text = response.choices[0].message.content
+            self._store_cached(messages, state_key, scope, response_text, response.choices[0].finish_reason)
+            return self._success_response(response_text, session_id, model)
+            
+        except Exception as e:
+            logger.error(f"Error processing message: {e}")
+            return self._error_response(e, session_id)
+    
+    async def aprocess_message(self,
+                               message: str,
+                               conversation_history: List[Dict[str, str]] = None,
+                               temperature: float = 0.7,
+                               session_id: str = None,
+                               user_profile: Optional[Dict[str, Any]] = None,
+                               model: Optional[str] = None,
+                               max_tokens: Optional[int] = None,
+                               check_cache: bool = True,
+                               defer: Optional[Callable[..., Any]] = None) -> Dict[str, Any]:
+        """
+        Async version of process_message, awaiting Groq on the event loop
+        (same arguments and return value)
+        
+        Args:
+            check_cache: False when the caller already did lookup_cached for this request
+            defer: Optional scheduler (e.g. BackgroundTasks.add_task) for the cache write
+        """
+        try:
+            if not self.async_client:
+                return self._fallback_response(message, session_id)
             
-            return {
-                "status": "success",
-                "response": response_text,
-                "session_id": session_id,
-                "recommendations": self._extract_recommendations(response_text),
-                "rag_available": False,
-                "stats": {"groq_model_used": self.groq_model}
-            }
+            messages = self._build_messages(message, conversation_history)
+            model = model or self.groq_model
+            temperature = self._effective_temperature(temperature)
+            max_tokens = self._resolve_max_tokens(max_tokens, message)
+            state_key = build_state_key(messages, user_profile, temperature, model, max_tokens)
+            scope = _generation_scope(model, temperature, max_tokens)
+            if check_cache:
+                cached = await self._aget_cached(messages, state_key, scope)
+                if cached is not None:
+                    return self._success_response(cached, session_id, model, cache_hit=True)
+            
+            # Identical requests already in flight (burst, double submit) await the same call
+            response = await self._coalescer.run(
+                _GroqCoalescer.key(model, temperature, max_tokens, messages),
+                lambda: self.async_client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stop=STOP_SEQUENCES,
+                    stream=False
+                )
+            )
+            
+            response_text = response.choices[0].message.content
+            finish_reason = response.choices[0].finish_reason
+            if defer is not None:
+                defer(self._store_cached, messages, state_key, scope, response_text, finish_reason)
+            else:
+                await asyncio.get_running_loop().run_in_executor(
+                    _POOL, self._store_cached, messages, state_key, scope, response_text, finish_reason
+                )
+            return self._success_response(response_text, session_id, model)
             
         except Exception as e:
             logger.error(f"Error processing message: {e}")
-            return {
-                "status": "error",
-                "response": f"Désolé, une erreur s'est produite: {str(e)}",
-                "session_id": session_id,
-                "error": str(e)
-            }
+            return self._error_response(e, session_id)
+    
+    def lookup_cached(self,
+                      message: str,
+                      conversation_history: List[Dict[str, str]] = None,
+                      temperature: float = 0.7,
+                      session_id: str = None,
+                      user_profile: Optional[Dict[str, Any]] = None,
+                      model: Optional[str] = None,
+                      max_tokens: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Answer this request from the cache tiers only, without calling Groq
+        (same arguments as process_message, so the lookup uses the same cache keys)
+        
+        Returns:
+            Same dict as process_message on a hit, None on a miss (or without Groq/cache)
+        """
+        if not self.cache_enabled or not self.async_client:
+            return None
+        
+        messages = self._build_messages(message, conversation_history)
+        model = model or self.groq_model
+        temperature = self._effective_temperature(temperature)
+        max_tokens = self._resolve_max_tokens(max_tokens, message)
+        cached = self._get_cached(
+            messages,
+            build_state_key(messages, user_profile, temperature, model, max_tokens),
+            _generation_scope(model, temperature, max_tokens)
+        )
+        if cached is None:
+            return None
+        return self._success_response(cached, session_id, model, cache_hit=True)
     
     def stream_message(self, 
                       message: str,
                       conversation_history: List[Dict[str, str]] = None,
                       temperature: float = 0.7,
-                      session_id: str = None) -> Generator[str, None, None]:
+                      session_id: str = None,
+                      user_profile: Optional[Dict[str, Any]] = None,
+                      model: Optional[str] = None,
+                      max_tokens: Optional[int] = None,
+                      defer: Optional[Callable[..., Any]] = None) -> Generator[str, None, None]:
         """
         Stream a chat message response
-        """
-        if conversation_history is None:
-            conversation_history = []
         
+        Args:
+            defer: Optional scheduler (e.g. BackgroundTasks.add_task) used to run the
+                cache write after the response is sent instead of inline
+        """
+        # Deltas received so far; collected[flushed:] is buffered, not yet sent
+        collected: List[str] = []
+        flushed = pending_chars = 0
+        finish_reason = None
         try:
             if not self.client:
                 # Fallback streaming
@@ -115,122 +471,254 @@ class SimpleChatHandler:
                     yield word + " "
                 return
             
-            # Build messages for Groq API
-            messages = [
-                {
-                    "role": "system", 
-                    "content": self._get_system_prompt()
-                }
-            ]
-            
-            # Add conversation history
-            messages.extend(conversation_history)
-            
-            # Add current message
-            messages.append({"role": "user", "content": message})
+            messages = self._build_messages(message, conversation_history)
+            model = model or self.groq_model
+            temperature = self._effective_temperature(temperature)
+            max_tokens = self._resolve_max_tokens(max_tokens, message)
+            state_key = build_state_key(messages, user_profile, temperature, model, max_tokens)
+            scope = _generation_scope(model, temperature, max_tokens)
+            cached = self._get_cached(messages, state_key, scope)
+            if cached is not None:
+                yield from replay_stream(cached)
+                return
             
             # Stream response
             response = self.client.chat.completions.create(
-                model=self.groq_model,
+                model=model,
                 messages=messages,
                 temperature=temperature,
-                max_tokens=self.max_tokens,
+                max_tokens=max_tokens,
+                stop=STOP_SEQUENCES,
                 stream=True
             )
             
+            last_flush = time.monotonic()
             for chunk in response:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
+                choice = chunk.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                content = choice.delta.content
+                if content is None:
+                    continue
+                collected.append(content)
+                pending_chars += len(content)
+                now = time.monotonic()
+                if pending_chars >= STREAM_FLUSH_CHARS or now - last_flush >= STREAM_FLUSH_INTERVAL:
+                    yield "".join(collected[flushed:])
+                    flushed, pending_chars, last_flush = len(collected), 0, now
+            
+            if flushed < len(collected):
+                yield "".join(collected[flushed:])
+                flushed = len(collected)
+            
+            if defer is not None:
+                defer(self._store_cached, messages, state_key, scope, "".join(collected), finish_reason)
+            else:
+                self._store_cached(messages, state_key, scope, "".join(collected), finish_reason)
                     
         except Exception as e:
             logger.error(f"Error streaming message: {e}")
+            if flushed < len(collected):
+                yield "".join(collected[flushed:])
+            yield f"Erreur: {str(e)}"
+    
+    async def astream_message(self,
+                              message: str,
+                              conversation_history: List[Dict[str, str]] = None,
+                              temperature: float = 0.7,
+                              session_id: str = None,
+                              user_profile: Optional[Dict[str, Any]] = None,
+                              model: Optional[str] = None,
+                              max_tokens: Optional[int] = None,
+                              defer: Optional[Callable[..., Any]] = None) -> AsyncGenerator[str, None]:
+        """
+        Async version of stream_message, iterating the Groq stream on the event loop
+        (same arguments)
+        """
+        # Deltas received so far; collected[flushed:] is buffered, not yet sent
+        collected: List[str] = []
+        flushed = pending_chars = 0
+        finish_reason = None
+        try:
+            if not self.async_client:
+                fallback = self._fallback_response(message, session_id)
+                for word in fallback["response"].split():
+                    yield word + " "
+                return
+            
+            messages = self._build_messages(message, conversation_history)
+            model = model or self.groq_model
+            temperature = self._effective_temperature(temperature)
+            max_tokens = self._resolve_max_tokens(max_tokens, message)
+            state_key = build_state_key(messages, user_profile, temperature, model, max_tokens)
+            scope = _generation_scope(model, temperature, max_tokens)
+            cached = await self._aget_cached(messages, state_key, scope)
+            if cached is not None:
+                for piece in replay_stream(cached):
+                    yield piece
+                return
+            
+            response = await self.async_client.chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stop=STOP_SEQUENCES,
+                stream=True
+            )
+            
+            last_flush = time.monotonic()
+            async for chunk in response:
+                choice = chunk.choices[0]
+                finish_reason = choice.finish_reason or finish_reason
+                content = choice.delta.content
+                if content is None:
+                    continue
+                collected.append(content)
+                pending_chars += len(content)
+                now = time.monotonic()
+                if pending_chars >= STREAM_FLUSH_CHARS or now - last_flush >= STREAM_FLUSH_INTERVAL:
+                    yield "".join(collected[flushed:])
+                    flushed, pending_chars, last_flush = len(collected), 0, now
+            
+            if flushed < len(collected):
+                yield "".join(collected[flushed:])
+                flushed = len(collected)
+            
+            if defer is not None:
+                defer(self._store_cached, messages, state_key, scope, "".join(collected), finish_reason)
+            else:
+                await asyncio.get_running_loop().run_in_executor(
+                    _POOL, self._store_cached, messages, state_key, scope, "".join(collected), finish_reason
+                )
+        
+        except Exception as e:
+            logger.error(f"Error streaming message: {e}")
+            if flushed < len(collected):
+                yield "".join(collected[flushed:])
             yield f"Erreur: {str(e)}"
     
+    def _build_messages(self, message: str, conversation_history: Optional[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """
+        Build the Groq message list: system prompt, previous turns, current message.
+        Turns are reduced to role + normalized content (no timestamps or client metadata),
+        so the same conversation always serializes to the same byte prefix; only the most
+        recent turns fitting in HISTORY_TOKEN_BUDGET are kept, then repeated assistant
+        paragraphs are deduplicated within that window.
+        """
+        messages = [_SYSTEM_MESSAGE]
+        if conversation_history:
+            messages.extend(_dedupe_blocks(_trim_history(
+                [
+                    {"role": turn["role"], "content": _normalize_whitespace(turn["content"])}
+                    for turn in conversation_history
+                ],
+                HISTORY_TOKEN_BUDGET
+            )))
+        messages.append({"role": "user", "content": message})
+        return messages
+    
+    @staticmethod
+    def _effective_temperature(temperature: float) -> float:
+        """Snap near-deterministic temperatures to 0"""
+        return 0.0 if temperature < DETERMINISTIC_TEMPERATURE else temperature
+    
+    def _success_response(self, response_text: str, session_id: str, model: str, cache_hit: bool = False) -> Dict[str, Any]:
+        """Result dict for a generated or cached answer"""
+        stats = {"groq_model_used": model}
+        if model in MODEL_TIERS:
+            stats["model_tier"] = MODEL_TIERS[model]
+        if cache_hit:
+            stats["cache_hit"] = True
+        return {
+            "status": "success",
+            "response": response_text,
+            "session_id": session_id,
+            "recommendations": self._extract_recommendations(response_text),
+            "rag_available": False,
+            "stats": stats
+        }
+    
+    def _error_response(self, error: Exception, session_id: str) -> Dict[str, Any]:
+        """Result dict for a failed call"""
+        return {
+            "status": "error",
+            "response": f"Désolé, une erreur s'est produite: {str(error)}",
+            "session_id": session_id,
+            "error": str(error)
+        }
+    
+    def _resolve_max_tokens(self, max_tokens: Optional[int], message: str) -> int:
+        """Requested completion budget (estimated from the message if unset), bounded by the configured ceiling"""
+        return min(max_tokens or _estimate_max_tokens(message), self.max_tokens)
+    
+    def _get_cached(self, messages: List[Dict[str, str]], state_key: str, scope: str) -> Optional[str]:
+        """
+        Look up a cached answer: in-memory tiers first, then the persistent state cache
+        (scope: see _generation_scope)
+        """
+        if not self.cache_enabled:
+            return None
+        
+        cached = self.response_cache.get(messages, scope=scope)
+        if cached is None:
+            cached = self.persistent_cache.get(state_key)
+            if cached is not None:
+                # Promote to the in-memory tiers for the next hit
+                self.response_cache.set(messages, cached, scope=scope)
+        return cached
+    
+    async def _aget_cached(self, messages: List[Dict[str, str]], state_key: str, scope: str) -> Optional[str]:
+        """_get_cached from the async paths, run in _POOL"""
+        if not self.cache_enabled:
+            return None
+        return await asyncio.get_running_loop().run_in_executor(_POOL, self._get_cached, messages, state_key, scope)
+    
+    def _store_cached(self, messages: List[Dict[str, str]], state_key: str, scope: str,
+                      response_text: str, finish_reason: Optional[str] = None) -> None:
+        """Store a complete answer in every cache tier (answers cut off by max_tokens are not cached)"""
+        if not self.cache_enabled or not response_text or finish_reason == "length":
+            return
+        
+        self.response_cache.set(messages, response_text, scope=scope)
+        self.persistent_cache.set(state_key, response_text)
+    
+    def _build_embed_fn(self):
+        """Build a lazy sentence-transformers encoder for the semantic cache tier, if installed"""
+        try:
+            import sentence_transformers  # noqa: F401
+        except ImportError:
+            logger.info("sentence-transformers not installed - semantic cache tier disabled")
+            return None
+        
+        model_name = _EMBEDDING_MODEL
+        encoder = {}
+        
+        def embed(text: str):
+            # Load the model on first use only, so startup stays lightweight
+            if "model" not in encoder:
+                from sentence_transformers import SentenceTransformer
+                encoder["model"] = SentenceTransformer(model_name)
+            return encoder["model"].encode(text, normalize_embeddings=True)
+        
+        return embed
+    
     def _get_system_prompt(self) -> str:
         """Get the system prompt for OrientaBot"""
-        return """Tu es Dr. Karima Benjelloun, conseillère d'orientation expérimentée spécialisée dans le système éducatif marocain.
-
-**Ton expertise couvre:**
-- Les écoles d'ingénieurs (ENSA, EMSI, ISPITS, etc.)
-- Les seuils d'admission et critères de sélection
-- Les filières d'études et débouchés professionnels
-- L'orientation post-bac au Maroc
-- Les carrières dans l'IA, l'informatique et l'ingénierie
-
-**Pour les questions sur les seuils d'admission:**
-- ENSA: Généralement entre 16-18/20 selon les spécialités et concours
-- EMSI: Environ 12-14/20 pour la plupart des filières
-- ISPITS: Environ 14-16/20 selon les programmes
-
-**Ton approche:**
-1. Analyse le profil de l'étudiant (filière, moyenne, intérêts)
-2. Fournis des conseils personnalisés et pratiques
-3. Suggère des alternatives et plans B
-4. Encourage et rassure tout en restant réaliste
-
-Réponds en français avec empathie, expertise et des conseils concrets adaptés au système éducatif marocain."""
+        return _SYSTEM_PROMPT
     
     def _fallback_response(self, message: str, session_id: str) -> Dict[str, Any]:
         """Fallback response when Groq API is not available"""
         
-        # Simple pattern matching for common questions
-        message_lower = message.lower()
-        
-        if "seuil" in message_lower and "ensa" in message_lower:
-            response = """🎓 **Seuils d'admission ENSA (École Nationale des Sciences Appliquées)**
-
-Les seuils ENSA varient selon:
-- **La ville/école**: ENSA Agadir, El Jadida, Fès, Marrakech, etc.
-- **La spécialité**: Informatique, Génie Civil, Électronique, etc.
-- **L'année**: Les seuils évoluent chaque année
-
-**Seuils indicatifs 2023-2024:**
-- **Général**: 16-18/20 selon les spécialités
-- **Informatique/IA**: Souvent 17-18/20 (très demandé)
-- **Génie Civil**: 16-17/20
-- **Électronique**: 16.5-17.5/20
-
-**Avec votre moyenne de 15/20:**
-- C'est en dessous des seuils ENSA habituels
-- Concentrez-vous sur améliorer vos notes en terminale
-- Considérez aussi EMSI, ISPITS comme alternatives excellentes
-- Préparez bien le concours national si applicable
-
-⚠️ *Vérifiez les seuils officiels sur les sites des écoles*"""
-        
-        elif "ia" in message_lower or "intelligence artificielle" in message_lower:
-            response = """🤖 **Devenir Ingénieur en IA au Maroc**
-
-**Écoles recommandées pour l'IA:**
-1. **ENSA** - Génie Informatique/Télécoms (seuil ~17-18/20)
-2. **EMSI** - Intelligence Artificielle (seuil ~14/20)
-3. **ISPITS** - Data Science et IA (seuil ~15/20)
-4. **Université Hassan II** - Master IA (après licence)
-
-**Avec SM-B et 15/20:**
-- ✅ **EMSI**: Excellente option, programmes IA solides
-- ✅ **ISPITS**: Bons programmes, seuil accessible
-- 🎯 **Objectif**: Améliorer à 16-17/20 pour plus d'options
-- 📚 **Conseils**: Renforcez maths/physique, apprenez Python
-
-**Plan d'action:**
-1. Travaillez pour atteindre 16/20 minimum
-2. Explorez EMSI et ISPITS dès maintenant
-3. Développez des projets perso en IA
-4. Préparez-vous aux entretiens techniques"""
+        # Simple pattern matching for common questions (one case-insensitive regex pass)
+        match = _FALLBACK_TRIGGERS.search(message)
+        trigger = match.lastgroup if match else None
         
+        if trigger == "ensa":
+            response = _FALLBACK_ENSA
+        elif trigger == "ia":
+            response = _FALLBACK_IA
         else:
-            response = f"""👋 Bonjour ! Je suis Dr. Karima Benjelloun, votre conseillère d'orientation.
-
-J'ai bien reçu votre question: "{message}"
-
-Pour vous donner les meilleurs conseils, j'aimerais en savoir plus sur:
-- 📚 Votre filière actuelle et vos résultats
-- 🎯 Vos objectifs de carrière
-- ❤️ Vos passions et centres d'intérêt
-- 🏛️ Les écoles qui vous intéressent
-
-*Note: Pour des conseils plus précis, assurez-vous que l'API Groq est configurée avec une vraie clé.*"""
+            response = _FALLBACK_DEFAULT_TEMPLATE.format(message=message)
         
         return {
             "status": "success",
@@ -243,18 +731,13 @@ Pour vous donner les meilleurs conseils, j'aimerais en savoir plus sur:
     
     def _extract_recommendations(self, response_text: str) -> Optional[Dict[str, Any]]:
         """Extract structured recommendations from response"""
-        try:
-            # Simple extraction - could be enhanced
-            recommendations = {}
-            
-            if "ENSA" in response_text:
-                recommendations["ecoles_recommandees"] = ["ENSA"]
-            if "EMSI" in response_text:
-                recommendations.setdefault("ecoles_recommandees", []).append("EMSI")
-            if "ISPITS" in response_text:
-                recommendations.setdefault("ecoles_recommandees", []).append("ISPITS")
-                
-            return recommendations if recommendations else None
-            
-        except Exception:
-            return None
\ No newline at end of file
+        # One C-level pass over the text; whole words only, so ENSAM does not count as ENSA
+        hits = set(_SCHOOL_RE.findall(response_text))
+        if not hits:
+            return None
+        return {"ecoles_recommandees": [school for school in SCHOOLS if school in hits]}
+
+@lru_cache(maxsize=1)
+def get_handler() -> SimpleChatHandler:
+    """Process-wide handler: Groq clients, caches and embedding model are built only once"""
+    return SimpleChatHandler()
@@ -1,12 +1,22 @@
 """
 Module chat - Gestion des conversations
 Contient la logique de traitement des conversations et les prompts systeme
+
+Imports paresseux (PEP 562): chaque nom n'importe son module qu'au premier accès,
+le gestionnaire enrichi (RAG, embeddings) n'est donc chargé que s'il est utilisé
 """
 
-from .handler import ChatHandler
-from .enhanced_handler import EnhancedChatHandler
-from .prompts import get_system_prompt, get_conversation_starters, get_tips_sidebar
-from .enhanced_prompts import get_enhanced_system_prompt
+import importlib
+
+# Nom exporté -> module qui le définit
+_LAZY = {
+    'ChatHandler': '.handler',
+    'EnhancedChatHandler': '.enhanced_handler',
+    'get_system_prompt': '.prompts',
+    'get_conversation_starters': '.prompts',
+    'get_tips_sidebar': '.prompts',
+    'get_enhanced_system_prompt': '.enhanced_prompts'
+}
 
 __all__ = [
     'ChatHandler', 
@@ -15,4 +25,17 @@ __all__ = [
     'get_conversation_starters', 
     'get_tips_sidebar',
     'get_enhanced_system_prompt'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+    # Mis en cache dans le module: les accès suivants ne repassent plus par __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
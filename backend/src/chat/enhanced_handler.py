@@ -10,18 +10,28 @@ Adapté pour fonctionner sans Streamlit
 
 import json
 import re
+import asyncio
 import logging
-from groq import Groq
-from typing import List, Dict, Optional, Any, Generator
+import os
+from array import array
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cache, cached_property, lru_cache
+from itertools import accumulate
+from groq import Groq, AsyncGroq
+from typing import List, Dict, Optional, Any, AsyncGenerator, Callable, Generator, Sequence, Tuple
+from dataclasses import asdict, dataclass, field
 
 # Import des modules de base
+from ..core.http import get_shared_http_client, get_shared_async_http_client
 from ..core.config import GROQ_API_KEY, GROQ_MODEL, MAX_TOKENS
 from ..core.contextual_memory import get_contextual_memory_system, get_user_context_for_prompt
+from ..core.response_cache import ResponseCache, build_state_key, replay_stream
+from ..core.embedding_cache import chunk_embedding_cache
 
 # Import des modules d'amélioration
-from ..chat.enhanced_prompts import get_enhanced_system_prompt, detect_user_profiles, classify_user_question
+from ..chat.enhanced_prompts import build_enhanced_system_prompt, detect_user_profiles, classify_user_question
 from ..rag.hybrid_search import create_hybrid_search_engine, SearchMode, HybridSearchEngine
-from ..rag.semantic_processor import SemanticDocumentProcessor, convert_to_document_chunk
 
 # Import RAG de base
 try:
@@ -32,6 +42,192 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Cache sémantique des réponses: similarité minimale d'un hit et capacité
+RESPONSE_CACHE_THRESHOLD = 0.92
+RESPONSE_CACHE_SIZE = 5000
+
+# Décodeur JSON réutilisé pour extraire le bloc ```json des réponses
+_JSON_DECODER = json.JSONDecoder()
+_JSON_FENCE = "```json"
+_CLOSING_FENCE_RE = re.compile(r"\s*```")
+
+# Contexte RAG: en-tête et bloc par résultat (source, scores, mots-clés, type, contenu)
+_CONTEXT_HEADER = (
+    "## CONTEXTE SPÉCIALISÉ - SYSTÈME RAG AVANCÉ AVEC RECHERCHE HYBRIDE\n"
+    "*Recherche vectorielle + mots-clés + boost contextuel*\n\n"
+)
+_CONTEXT_CHUNK_TEMPLATE = (
+    "\n**[{source} - Page {page}]**\n"
+    "*Score: V:{vector:.2f} + K:{keyword:.2f} = H:{hybrid:.2f}*{keywords}{content_type}\n\n"
+    "{content}\n"
+)
+
+# Prompt augmenté: base + préambule + contexte + instructions (parties fixes construites une fois)
+_RAG_PREAMBLE = "\n\n# MODE RAG AVANCÉ ACTIVÉ - RECHERCHE HYBRIDE\n\n"
+_RAG_INSTRUCTIONS = (
+    "\n\n## INSTRUCTIONS SPÉCIALISÉES:\n"
+    "- Tu as accès à des informations OFFICIELLES via un système RAG avancé avec recherche hybride\n"
+    "- Les scores indiquent la pertinence: Vectorielle (sémantique) + Mots-clés (factuelle) + Hybride (combiné)\n"
+    "- Les mots-clés matchés montrent les termes exacts trouvés dans les documents\n"
+    "- PRIORITÉ: Utilise ces informations spécialisées avant tes connaissances générales\n"
+    "- Cite toujours les sources en mentionnant le score de pertinence\n"
+    "- Si les informations hybrides ne couvrent pas la question, complète avec tes connaissances générales\n"
+    "- Mentionne le type de recherche utilisé (vectorielle/mots-clés/hybride) dans ta réponse\n\n"
+    "## SCORING HYBRIDE:\n"
+    "- **Score Vectoriel**: Similarité sémantique (0-1)\n"
+    "- **Score Mots-clés**: Correspondance factuelle TF-IDF (0-1)  \n"
+    "- **Score Hybride**: Combinaison pondérée avec boost contextuel\n\n"
+)
+_NO_CONTEXT_NOTICE = (
+    "\n\n# MODE CONNAISSANCES GÉNÉRALES\n"
+    "*Aucune information spécialisée trouvée dans la base de données pour cette requête*\n\n"
+    "Tu réponds avec tes connaissances générales du système éducatif marocain en précisant que:\n"
+    "- Ces informations sont basées sur tes connaissances générales\n"
+    "- Il est recommandé de vérifier sur les sites officiels des établissements\n"
+    "- Pour des conseils plus précis, l'utilisateur peut fournir des documents spécifiques\n\n"
+)
+
+# Historique de conversation d'une requête, figé (voir _freeze_history)
+History = Tuple[Dict[str, str], ...]
+
+# Augmentation RAG: nombre de résultats recherchés et taille maximale du contexte injecté
+RAG_TOP_K = 5
+RAG_MAX_CONTEXT_SIZE = 3000
+
+# Pool de la recherche hybride lancée dès la réception de la question, pendant que le
+# prompt système (profils, persona, mémoire) est construit
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("RAG_SEARCH_WORKERS", "8")),
+                                  thread_name_prefix="rag-search")
+
+# Compteurs de réponses: index fixes dans un array (pas de hachage de clé par incrément)
+_STAT_NAMES = ('total_responses', 'enhanced_prompts_used', 'rag_responses', 'hybrid_search_used', 'memory_context_used')
+_STAT_TOTAL, _STAT_ENHANCED, _STAT_RAG, _STAT_HYBRID, _STAT_MEMORY = range(len(_STAT_NAMES))
+
+# Champs du profil qui changent à chaque échange, exclus de la clé de cache
+_PROFILE_VOLATILE_FIELDS = ('creation_date', 'derniere_mise_a_jour', 'nombre_conversations')
+
+@cache
+def _get_semantic_processor():
+    """Processeur sémantique partagé par tous les gestionnaires, importé et créé au premier usage"""
+    from ..rag.semantic_processor import SemanticDocumentProcessor
+    return SemanticDocumentProcessor()
+
+@cache
+def _get_groq_client(api_key: str) -> Groq:
+    """Client Groq bloquant partagé (pool synchrone du processus)"""
+    return Groq(api_key=api_key, http_client=get_shared_http_client())
+
+@cache
+def _get_async_groq_client(api_key: str) -> AsyncGroq:
+    """Client Groq asynchrone partagé (pool asynchrone du processus)"""
+    return AsyncGroq(api_key=api_key, http_client=get_shared_async_http_client())
+
+@lru_cache(maxsize=4096)
+def _classify_cached(prompt: str) -> str:
+    """classify_user_question mémoïsé (fonction pure du message)"""
+    return classify_user_question(prompt)
+
+@lru_cache(maxsize=2048)
+def _detect_profiles_cached(prompt: str, recent_user_messages: tuple) -> tuple:
+    """detect_user_profiles mémoïsé sur le message et les messages utilisateur récents"""
+    history = [{"role": "user", "content": content} for content in recent_user_messages]
+    return tuple(detect_user_profiles(prompt, history))
+
+@lru_cache(maxsize=1024)
+def _cached_hybrid_search(engine: HybridSearchEngine, query: str, top_k: int, mode: SearchMode) -> tuple:
+    """
+    Résultats de recherche hybride mémoïsés par moteur, requête, top_k et mode (les résultats
+    sont partagés: lecture seule); vidé à la réinitialisation du RAG
+    """
+    return tuple(engine.search(query, top_k=top_k, mode=mode))
+
+def _freeze_history(conversation_history: Optional[Sequence[Dict[str, str]]]) -> History:
+    """
+    Historique figé en tuple une fois par requête: les messages Groq, la clé du cache et la
+    détection de profils partagent les mêmes tours, sans copie de liste intermédiaire
+    """
+    if isinstance(conversation_history, tuple):
+        return conversation_history
+    return tuple(conversation_history) if conversation_history else ()
+
+def _detect_profiles(prompt: str, conversation_history: History) -> List[str]:
+    """Profils détectés; la détection ne lit que les messages utilisateur des 3 derniers tours"""
+    recent = tuple(msg.get('content', '') for msg in conversation_history[-3:] if msg.get('role') == 'user')
+    return list(_detect_profiles_cached(prompt, recent))
+
+@dataclass
+class _PreparedChat:
+    """Échange préparé: tout ce qui précède l'appel à Groq"""
+    topic: str
+    cache_messages: List[Dict[str, str]]
+    cached: Optional[str] = None
+    detected_profiles: Any = None
+    search_info: Dict[str, Any] = field(default_factory=dict)
+    messages: List[Dict[str, str]] = field(default_factory=list)
+
+@dataclass(slots=True)
+class SearchResultView:
+    """Résultat de search_knowledge (sérialisable tel quel par FastAPI/orjson)"""
+    content: str
+    source: str
+    page_number: int
+    vector_score: float
+    keyword_score: float
+    hybrid_score: float
+    matched_keywords: tuple
+    relevance_factors: Dict[str, float]
+    chunk_id: Optional[str]
+    confidence: str
+    
+    @classmethod
+    def from_result(cls, result: Any) -> "SearchResultView":
+        chunk = result.chunk
+        hybrid_score = float(result.hybrid_score)
+        return cls(
+            content=chunk.content,
+            source=chunk.source,
+            page_number=chunk.page_number,
+            vector_score=float(result.vector_score),
+            keyword_score=float(result.keyword_score),
+            hybrid_score=hybrid_score,
+            matched_keywords=tuple(result.matched_keywords),
+            relevance_factors=result.relevance_factors,
+            chunk_id=getattr(chunk, 'chunk_id', None),
+            confidence="Haute" if hybrid_score > 0.8 else "Moyenne" if hybrid_score > 0.6 else "Faible"
+        )
+
+@dataclass(slots=True)
+class SearchResultPreview:
+    """Résultat résumé de get_enhanced_search_info (aperçu du contenu limité à 200 caractères)"""
+    source: str
+    page: int
+    vector_score: float
+    keyword_score: float
+    hybrid_score: float
+    matched_keywords: tuple
+    content_preview: str
+    relevance_factors: Dict[str, float]
+    
+    @classmethod
+    def from_result(cls, result: Any) -> "SearchResultPreview":
+        chunk = result.chunk
+        content = chunk.content
+        return cls(
+            source=chunk.source,
+            page=chunk.page_number,
+            vector_score=float(result.vector_score),
+            keyword_score=float(result.keyword_score),
+            hybrid_score=float(result.hybrid_score),
+            matched_keywords=tuple(result.matched_keywords),
+            content_preview=content[:200] + "..." if len(content) > 200 else content,
+            relevance_factors=result.relevance_factors
+        )
+
+async def _areplay_stream(answer: str) -> AsyncGenerator[str, None]:
+    """replay_stream pour les appelants asynchrones"""
+    for piece in replay_stream(answer):
+        yield piece
+
 class EnhancedChatHandler:
     """Chat handler avec toutes les améliorations intégrées (Backend API)"""
     
@@ -40,14 +236,13 @@ class EnhancedChatHandler:
         if not GROQ_API_KEY:
             raise ValueError("GROQ_API_KEY manquant. Configurez votre .env file avec votre clé API Groq.")
         
-        self.client = Groq(api_key=GROQ_API_KEY)
+        # Client asynchrone sur le pool de connexions partagé du processus (keep-alive, HTTP/2),
+        # commun à tous les gestionnaires
+        self.async_client = _get_async_groq_client(GROQ_API_KEY)
         
         # Système de mémoire contextuelle
         self.memory_system = get_contextual_memory_system()
         
-        # Processeur sémantique pour le chunking avancé
-        self.semantic_processor = SemanticDocumentProcessor()
-        
         # Système RAG et recherche hybride
         self.rag_manager = None
         self.hybrid_search_engine: Optional[HybridSearchEngine] = None
@@ -59,14 +254,18 @@ class EnhancedChatHandler:
         if RAG_AVAILABLE:
             self._initialize_enhanced_rag()
         
+        # Cache des réponses: exact + sémantique (embeddings du modèle de la base vectorielle)
+        self.response_cache = ResponseCache(
+            max_entries=RESPONSE_CACHE_SIZE,
+            similarity_threshold=RESPONSE_CACHE_THRESHOLD,
+            embed_fn=self._embed_query if self.rag_initialized else None
+        )
+        
         # Statistiques et métriques
-        self.response_stats = {
-            'total_responses': 0,
-            'enhanced_prompts_used': 0,
-            'rag_responses': 0,
-            'hybrid_search_used': 0,
-            'memory_context_used': 0
-        }
+        self._stats = array('Q', [0] * len(_STAT_NAMES))
+        
+        # Augmentation RAG spécialisée pour les bornes fixes du handler
+        self._augment = self._make_augmenter(RAG_TOP_K, RAG_MAX_CONTEXT_SIZE)
         
         logger.info("EnhancedChatHandler initialisé avec toutes les améliorations")
     
@@ -75,6 +274,8 @@ class EnhancedChatHandler:
         try:
             logger.info("🚀 Initialisation du système RAG avancé...")
             self.rag_manager = RAGManager()
+            # Chunks inchangés depuis la dernière construction: embeddings repris du cache disque
+            self.rag_manager.vector_store.embedding_cache = chunk_embedding_cache(self.rag_manager.vector_store)
             
             # Initialiser la base de connaissances avec chunking sémantique
             success = self.rag_manager.initialize_knowledge_base()
@@ -85,16 +286,17 @@ class EnhancedChatHandler:
                 
                 self.rag_initialized = True
                 
-                # Logger les statistiques
-                stats = self.rag_manager.get_stats()
-                search_stats = self.hybrid_search_engine.get_search_stats()
-                
-                logger.info(f"""✅ Système RAG Avancé Activé:
-                - Base vectorielle: {stats['vector_store_stats']['total_chunks']} chunks sémantiques
-                - Sources: {stats['pdf_files_count']} documents analysés  
-                - Index mots-clés: {search_stats['keyword_index_terms']} termes indexés
-                - Recherche hybride: Vectorielle + Mots-clés + Boost contextuel
-                """)
+                # Logger les statistiques (collectées seulement si le niveau INFO est actif)
+                if logger.isEnabledFor(logging.INFO):
+                    stats = self.rag_manager.get_stats()
+                    search_stats = self.hybrid_search_engine.get_search_stats()
+                    
+                    logger.info(f"""✅ Système RAG Avancé Activé:
+                    - Base vectorielle: {stats['vector_store_stats']['total_chunks']} chunks sémantiques
+                    - Sources: {stats['pdf_files_count']} documents analysés  
+                    - Index mots-clés: {search_stats['keyword_index_terms']} termes indexés
+                    - Recherche hybride: Vectorielle + Mots-clés + Boost contextuel
+                    """)
             else:
                 logger.warning("⚠️ Échec de l'initialisation RAG - Mode connaissances générales")
                 self.rag_manager = None
@@ -110,7 +312,7 @@ class EnhancedChatHandler:
                           prompt: str, 
                           base_system_prompt: str, 
                           temperature: float,
-                          conversation_history: List[Dict[str, str]] = None,
+                          conversation_history: Optional[Sequence[Dict[str, str]]] = None,
                           session_id: Optional[str] = None,
                           stream: bool = False) -> Dict[str, Any]:
         """
@@ -127,239 +329,339 @@ class EnhancedChatHandler:
         Returns:
             Dictionnaire avec la réponse et les métadonnées
         """
-        if conversation_history is None:
-            conversation_history = []
+        conversation_history = _freeze_history(conversation_history)
         
         try:
-            # Incrémenter les statistiques
-            self.response_stats['total_responses'] += 1
+            chat = self._prepare_chat(prompt, base_system_prompt, conversation_history, session_id)
+            if chat.cached is not None:
+                return self._cached_result(chat.cached, prompt, chat.topic, session_id, stream)
             
-            # Charger le profil utilisateur
-            user_profile = self.memory_system.load_user_profile(session_id=session_id)
-            
-            # Démarrer ou continuer la session de conversation
-            if self.memory_system.current_session is None:
-                topic = classify_user_question(prompt)
-                self.memory_system.start_conversation_session(topic, session_id=session_id)
-            
-            # Détecter les profils utilisateur depuis le prompt
-            detected_profiles = detect_user_profiles(prompt, conversation_history)
-            logger.info(f"Profils détectés: {detected_profiles}")
+            # Générer la réponse
+            if stream:
+                return self._stream_result(chat, self._stream_response(chat.messages, temperature, chat.cache_messages))
             
-            # Générer le prompt système enrichi
-            enhanced_system_prompt = get_enhanced_system_prompt(
-                prompt, 
-                conversation_history, 
-                base_system_prompt
+            response = self._generate_enhanced_response(chat.messages, temperature, chat.cache_messages)
+            return self._complete_result(chat, prompt, session_id, response)
+                
+        except Exception as e:
+            return self._error_result(e)
+    
+    async def aprocess_chat_input(self,
+                                  prompt: str,
+                                  base_system_prompt: str,
+                                  temperature: float,
+                                  conversation_history: Optional[Sequence[Dict[str, str]]] = None,
+                                  session_id: Optional[str] = None,
+                                  stream: bool = False) -> Dict[str, Any]:
+        """
+        Version asynchrone de process_chat_input (mêmes arguments et résultat): Groq est
+        attendu sur la boucle d'événements via le pool HTTP partagé; en streaming, "generator"
+        est un générateur asynchrone
+        """
+        conversation_history = _freeze_history(conversation_history)
+        
+        try:
+            # Profil, mémoire et recherche hybride: E/S et calcul bloquants, hors de la boucle
+            chat = await asyncio.to_thread(
+                self._prepare_chat, prompt, base_system_prompt, conversation_history, session_id
             )
-            self.response_stats['enhanced_prompts_used'] += 1
-            
-            # Ajouter le contexte de mémoire utilisateur
-            memory_context = get_user_context_for_prompt(session_id)
-            if memory_context:
-                enhanced_system_prompt += memory_context
-                self.response_stats['memory_context_used'] += 1
-            
-            # Augmenter le prompt avec RAG avancé si disponible
-            search_info = {}
-            if self.rag_initialized and self.hybrid_search_engine:
-                enhanced_system_prompt, search_info = self._augment_with_hybrid_search(
-                    prompt, enhanced_system_prompt
+            if chat.cached is not None:
+                return await asyncio.to_thread(
+                    self._cached_result, chat.cached, prompt, chat.topic, session_id, stream, _areplay_stream
                 )
-                self.response_stats['hybrid_search_used'] += 1
-            
-            # Préparer les messages
-            messages = [{"role": "system", "content": enhanced_system_prompt}]
-            messages.extend(conversation_history)
-            messages.append({"role": "user", "content": prompt})
             
-            # Générer la réponse
             if stream:
-                response_generator = self._stream_response(messages, temperature)
-                
-                return {
-                    "type": "stream",
-                    "generator": response_generator,
-                    "detected_profiles": detected_profiles,
-                    "search_info": search_info,
-                    "rag_available": self.rag_initialized,
-                    "stats": self._get_current_stats()
-                }
-            else:
-                response = self._generate_enhanced_response(messages, temperature)
-                
-                # Ajouter le turn à la mémoire contextuelle
-                self.memory_system.add_conversation_turn(
-                    user_message=prompt,
-                    assistant_response=response,
-                    detected_intent=classify_user_question(prompt),
-                    session_id=session_id
-                )
-                
-                # Extraire les recommandations structurées
-                recommendations = self._extract_json_recommendations(response)
-                
-                return {
-                    "type": "complete",
-                    "response": response,
-                    "recommendations": recommendations,
-                    "detected_profiles": detected_profiles,
-                    "search_info": search_info,
-                    "rag_available": self.rag_initialized,
-                    "stats": self._get_current_stats(),
-                    "message_count": len(messages)
-                }
-                
+                return self._stream_result(chat, self._astream_response(chat.messages, temperature, chat.cache_messages))
+            
+            response = await self._agenerate_enhanced_response(chat.messages, temperature, chat.cache_messages)
+            return await asyncio.to_thread(self._complete_result, chat, prompt, session_id, response)
+        
         except Exception as e:
-            logger.error(f"Erreur lors du traitement enrichi: {e}")
+            return self._error_result(e)
+    
+    def _prepare_chat(self,
+                      prompt: str,
+                      base_system_prompt: str,
+                      conversation_history: History,
+                      session_id: Optional[str]) -> _PreparedChat:
+        """Tout ce qui précède l'appel à Groq: profil, session, cache, prompt enrichi, recherche"""
+        # Incrémenter les statistiques
+        self._stats[_STAT_TOTAL] += 1
+        
+        # Charger le profil utilisateur
+        user_profile = self.memory_system.load_user_profile(session_id=session_id)
+        
+        # Démarrer ou continuer la session de conversation
+        topic = _classify_cached(prompt)
+        if self.memory_system.current_session is None:
+            self.memory_system.start_conversation_session(topic, session_id=session_id)
+        
+        # Cache des réponses: même sujet, même profil, question proche dans le même contexte
+        cache_messages = self._cache_messages(prompt, topic, user_profile, conversation_history)
+        cached = self.response_cache.get(cache_messages)
+        if cached is not None:
+            return _PreparedChat(topic=topic, cache_messages=cache_messages, cached=cached)
+        
+        # La recherche ne dépend que de la question: lancée maintenant, attendue au moment
+        # d'augmenter le prompt
+        pending_search = None
+        if self.rag_initialized and self.hybrid_search_engine:
+            pending_search = _SEARCH_POOL.submit(
+                _cached_hybrid_search, self.hybrid_search_engine, prompt, RAG_TOP_K, SearchMode.AUTO
+            )
+        
+        # Détecter les profils utilisateur depuis le prompt
+        detected_profiles = _detect_profiles(prompt, conversation_history)
+        logger.info("Profils détectés: %s", detected_profiles)
+        
+        # Générer le prompt système enrichi (bloc persona mis en cache par profil et type de question)
+        enhanced_system_prompt = build_enhanced_system_prompt(
+            base_system_prompt,
+            tuple(detected_profiles),
+            topic
+        )
+        self._stats[_STAT_ENHANCED] += 1
+        
+        # Ajouter le contexte de mémoire utilisateur
+        memory_context = get_user_context_for_prompt(session_id)
+        if memory_context:
+            enhanced_system_prompt += memory_context
+            self._stats[_STAT_MEMORY] += 1
+        
+        # Augmenter le prompt avec RAG avancé si disponible
+        search_info = {}
+        if pending_search is not None:
+            enhanced_system_prompt, search_info = self._augment(
+                prompt, enhanced_system_prompt, pending_search
+            )
+            self._stats[_STAT_HYBRID] += 1
+        
+        # Préparer les messages: liste allouée à sa taille finale (pas de réallocation
+        # pendant la copie d'un long historique)
+        n = len(conversation_history)
+        messages: List[Dict[str, str]] = [None] * (n + 2)
+        messages[0] = {"role": "system", "content": enhanced_system_prompt}
+        messages[1:n + 1] = conversation_history
+        messages[n + 1] = {"role": "user", "content": prompt}
+        
+        return _PreparedChat(
+            topic=topic,
+            cache_messages=cache_messages,
+            detected_profiles=detected_profiles,
+            search_info=search_info,
+            messages=messages
+        )
+    
+    def _stream_result(self, chat: _PreparedChat, generator: Any) -> Dict[str, Any]:
+        """Résultat d'un échange en streaming"""
+        return {
+            "type": "stream",
+            "generator": generator,
+            "detected_profiles": chat.detected_profiles,
+            "search_info": chat.search_info,
+            "rag_available": self.rag_initialized,
+            "stats": self._get_current_stats()
+        }
+    
+    def _complete_result(self, chat: _PreparedChat, prompt: str,
+                         session_id: Optional[str], response: str) -> Dict[str, Any]:
+        """Enregistre l'échange en mémoire et construit le résultat complet"""
+        # Ajouter le turn à la mémoire contextuelle
+        self.memory_system.add_conversation_turn(
+            user_message=prompt,
+            assistant_response=response,
+            detected_intent=chat.topic,
+            session_id=session_id
+        )
+        
+        # Extraire les recommandations structurées
+        recommendations = self._extract_json_recommendations(response)
+        
+        return {
+            "type": "complete",
+            "response": response,
+            "recommendations": recommendations,
+            "detected_profiles": chat.detected_profiles,
+            "search_info": chat.search_info,
+            "rag_available": self.rag_initialized,
+            "stats": self._get_current_stats(),
+            "message_count": len(chat.messages)
+        }
+    
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        """Résultat d'un échange en erreur"""
+        logger.error(f"Erreur lors du traitement enrichi: {error}")
+        return {
+            "type": "error",
+            "error": str(error),
+            "rag_available": self.rag_initialized,
+            "stats": self._get_current_stats()
+        }
+    
+    def _cache_messages(self, prompt: str, topic: str, user_profile: Any,
+                        conversation_history: History) -> List[Dict[str, str]]:
+        """Messages servant de clé au cache: sujet + empreinte du profil, historique, question"""
+        profile = {key: value for key, value in asdict(user_profile).items()
+                   if key not in _PROFILE_VOLATILE_FIELDS} if user_profile else {}
+        scope = f"{topic}:{build_state_key([], profile)}"
+        return [{"role": "system", "content": scope}, *conversation_history, {"role": "user", "content": prompt}]
+    
+    @cached_property
+    def client(self) -> Groq:
+        """Client Groq bloquant des méthodes synchrones, créé au premier usage"""
+        return _get_groq_client(GROQ_API_KEY)
+    
+    @property
+    def response_stats(self) -> Dict[str, int]:
+        """Vue dict des compteurs de réponses, construite à la demande"""
+        return dict(zip(_STAT_NAMES, self._stats))
+    
+    @cached_property
+    def semantic_processor(self):
+        """Processeur sémantique pour le chunking avancé (instance partagée, créée au premier accès)"""
+        return _get_semantic_processor()
+    
+    def _cached_result(self, response: str, prompt: str, topic: str,
+                       session_id: Optional[str], stream: bool, replay=replay_stream) -> Dict[str, Any]:
+        """Résultat construit depuis une réponse en cache (sans appel à Groq)"""
+        if stream:
             return {
-                "type": "error",
-                "error": str(e),
+                "type": "stream",
+                "generator": replay(response),
+                "cache_hit": True,
                 "rag_available": self.rag_initialized,
                 "stats": self._get_current_stats()
             }
+        
+        self.memory_system.add_conversation_turn(
+            user_message=prompt,
+            assistant_response=response,
+            detected_intent=topic,
+            session_id=session_id
+        )
+        return {
+            "type": "complete",
+            "response": response,
+            "recommendations": self._extract_json_recommendations(response),
+            "cache_hit": True,
+            "rag_available": self.rag_initialized,
+            "stats": self._get_current_stats()
+        }
+    
+    def _embed_query(self, text: str):
+        """Embedding d'une question avec le modèle de la base vectorielle"""
+        return self.rag_manager.vector_store.create_embeddings([text], show_progress_bar=False)[0]
     
     def _augment_with_hybrid_search(self, user_query: str, base_prompt: str) -> tuple[str, Dict[str, Any]]:
         """Augmente le prompt avec la recherche hybride avancée"""
-        search_info = {
-            "search_performed": False,
-            "results_found": 0,
-            "search_mode": None,
-            "query_type": None,
-            "results": []
-        }
+        return self._augment(user_query, base_prompt)
+    
+    def _make_augmenter(self, top_k: int, max_context_size: int) -> Callable[..., tuple[str, Dict[str, Any]]]:
+        """
+        Fonction d'augmentation spécialisée pour un top_k et une taille de contexte fixés à la
+        construction: bornes, mode de recherche et en-tête du contexte sont figés dans la fermeture.
+        Elle accepte une recherche déjà lancée (Future de _cached_hybrid_search avec ce top_k).
+        """
+        context_prefix = _RAG_PREAMBLE + _CONTEXT_HEADER
+        format_chunk = self._format_context_chunk
+        no_context = self._add_no_context_notice
         
-        try:
-            # Effectuer la recherche hybride
-            search_results = self.hybrid_search_engine.search(
-                user_query, 
-                top_k=5, 
-                mode=SearchMode.AUTO
-            )
-            
-            # Informations sur le type de recherche
-            query_type = self.hybrid_search_engine.detect_query_type(user_query)
-            search_mode = self.hybrid_search_engine.select_search_mode(user_query, query_type)
-            
-            search_info.update({
-                "search_performed": True,
-                "query_type": query_type.value,
-                "search_mode": search_mode.value
-            })
-            
-            if not search_results:
-                logger.info("Aucun résultat de recherche hybride")
-                return self._add_no_context_notice(base_prompt), search_info
-            
-            search_info["results_found"] = len(search_results)
-            
-            # Construire le contexte enrichi
-            context_parts = []
-            total_length = 0
-            max_context_size = 3000
+        def augment(user_query: str, base_prompt: str,
+                    pending: Optional[Future] = None) -> tuple[str, Dict[str, Any]]:
+            search_info = {
+                "search_performed": False,
+                "results_found": 0,
+                "search_mode": None,
+                "query_type": None,
+                "results": []
+            }
             
-            for result in search_results:
-                chunk = result.chunk
+            try:
+                # Effectuer (ou attendre) la recherche hybride
+                engine = self.hybrid_search_engine
+                if pending is not None:
+                    search_results = pending.result()
+                else:
+                    search_results = _cached_hybrid_search(engine, user_query, top_k, SearchMode.AUTO)
                 
-                # Informations sur la source et le score
-                source_info = f"**[{chunk.source} - Page {chunk.page_number}]**"
+                # Informations sur le type de recherche
+                query_type = engine.detect_query_type(user_query)
+                search_mode = engine.select_search_mode(user_query, query_type)
                 
-                # Informations sur le scoring hybride
-                score_info = f"*Score: V:{result.vector_score:.2f} + K:{result.keyword_score:.2f} = H:{result.hybrid_score:.2f}*"
+                search_info["search_performed"] = True
+                search_info["query_type"] = query_type.value
+                search_info["search_mode"] = search_mode.value
                 
-                # Mots-clés matchés
-                keywords_info = ""
-                if result.matched_keywords:
-                    keywords_info = f" | Mots-clés: {', '.join(result.matched_keywords[:3])}"
+                if not search_results:
+                    logger.info("Aucun résultat de recherche hybride")
+                    return no_context(base_prompt), search_info
                 
-                # Type de contenu si disponible
-                content_info = ""
-                if hasattr(chunk, 'metadata') and chunk.metadata.get('content_type'):
-                    content_info = f" | Type: {chunk.metadata['content_type']}"
+                search_info["results_found"] = len(search_results)
                 
-                chunk_text = f"""
-{source_info}
-{score_info}{keywords_info}{content_info}
-
-{chunk.content}
-"""
+                # Plus long préfixe de blocs tenant dans max_context_size: au plus top_k
+                # longueurs, une somme cumulée et une recherche dichotomique suffisent
+                chunk_texts = [format_chunk(result) for result in search_results]
+                cutoff = bisect_right(list(accumulate(map(len, chunk_texts))), max_context_size)
+                context_parts = chunk_texts[:cutoff]
                 
-                if total_length + len(chunk_text) > max_context_size:
-                    break
+                # Ajouter aux résultats pour l'info (scores numpy laissés tels quels: la couche
+                # API les sérialise nativement avec orjson)
+                search_info["results"] = [
+                    {
+                        "source": result.chunk.source,
+                        "page": result.chunk.page_number,
+                        "vector_score": result.vector_score,
+                        "keyword_score": result.keyword_score,
+                        "hybrid_score": result.hybrid_score,
+                        "matched_keywords": result.matched_keywords,
+                        "content_preview": result.chunk.content[:200] + "..." if len(result.chunk.content) > 200 else result.chunk.content,
+                        "relevance_factors": result.relevance_factors
+                    }
+                    for result in search_results[:cutoff]
+                ]
                 
-                context_parts.append(chunk_text)
-                total_length += len(chunk_text)
+                if not context_parts:
+                    return no_context(base_prompt), search_info
                 
-                # Ajouter aux résultats pour l'info
-                search_info["results"].append({
-                    "source": chunk.source,
-                    "page": chunk.page_number,
-                    "vector_score": float(result.vector_score),
-                    "keyword_score": float(result.keyword_score),
-                    "hybrid_score": float(result.hybrid_score),
-                    "matched_keywords": result.matched_keywords,
-                    "content_preview": chunk.content[:200] + "..." if len(chunk.content) > 200 else chunk.content,
-                    "relevance_factors": result.relevance_factors
-                })
-            
-            if not context_parts:
-                return self._add_no_context_notice(base_prompt), search_info
-            
-            # Construire le prompt augmenté
-            enhanced_context = "## CONTEXTE SPÉCIALISÉ - SYSTÈME RAG AVANCÉ AVEC RECHERCHE HYBRIDE\n"
-            enhanced_context += f"*Recherche vectorielle + mots-clés + boost contextuel*\n\n"
-            
-            for part in context_parts:
-                enhanced_context += part
-            
-            augmented_prompt = f"""{base_prompt}
-
-# MODE RAG AVANCÉ ACTIVÉ - RECHERCHE HYBRIDE
-
-{enhanced_context}
-
-## INSTRUCTIONS SPÉCIALISÉES:
-- Tu as accès à des informations OFFICIELLES via un système RAG avancé avec recherche hybride
-- Les scores indiquent la pertinence: Vectorielle (sémantique) + Mots-clés (factuelle) + Hybride (combiné)
-- Les mots-clés matchés montrent les termes exacts trouvés dans les documents
-- PRIORITÉ: Utilise ces informations spécialisées avant tes connaissances générales
-- Cite toujours les sources en mentionnant le score de pertinence
-- Si les informations hybrides ne couvrent pas la question, complète avec tes connaissances générales
-- Mentionne le type de recherche utilisé (vectorielle/mots-clés/hybride) dans ta réponse
-
-## SCORING HYBRIDE:
-- **Score Vectoriel**: Similarité sémantique (0-1)
-- **Score Mots-clés**: Correspondance factuelle TF-IDF (0-1)  
-- **Score Hybride**: Combinaison pondérée avec boost contextuel
-
-"""
-            
-            logger.info(f"✅ Prompt augmenté avec recherche hybride: {len(context_parts)} résultats")
-            self.response_stats['rag_responses'] += 1
-            
-            return augmented_prompt, search_info
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de l'augmentation hybride: {e}")
-            search_info["error"] = str(e)
-            return self._add_no_context_notice(base_prompt), search_info
+                # Construire le prompt augmenté
+                augmented_prompt = "".join((base_prompt, context_prefix, *context_parts, _RAG_INSTRUCTIONS))
+                
+                logger.info("✅ Prompt augmenté avec recherche hybride: %d résultats", len(context_parts))
+                self._stats[_STAT_RAG] += 1
+                
+                return augmented_prompt, search_info
+                
+            except Exception as e:
+                logger.error(f"Erreur lors de l'augmentation hybride: {e}")
+                search_info["error"] = str(e)
+                return no_context(base_prompt), search_info
+        
+        return augment
+    
+    def _format_context_chunk(self, result: Any) -> str:
+        """Bloc de contexte d'un résultat: source, scores, mots-clés, type, contenu"""
+        chunk = result.chunk
+        content_type = chunk.metadata.get('content_type') if getattr(chunk, 'metadata', None) else None
+        
+        # Un seul formatage par bloc (pas de chaînes intermédiaires par ligne)
+        return _CONTEXT_CHUNK_TEMPLATE.format(
+            source=chunk.source,
+            page=chunk.page_number,
+            vector=result.vector_score,
+            keyword=result.keyword_score,
+            hybrid=result.hybrid_score,
+            keywords=f" | Mots-clés: {', '.join(result.matched_keywords[:3])}" if result.matched_keywords else "",
+            content_type=f" | Type: {content_type}" if content_type else "",
+            content=chunk.content
+        )
     
     def _add_no_context_notice(self, base_prompt: str) -> str:
         """Ajoute une notice quand aucun contexte spécialisé n'est disponible"""
-        return f"""{base_prompt}
-
-# MODE CONNAISSANCES GÉNÉRALES
-*Aucune information spécialisée trouvée dans la base de données pour cette requête*
-
-Tu réponds avec tes connaissances générales du système éducatif marocain en précisant que:
-- Ces informations sont basées sur tes connaissances générales
-- Il est recommandé de vérifier sur les sites officiels des établissements
-- Pour des conseils plus précis, l'utilisateur peut fournir des documents spécifiques
-
-"""
+        return base_prompt + _NO_CONTEXT_NOTICE
     
-    def _generate_enhanced_response(self, messages: List[Dict[str, str]], temperature: float) -> str:
-        """Génère une réponse complète avec gestion d'erreurs avancée"""
+    def _generate_enhanced_response(self, messages: List[Dict[str, str]], temperature: float,
+                                    cache_messages: Optional[List[Dict[str, str]]] = None) -> str:
+        """Génère une réponse complète avec gestion d'erreurs avancée (mise en cache si `cache_messages`)"""
         try:
             response = self.client.chat.completions.create(
                 model=GROQ_MODEL,
@@ -369,15 +671,20 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
                 stream=False,
             )
             
-            return response.choices[0].message.content
+            answer = response.choices[0].message.content
+            if cache_messages is not None:
+                self.response_cache.set(cache_messages, answer)
+            return answer
             
         except Exception as e:
             error_msg = f"Erreur lors de la génération: {str(e)}"
             logger.error(error_msg)
             return error_msg
     
-    def _stream_response(self, messages: List[Dict[str, str]], temperature: float) -> Generator[str, None, None]:
-        """Stream la réponse depuis l'API Groq"""
+    def _stream_response(self, messages: List[Dict[str, str]], temperature: float,
+                         cache_messages: Optional[List[Dict[str, str]]] = None) -> Generator[str, None, None]:
+        """Stream la réponse depuis l'API Groq (réponse complète mise en cache si `cache_messages`)"""
+        collected = []
         try:
             response = self.client.chat.completions.create(
                 model=GROQ_MODEL,
@@ -389,20 +696,82 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
             
             for chunk in response:
                 if chunk.choices[0].delta.content is not None:
+                    collected.append(chunk.choices[0].delta.content)
                     yield chunk.choices[0].delta.content
+            
+            if cache_messages is not None:
+                self.response_cache.set(cache_messages, "".join(collected))
                     
         except Exception as e:
             yield f"Erreur API: {str(e)}"
     
+    async def _agenerate_enhanced_response(self, messages: List[Dict[str, str]], temperature: float,
+                                           cache_messages: Optional[List[Dict[str, str]]] = None) -> str:
+        """Version asynchrone de _generate_enhanced_response"""
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=MAX_TOKENS,
+                stream=False,
+            )
+            
+            answer = response.choices[0].message.content
+            if cache_messages is not None:
+                # Encodage de la question pour le niveau sémantique: hors de la boucle
+                await asyncio.to_thread(self.response_cache.set, cache_messages, answer)
+            return answer
+            
+        except Exception as e:
+            error_msg = f"Erreur lors de la génération: {str(e)}"
+            logger.error(error_msg)
+            return error_msg
+    
+    async def _astream_response(self, messages: List[Dict[str, str]], temperature: float,
+                                cache_messages: Optional[List[Dict[str, str]]] = None) -> AsyncGenerator[str, None]:
+        """Version asynchrone de _stream_response"""
+        collected = []
+        try:
+            response = await self.async_client.chat.completions.create(
+                model=GROQ_MODEL,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=MAX_TOKENS,
+                stream=True,
+            )
+            
+            async for chunk in response:
+                if chunk.choices[0].delta.content is not None:
+                    collected.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+            
+            if cache_messages is not None:
+                await asyncio.to_thread(self.response_cache.set, cache_messages, "".join(collected))
+        
+        except Exception as e:
+            yield f"Erreur API: {str(e)}"
+    
     def _extract_json_recommendations(self, text: str) -> Optional[Dict]:
-        """Extrait les recommandations JSON si présentes"""
-        pattern = r"```json\s*(\{.*?\})\s*```"
-        match = re.search(pattern, text, flags=re.DOTALL)
-        if match:
-            try:
-                return json.loads(match.group(1))
-            except json.JSONDecodeError:
-                pass
+        """
+        Extrait les recommandations JSON si présentes.
+        Parcours linéaire: recherche du bloc ```json puis décodage de l'objet à partir de
+        son accolade ouvrante (raw_decode s'arrête à l'accolade fermante correspondante)
+        """
+        start = text.find(_JSON_FENCE)
+        while start >= 0:
+            body = start + len(_JSON_FENCE)
+            brace = text.find("{", body)
+            if brace < 0:
+                return None
+            if brace == body or text[body:brace].isspace():
+                try:
+                    result, end = _JSON_DECODER.raw_decode(text, brace)
+                except json.JSONDecodeError:
+                    result = None
+                if isinstance(result, dict) and _CLOSING_FENCE_RE.match(text, end):
+                    return result
+            start = text.find(_JSON_FENCE, body)
         return None
     
     def get_enhanced_search_info(self, user_query: str) -> Dict[str, Any]:
@@ -412,7 +781,7 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
             
         try:
             # Obtenir les résultats de recherche pour analyse
-            search_results = self.hybrid_search_engine.search(user_query, top_k=3)
+            search_results = _cached_hybrid_search(self.hybrid_search_engine, user_query, 3, SearchMode.AUTO)
             
             # Type de recherche utilisé
             query_type = self.hybrid_search_engine.detect_query_type(user_query)
@@ -423,19 +792,7 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
                 "query_type": query_type.value,
                 "search_mode": search_mode.value,
                 "results_count": len(search_results),
-                "results": [
-                    {
-                        "source": result.chunk.source,
-                        "page": result.chunk.page_number,
-                        "vector_score": float(result.vector_score),
-                        "keyword_score": float(result.keyword_score),
-                        "hybrid_score": float(result.hybrid_score),
-                        "matched_keywords": result.matched_keywords,
-                        "content_preview": result.chunk.content[:200] + "..." if len(result.chunk.content) > 200 else result.chunk.content,
-                        "relevance_factors": result.relevance_factors
-                    }
-                    for result in search_results
-                ]
+                "results": [SearchResultPreview.from_result(result) for result in search_results]
             }
                     
         except Exception as e:
@@ -457,6 +814,8 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
             'response_stats': self.response_stats,
         }
         
+        base_stats['response_cache_stats'] = dict(self.response_cache.stats)
+        
         # Stats de mémoire contextuelle
         if self.memory_system:
             base_stats['memory_stats'] = self.memory_system.get_memory_stats()
@@ -480,11 +839,11 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
             'session_id': self.memory_system.current_session.session_id,
             'start_time': self.memory_system.current_session.start_time,
             'total_turns': len(self.memory_system.current_session.turns),
-            'user_profile': self.memory_system.current_profile.__dict__ if self.memory_system.current_profile else None,
+            'user_profile': asdict(self.memory_system.current_profile) if self.memory_system.current_profile else None,
             'stats': self.get_enhanced_stats()
         }
     
-    def search_knowledge(self, query: str, top_k: int = 5, mode: str = "auto") -> List[Dict[str, Any]]:
+    def search_knowledge(self, query: str, top_k: int = 5, mode: str = "auto") -> List[SearchResultView]:
         """
         Effectue une recherche directe dans la base de connaissances
         
@@ -494,7 +853,7 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
             mode: Mode de recherche
             
         Returns:
-            Liste des résultats avec métadonnées complètes
+            Liste des résultats (SearchResultView) avec métadonnées complètes
         """
         if not self.hybrid_search_engine:
             return []
@@ -508,25 +867,9 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
             elif mode.lower() == "hybrid":
                 search_mode = SearchMode.HYBRID
             
-            search_results = self.hybrid_search_engine.search(query, top_k=top_k, mode=search_mode)
+            search_results = _cached_hybrid_search(self.hybrid_search_engine, query, top_k, search_mode)
             
-            return [
-                {
-                    "content": result.chunk.content,
-                    "source": result.chunk.source,
-                    "page_number": result.chunk.page_number,
-                    "vector_score": float(result.vector_score),
-                    "keyword_score": float(result.keyword_score),
-                    "hybrid_score": float(result.hybrid_score),
-                    "matched_keywords": result.matched_keywords,
-                    "relevance_factors": result.relevance_factors,
-                    "metadata": {
-                        "chunk_id": getattr(result.chunk, 'chunk_id', None),
-                        "confidence": "Haute" if result.hybrid_score > 0.8 else "Moyenne" if result.hybrid_score > 0.6 else "Faible"
-                    }
-                }
-                for result in search_results
-            ]
+            return [SearchResultView.from_result(result) for result in search_results]
             
         except Exception as e:
             logger.error(f"Erreur lors de la recherche: {e}")
@@ -540,6 +883,8 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
         """Réinitialise le système RAG"""
         try:
             if RAG_AVAILABLE:
+                # Résultats calculés sur l'ancien index: périmés
+                _cached_hybrid_search.cache_clear()
                 self._initialize_enhanced_rag()
                 return self.rag_initialized
             return False
@@ -3,8 +3,9 @@ Prompts système enrichis avec personas spécialisés et templates de réponses
 Amélioration majeure du système de prompts d'OrientaBot
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from enum import Enum
+from functools import lru_cache
 import re
 from datetime import datetime
 
@@ -195,16 +196,13 @@ class EnhancedPromptSystem:
         student_profiles = self.detect_student_profile(user_input, chat_history)
         question_type = self.classify_question_type(user_input)
         
-        # Construction du prompt enrichi
-        enhanced_prompt = self._build_enhanced_prompt(
-            base_prompt, 
-            student_profiles, 
+        # Construction du prompt enrichi (ne dépend que du profil, du type et de la période)
+        return _cached_enhanced_prompt(
+            base_prompt,
+            tuple(student_profiles),
             question_type,
-            user_input,
-            chat_history
+            self.current_period
         )
-        
-        return enhanced_prompt
     
     def _build_enhanced_prompt(self, 
                               base_prompt: str, 
@@ -537,7 +535,40 @@ Chaque étudiant est unique. En 15 ans d'expérience, j'ai vu des profils très
 leur orientation en suivant une approche méthodique et personnalisée.
         """
 
+@lru_cache(maxsize=256)
+def _cached_enhanced_prompt(base_prompt: str,
+                            profiles: Tuple[StudentProfile, ...],
+                            question_type: QuestionType,
+                            period: str) -> str:
+    """
+    Prompt enrichi mémoïsé: il ne dépend que du prompt de base, des profils, du type de
+    question et de la période (incluse dans la clé pour changer de contexte temporel)
+    """
+    prompt_system = EnhancedPromptSystem()
+    prompt_system.current_period = period
+    return prompt_system._build_enhanced_prompt(base_prompt, list(profiles), question_type, "", [])
+
 # Fonctions utilitaires pour l'intégration
+def build_enhanced_system_prompt(base_prompt: str, profiles: Tuple[str, ...], question_type: str) -> str:
+    """
+    Prompt système enrichi à partir du profil et du type de question déjà détectés
+    (valeurs de detect_user_profiles / classify_user_question), sans nouvelle détection
+    
+    Args:
+        base_prompt: Prompt système de base
+        profiles: Profils détectés
+        question_type: Type de question
+        
+    Returns:
+        Prompt système enrichi et personnalisé
+    """
+    return _cached_enhanced_prompt(
+        base_prompt,
+        tuple(StudentProfile(profile) for profile in profiles),
+        QuestionType(question_type),
+        EnhancedPromptSystem().current_period
+    )
+
 def get_enhanced_system_prompt(user_input: str, chat_history: List[Dict], base_prompt: str) -> str:
     """
     Point d'entrée principal pour générer un prompt système enrichi
@@ -19,6 +19,12 @@ except ImportError as e:
     logger = logging.getLogger(__name__)
     logger.warning(f"RAG components not available: {e}")
 
+# ```json block holding the recommendations, compiled once
+_JSON_BLOCK_RE = re.compile(r"```json\s*(\{.*?\})\s*```", re.DOTALL)
+
+# Number of sources reported in context_info (the best of the search results used for the prompt)
+CONTEXT_INFO_SOURCES = 3
+
 class ChatHandler:
     def __init__(self):
         """Initialize the chat handler with Groq client and RAG manager"""
@@ -72,8 +78,7 @@ class ChatHandler:
     
     def extract_json_recommendations(self, text: str) -> Optional[Dict[str, Any]]:
         """Extract JSON recommendations if present"""
-        pattern = r"```json\s*(\{.*?\})\s*```"
-        match = re.search(pattern, text, flags=re.DOTALL)
+        match = _JSON_BLOCK_RE.search(text)
         if match:
             try:
                 return json.loads(match.group(1))
@@ -104,8 +109,11 @@ class ChatHandler:
             conversation_history = []
         
         try:
+            # Single RAG pass: the same search results feed the prompt and the context info
+            search_results, context, rag_error = self._retrieve(prompt)
+            
             # Augment the system prompt with RAG if available
-            augmented_prompt = self._get_augmented_prompt(prompt, system_prompt)
+            augmented_prompt = self._get_augmented_prompt(system_prompt, search_results, context)
             
             # Prepare messages for API
             messages = [{"role": "system", "content": augmented_prompt}]
@@ -113,7 +121,7 @@ class ChatHandler:
             messages.append({"role": "user", "content": prompt})
             
             # Get context info if RAG is available
-            context_info = self._get_context_info(prompt)
+            context_info = self._get_context_info(search_results, rag_error)
             
             if stream:
                 # Return generator for streaming
@@ -174,17 +182,34 @@ class ChatHandler:
             self.rag_manager = None
             self.rag_initialized = False
     
-    def _get_augmented_prompt(self, user_query: str, base_prompt: str) -> str:
+    def _retrieve(self, user_query: str) -> Tuple[Optional[List[Tuple[Any, float]]], Optional[str], Optional[str]]:
+        """
+        Run the RAG search once for this turn
+        
+        Returns:
+            (search results or None if RAG is unavailable or failed, formatted context, error message)
+        """
+        if not (self.rag_manager and self.rag_initialized):
+            return None, None, None
+        try:
+            search_results, context = self.rag_manager.retrieve(user_query)
+            return search_results, context, None
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche de contexte: {e}")
+            return None, None, str(e)
+    
+    def _get_augmented_prompt(self, base_prompt: str,
+                              search_results: Optional[List[Tuple[Any, float]]],
+                              context: Optional[str]) -> str:
         """Get augmented prompt with RAG context or fallback to base prompt"""
-        if self.rag_manager and self.rag_initialized:
-            try:
-                return self.rag_manager.augment_prompt(user_query, base_prompt)
-            except Exception as e:
-                logger.error(f"Erreur lors de l'augmentation du prompt: {e}")
-                # Fallback to base prompt
-                return self._add_fallback_notice(base_prompt)
-        else:
-            # No RAG available - use base prompt with notice
+        if search_results is None:
+            # No RAG available (or the search failed) - use base prompt with notice
+            return self._add_fallback_notice(base_prompt)
+        try:
+            return self.rag_manager.build_augmented_prompt(base_prompt, context)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'augmentation du prompt: {e}")
+            # Fallback to base prompt
             return self._add_fallback_notice(base_prompt)
     
     def _add_fallback_notice(self, base_prompt: str) -> str:
@@ -200,37 +225,29 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
 - Les étudiants peuvent fournir des documents spécifiques pour des conseils plus précis
 """
     
-    def _get_context_info(self, user_query: str) -> Dict[str, Any]:
-        """Get context information including RAG search results"""
+    def _get_context_info(self, search_results: Optional[List[Tuple[Any, float]]],
+                          rag_error: Optional[str] = None) -> Dict[str, Any]:
+        """Format context information from this turn's RAG search results (top 3 sources)"""
         context_info = {
             "rag_available": self.rag_initialized,
             "sources_used": [],
             "search_performed": False
         }
         
-        if self.rag_manager and self.rag_initialized:
-            try:
-                search_results = self.rag_manager.search_knowledge(user_query, top_k=3)
-                
-                if search_results:
-                    context_info["search_performed"] = True
-                    context_info["sources_used"] = [
-                        {
-                            "source": chunk.source,
-                            "page_number": chunk.page_number,
-                            "confidence": "Haute" if score > 0.8 else "Moyenne" if score > 0.6 else "Faible",
-                            "score": float(score),
-                            "excerpt": chunk.content[:200] + "..." if len(chunk.content) > 200 else chunk.content
-                        }
-                        for chunk, score in search_results
-                    ]
-                else:
-                    context_info["search_performed"] = True
-                    context_info["sources_used"] = []
-                    
-            except Exception as e:
-                logger.error(f"Erreur lors de la recherche de contexte: {e}")
-                context_info["error"] = str(e)
+        if rag_error is not None:
+            context_info["error"] = rag_error
+        elif search_results is not None:
+            context_info["search_performed"] = True
+            context_info["sources_used"] = [
+                {
+                    "source": chunk.source,
+                    "page_number": chunk.page_number,
+                    "confidence": "Haute" if score > 0.8 else "Moyenne" if score > 0.6 else "Faible",
+                    "score": float(score),
+                    "excerpt": chunk.content[:200] + "..." if len(chunk.content) > 200 else chunk.content
+                }
+                for chunk, score in search_results[:CONTEXT_INFO_SOURCES]
+            ]
         
         return context_info
     
@@ -8,6 +8,13 @@ load_dotenv()
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama3-70b-8192")
 
+# Model tiers: short reassurance turns go to the fast model, full recommendations to the large one
+# (GROQ_MODEL unless GROQ_MODEL_BALANCED overrides it)
+SPEED_MAP = {
+    "instant": os.getenv("GROQ_MODEL_INSTANT", "llama-3.1-8b-instant"),
+    "balanced": os.getenv("GROQ_MODEL_BALANCED") or GROQ_MODEL,
+}
+
 # App configuration
 APP_TITLE = "OrientaBot - Conseiller d'orientation"
 APP_ICON = "🎓"
@@ -4,8 +4,8 @@ Gère le profil utilisateur persistant et l'historique des conversations
 Adapté pour fonctionner sans Streamlit
 """
 
-import json
 import logging
+import orjson
 from pathlib import Path
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field, asdict
@@ -42,7 +42,7 @@ class PersonalityTrait(Enum):
     SOCIAL = "social"                      # Orienté relations
     INDEPENDENT = "independant"            # Esprit d'indépendance
 
-@dataclass
+@dataclass(slots=True)
 class StudentProfile:
     """Profil complet de l'étudiant"""
     # Informations académiques
@@ -81,7 +81,7 @@ class StudentProfile:
     derniere_mise_a_jour: str = field(default_factory=lambda: datetime.now().isoformat())
     nombre_conversations: int = 0
 
-@dataclass
+@dataclass(slots=True)
 class ConversationTurn:
     """Un échange dans la conversation"""
     timestamp: str
@@ -91,7 +91,7 @@ class ConversationTurn:
     extracted_info: Dict[str, Any] = field(default_factory=dict)
     user_satisfaction: Optional[int] = None  # 1-5 si feedback donné
     
-@dataclass
+@dataclass(slots=True)
 class ConversationSession:
     """Session de conversation complète"""
     session_id: str
@@ -350,8 +350,7 @@ class ContextualMemorySystem:
         
         if profile_path.exists():
             try:
-                with open(profile_path, 'r', encoding='utf-8') as f:
-                    profile_data = json.load(f)
+                profile_data = orjson.loads(profile_path.read_bytes())
                 
                 # Convertir back les enums
                 if profile_data.get('filiere'):
@@ -411,8 +410,7 @@ class ContextualMemorySystem:
             # Mettre à jour la timestamp
             profile_data['derniere_mise_a_jour'] = datetime.now().isoformat()
             
-            with open(profile_path, 'w', encoding='utf-8') as f:
-                json.dump(profile_data, f, ensure_ascii=False, indent=2)
+            profile_path.write_bytes(orjson.dumps(profile_data, option=orjson.OPT_INDENT_2))
             
             logger.info(f"Profil utilisateur sauvegardé pour {user_id}")
             
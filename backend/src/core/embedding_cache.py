@@ -0,0 +1,168 @@
+"""
+Cache des embeddings de requêtes pour OrientaBot
+Deux niveaux: LRU en mémoire + diskcache (survit aux redémarrages, partagé entre workers)
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fonction d'encodage par lot: textes -> matrice d'embeddings (une ligne par texte)
+EncodeFunction = Callable[[List[str]], np.ndarray]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Forme canonique d'une requête (minuscules, espaces réduits) pour augmenter le taux de hit"""
+    return _WHITESPACE_RE.sub(" ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """
+    Cache d'embeddings indexé par le texte normalisé.
+
+    Les textes absents des deux niveaux sont encodés en un seul appel à `encode_fn`,
+    ce qui conserve le regroupement par lots de l'EmbeddingBatcher en amont.
+    """
+
+    def __init__(self,
+                 encode_fn: EncodeFunction,
+                 namespace: str,
+                 directory: Optional[str] = None,
+                 max_entries: int = 4096,
+                 size_limit: int = 2 ** 28,
+                 canonicalize: bool = True):
+        """
+        Args:
+            encode_fn: Fonction d'encodage par lot (modèle d'embeddings)
+            namespace: Identifiant du modèle, inclus dans les clés disque (pas de
+                vecteur périmé après un changement de modèle)
+            directory: Dossier du cache disque; si None, mémoire uniquement
+            max_entries: Nombre maximum d'embeddings conservés en mémoire
+            size_limit: Taille maximale du cache disque en octets (éviction LRU au-delà)
+            canonicalize: Normaliser les textes (requêtes); False pour indexer le contenu
+                exact (chunks de documents)
+        """
+        self.encode_fn = encode_fn
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.canonicalize = canonicalize
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+
+        if directory is not None:
+            try:
+                import diskcache
+                self._disk = diskcache.Cache(
+                    directory,
+                    size_limit=size_limit,
+                    eviction_policy="least-recently-used",
+                )
+            except ImportError:
+                logger.warning("diskcache non installé - cache des embeddings en mémoire uniquement")
+            except Exception as e:
+                logger.warning(f"Impossible d'ouvrir le cache disque {directory}: {e}")
+
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+
+    def encode(self, text: str) -> np.ndarray:
+        """Embedding d'un texte"""
+        return self.encode_many([text])[0]
+
+    def encode_many(self, texts: List[str]) -> List[np.ndarray]:
+        """Embeddings d'une liste de textes (un seul appel au modèle pour les absents)"""
+        normalized = [normalize_text(text) for text in texts] if self.canonicalize else list(texts)
+        vectors: List[Optional[np.ndarray]] = [self._lookup(text) for text in normalized]
+
+        missing = sorted({text for text, vector in zip(normalized, vectors) if vector is None})
+        if missing:
+            encoded = np.asarray(self.encode_fn(missing), dtype=np.float32)
+            fresh = {}
+            for text, row in zip(missing, encoded):
+                # Vecteur partagé entre requêtes: lecture seule
+                row = np.ascontiguousarray(row)
+                row.setflags(write=False)
+                fresh[text] = row
+                self._store(text, row)
+            vectors = [fresh[text] if vector is None else vector
+                       for text, vector in zip(normalized, vectors)]
+
+        with self._lock:
+            self.stats["misses"] += len(missing)
+        return vectors
+
+    def _key(self, text: str) -> str:
+        return hashlib.blake2b(f"{self.namespace}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, text: str) -> Optional[np.ndarray]:
+        """Cherche en mémoire puis sur disque (promu en mémoire)"""
+        with self._lock:
+            vector = self._memory.get(text)
+            if vector is not None:
+                self._memory.move_to_end(text)
+                self.stats["memory_hits"] += 1
+                return vector
+
+        if self._disk is None:
+            return None
+        try:
+            raw = self._disk.get(self._key(text))
+        except Exception as e:
+            logger.warning(f"Lecture du cache des embeddings impossible: {e}")
+            return None
+        if raw is None:
+            return None
+
+        vector = np.frombuffer(raw, dtype=np.float32)
+        self._remember(text, vector)
+        with self._lock:
+            self.stats["disk_hits"] += 1
+        return vector
+
+    def _store(self, text: str, vector: np.ndarray) -> None:
+        self._remember(text, vector)
+        if self._disk is None:
+            return
+        try:
+            self._disk.set(self._key(text), vector.tobytes())
+        except Exception as e:
+            logger.warning(f"Écriture du cache des embeddings impossible: {e}")
+
+    def _remember(self, text: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._memory[text] = vector
+            self._memory.move_to_end(text)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def clear(self) -> None:
+        """Vide les deux niveaux du cache"""
+        with self._lock:
+            self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+def chunk_embedding_cache(vector_store) -> EmbeddingCache:
+    """
+    Cache disque des embeddings de chunks d'une base vectorielle, indexé par le contenu exact:
+    une reconstruction de l'index ne réencode que les chunks nouveaux ou modifiés
+    """
+    return EmbeddingCache(
+        encode_fn=vector_store.create_embeddings,
+        namespace=vector_store.embedding_model_name,
+        directory=str(vector_store.vector_db_path / "embedding_cache"),
+        max_entries=0,
+        size_limit=2 ** 30,
+        canonicalize=False
+    )
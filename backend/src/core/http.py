@@ -0,0 +1,49 @@
+"""
+Pools de connexions HTTP partagés par tout le processus (Groq et autres services en aval)
+Créés au démarrage de l'application et fermés à l'arrêt (lifespan): aucune route ne doit
+ouvrir son propre httpx.AsyncClient, chaque client neuf repaie TCP + TLS
+"""
+import logging
+from functools import lru_cache
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+POOL_LIMITS = httpx.Limits(max_keepalive_connections=100, max_connections=200, keepalive_expiry=60.0)
+POOL_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+
+@lru_cache(maxsize=1)
+def get_shared_http_client() -> httpx.Client:
+    """Pool synchrone (client Groq synchrone), en HTTP/2 si h2 est installé"""
+    try:
+        return httpx.Client(http2=True, limits=POOL_LIMITS, timeout=POOL_TIMEOUT)
+    except ImportError:
+        logger.info("h2 non installé - pool de connexions en HTTP/1.1")
+        return httpx.Client(limits=POOL_LIMITS, timeout=POOL_TIMEOUT)
+
+
+@lru_cache(maxsize=1)
+def get_shared_async_http_client() -> httpx.AsyncClient:
+    """Pool asynchrone (AsyncGroq, appels des routes)"""
+    try:
+        return httpx.AsyncClient(http2=True, limits=POOL_LIMITS, timeout=POOL_TIMEOUT)
+    except ImportError:
+        return httpx.AsyncClient(limits=POOL_LIMITS, timeout=POOL_TIMEOUT)
+
+
+def open_shared_http_clients() -> None:
+    """Crée le pool asynchrone au démarrage plutôt qu'à la première requête
+    (le pool synchrone n'est ouvert que si un client bloquant est utilisé)"""
+    get_shared_async_http_client()
+
+
+async def close_shared_http_clients() -> None:
+    """Ferme les pools (arrêt de l'application)"""
+    if get_shared_async_http_client.cache_info().currsize:
+        await get_shared_async_http_client().aclose()
+        get_shared_async_http_client.cache_clear()
+    if get_shared_http_client.cache_info().currsize:
+        get_shared_http_client().close()
+        get_shared_http_client.cache_clear()
@@ -0,0 +1,75 @@
+"""
+Suivi des tâches de fond pour OrientaBot (API)
+Les enregistrements sont stockés sur disque (diskcache), partagés entre workers: l'URL de
+suivi renvoyée par un worker répond quel que soit le worker qui reçoit la requête.
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobStore:
+    """Enregistrements de tâches par identifiant, sur disque si possible, sinon en mémoire"""
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 max_jobs: int = 100,
+                 ttl: Optional[int] = 86400):
+        """
+        Args:
+            directory: Dossier du stockage disque (None = mémoire uniquement, un seul worker)
+            max_jobs: Nombre de tâches gardées en mémoire (les plus anciennes sont oubliées)
+            ttl: Durée de vie des tâches sur disque en secondes (None = pas d'expiration)
+        """
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+
+        if directory:
+            try:
+                import diskcache
+                self._disk = diskcache.Cache(directory)
+            except ImportError:
+                logger.warning("diskcache non installé - suivi des tâches limité à ce worker")
+            except Exception as e:
+                logger.warning(f"Impossible d'ouvrir le stockage des tâches {directory}: {e}")
+
+    def create(self, job_id: str, record: Dict[str, Any]) -> None:
+        """Enregistre une nouvelle tâche"""
+        if self._disk is not None:
+            self._disk.set(f"job:{job_id}", record, expire=self.ttl)
+            return
+        with self._lock:
+            self._jobs[job_id] = record
+            while len(self._jobs) > self.max_jobs:
+                self._jobs.popitem(last=False)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Enregistrement de la tâche, ou None si inconnue ou expirée"""
+        if self._disk is not None:
+            return self._disk.get(f"job:{job_id}")
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Met à jour des champs de la tâche (lecture-modification-écriture sous transaction)"""
+        if self._disk is not None:
+            key = f"job:{job_id}"
+            with self._disk.transact():
+                record = self._disk.get(key)
+                if record is not None:
+                    record.update(fields)
+                    self._disk.set(key, record, expire=self.ttl)
+            return
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is not None:
+                record.update(fields)
@@ -0,0 +1,314 @@
+"""
+Cache de réponses LLM pour OrientaBot
+Deux niveaux: correspondance exacte des messages + similarité sémantique de la dernière question
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Generator, List, Optional, Tuple
+
+import numpy as np
+import orjson
+
+logger = logging.getLogger(__name__)
+
+# Fonction d'encodage: texte -> vecteur (np.ndarray 1D)
+EmbedFunction = Callable[[str], np.ndarray]
+
+# JSON canonique des clés (orjson: UTF-8 compact, sans passer par json de la stdlib)
+_KEY_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+
+def hash_messages(messages: List[Dict[str, str]]) -> str:
+    """Clé exacte d'une liste de messages (JSON canonique haché en blake2b)"""
+    return hashlib.blake2b(orjson.dumps(messages, option=_KEY_OPTIONS)).hexdigest()
+
+
+def _scoped(key: str, scope: str) -> str:
+    """Clé restreinte à une portée (ex: modèle + paramètres de génération); inchangée sans portée"""
+    if not scope:
+        return key
+    return hashlib.blake2b(f"{scope}\0{key}".encode("utf-8")).hexdigest()
+
+
+def _split_messages(messages: List[Dict[str, str]],
+                    context_turns: Optional[int] = None) -> tuple[str, str]:
+    """
+    Sépare la dernière question utilisateur de son contexte.
+    Le contexte est la chaîne des `context_turns` derniers messages qui la précèdent
+    (tous si None), plus les messages système.
+    """
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i].get("role") == "user":
+            previous = messages[:i]
+            if context_turns is not None:
+                system = [m for m in previous if m.get("role") == "system"]
+                turns = [m for m in previous if m.get("role") != "system"]
+                previous = system + turns[max(0, len(turns) - context_turns):]
+            return messages[i].get("content", ""), hash_messages(previous)
+    return "", hash_messages(messages)
+
+
+def replay_stream(answer: str, chunk_size: int = 200) -> Generator[str, None, None]:
+    """Rejoue une réponse en cache morceau par morceau pour conserver l'UX de streaming"""
+    for start in range(0, len(answer), chunk_size):
+        yield answer[start:start + chunk_size]
+
+
+class ResponseCache:
+    """
+    Cache de réponses à deux niveaux:
+    - niveau exact: dictionnaire LRU indexé par le hash des messages
+    - niveau sémantique: matrice d'embeddings de la dernière question, comparée en cosinus
+
+    Le niveau sémantique n'est consulté que pour une même chaîne de contexte (derniers
+    messages précédents identiques), afin d'éviter de servir une réponse hors-sujet sur
+    une question de suivi.
+    """
+
+    def __init__(self,
+                 max_entries: int = 512,
+                 similarity_threshold: float = 0.92,
+                 embed_fn: Optional[EmbedFunction] = None,
+                 context_turns: Optional[int] = 4,
+                 ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: Nombre maximum de réponses conservées
+            similarity_threshold: Similarité cosinus minimale pour un hit sémantique
+            embed_fn: Fonction d'encodage; si None, seul le niveau exact est actif
+            context_turns: Nombre de messages précédents formant la chaîne de contexte
+                du niveau sémantique (None = tout l'historique)
+            ttl: Durée de vie des entrées en secondes (None = pas d'expiration)
+        """
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.embed_fn = embed_fn
+        self.context_turns = context_turns
+        self.ttl = ttl
+
+        # Réponse et instant d'expiration (time.monotonic)
+        self._exact: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Niveau sémantique: une ligne par entrée, normes précalculées
+        self._vectors: Optional[np.ndarray] = None
+        self._norms: Optional[np.ndarray] = None
+        self._expires: Optional[np.ndarray] = None
+        self._context_keys: List[str] = []
+        self._answers: List[str] = []
+
+        self.stats = {"exact_hits": 0, "semantic_hits": 0, "misses": 0}
+
+    def get(self, messages: List[Dict[str, str]],
+            vector: Optional[np.ndarray] = None,
+            scope: str = "") -> Optional[str]:
+        """
+        Retourne la réponse en cache pour ces messages, ou None
+        (`vector`: embedding déjà calculé de la dernière question, évite un encodage;
+        `scope`: portée de la réponse, ex: modèle, température et budget de tokens, incluse
+        dans la clé exacte comme dans la chaîne de contexte du niveau sémantique)
+        """
+        key = _scoped(hash_messages(messages), scope)
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is not None:
+                answer, expires = entry
+                if expires > time.monotonic():
+                    self._exact.move_to_end(key)
+                    self.stats["exact_hits"] += 1
+                    return answer
+                del self._exact[key]
+
+        answer = self._semantic_lookup(messages, vector, scope)
+        with self._lock:
+            if answer is not None:
+                self.stats["semantic_hits"] += 1
+            else:
+                self.stats["misses"] += 1
+        return answer
+
+    def set(self, messages: List[Dict[str, str]], answer: str,
+            vector: Optional[np.ndarray] = None,
+            scope: str = "") -> None:
+        """Enregistre une réponse complète dans les deux niveaux (`scope`: voir get)"""
+        if not answer:
+            return
+
+        key = _scoped(hash_messages(messages), scope)
+        with self._lock:
+            self._exact[key] = (answer, self._expiry())
+            self._exact.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+
+        self._semantic_insert(messages, answer, vector, scope)
+
+    def clear(self) -> None:
+        """Vide les deux niveaux du cache"""
+        with self._lock:
+            self._exact.clear()
+            self._vectors = None
+            self._norms = None
+            self._expires = None
+            self._context_keys = []
+            self._answers = []
+
+    def _expiry(self) -> float:
+        """Instant d'expiration d'une entrée insérée maintenant"""
+        return time.monotonic() + self.ttl if self.ttl is not None else math.inf
+
+    def _encode(self, text: str) -> Optional[np.ndarray]:
+        """Encode un texte, ou None si le niveau sémantique est indisponible"""
+        if self.embed_fn is None or not text.strip():
+            return None
+        try:
+            return np.asarray(self.embed_fn(text), dtype=np.float32).ravel()
+        except Exception as e:
+            logger.warning(f"Encodage pour le cache sémantique impossible: {e}")
+            return None
+
+    def _semantic_lookup(self, messages: List[Dict[str, str]],
+                         vector: Optional[np.ndarray] = None,
+                         scope: str = "") -> Optional[str]:
+        """Recherche une question proche dans le même contexte et la même portée"""
+        if self._vectors is None:
+            return None
+
+        question, context_key = _split_messages(messages, self.context_turns)
+        context_key = _scoped(context_key, scope)
+        query = self._encode(question) if vector is None else np.asarray(vector, dtype=np.float32).ravel()
+        if query is None:
+            return None
+
+        query_norm = float(np.linalg.norm(query)) or 1.0
+        with self._lock:
+            if self._vectors is None:
+                return None
+            sims = (self._vectors @ query) / (self._norms * query_norm)
+            # Ignorer les entrées d'un autre contexte et les entrées expirées
+            mask = np.fromiter((k == context_key for k in self._context_keys),
+                               dtype=bool, count=len(self._context_keys))
+            mask &= self._expires > time.monotonic()
+            sims = np.where(mask, sims, -1.0)
+            best = int(np.argmax(sims))
+            if sims[best] >= self.similarity_threshold:
+                return self._answers[best]
+        return None
+
+    def _semantic_insert(self, messages: List[Dict[str, str]], answer: str,
+                         vector: Optional[np.ndarray] = None,
+                         scope: str = "") -> None:
+        """Ajoute la dernière question et sa réponse au niveau sémantique"""
+        question, context_key = _split_messages(messages, self.context_turns)
+        context_key = _scoped(context_key, scope)
+        vector = self._encode(question) if vector is None else np.asarray(vector, dtype=np.float32).ravel()
+        if vector is None:
+            return
+
+        norm = np.float32(np.linalg.norm(vector) or 1.0)
+        expires = self._expiry()
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = vector[np.newaxis, :]
+                self._norms = np.array([norm], dtype=np.float32)
+                self._expires = np.array([expires])
+            else:
+                self._vectors = np.vstack([self._vectors, vector])
+                self._norms = np.append(self._norms, norm)
+                self._expires = np.append(self._expires, expires)
+            self._context_keys.append(context_key)
+            self._answers.append(answer)
+
+            # Éviction FIFO au-delà de la capacité
+            overflow = len(self._answers) - self.max_entries
+            if overflow > 0:
+                self._vectors = self._vectors[overflow:]
+                self._norms = self._norms[overflow:]
+                self._expires = self._expires[overflow:]
+                del self._context_keys[:overflow]
+                del self._answers[:overflow]
+
+
+def build_state_key(history: List[Dict[str, str]],
+                    profile: Optional[Dict] = None,
+                    temperature: float = 0.7,
+                    model: str = "",
+                    max_tokens: Optional[int] = None) -> str:
+    """
+    Clé d'état d'une conversation: historique complet + profil + paramètres de génération
+    (modèle, température, budget de tokens résolu).
+    Toute modification d'un tour précédent change la clé, l'invalidation est donc automatique.
+    """
+    state = {
+        "history": [
+            {"role": m.get("role", ""), "content": (m.get("content") or "").strip()}
+            for m in history
+        ],
+        "profile": profile or {},
+        "temperature": round(float(temperature), 3),
+        "model": model,
+        "max_tokens": max_tokens,
+    }
+    return hashlib.blake2b(orjson.dumps(state, default=str, option=_KEY_OPTIONS)).hexdigest()
+
+
+class PersistentResponseCache:
+    """Cache disque des réponses (diskcache), partagé entre redémarrages et workers"""
+
+    def __init__(self,
+                 directory: str = "./.orientabot_cache",
+                 size_limit: int = 2 ** 30,
+                 ttl: Optional[int] = None):
+        """
+        Args:
+            directory: Dossier de stockage du cache
+            size_limit: Taille maximale sur disque en octets (éviction LRU au-delà)
+            ttl: Durée de vie des entrées en secondes (None = pas d'expiration)
+        """
+        self.ttl = ttl
+        self._cache = None
+
+        try:
+            import diskcache
+            self._cache = diskcache.Cache(
+                directory,
+                size_limit=size_limit,
+                eviction_policy="least-recently-used",
+            )
+            logger.info(f"Cache disque des réponses: {directory}")
+        except ImportError:
+            logger.warning("diskcache non installé - cache disque des réponses désactivé")
+        except Exception as e:
+            logger.warning(f"Impossible d'ouvrir le cache disque {directory}: {e}")
+
+    @property
+    def available(self) -> bool:
+        return self._cache is not None
+
+    def get(self, key: str) -> Optional[str]:
+        """Retourne la réponse stockée pour cette clé, ou None"""
+        if self._cache is None:
+            return None
+        try:
+            return self._cache.get(key)
+        except Exception as e:
+            logger.warning(f"Lecture du cache disque impossible: {e}")
+            return None
+
+    def set(self, key: str, answer: str) -> None:
+        """Stocke une réponse complète"""
+        if self._cache is None or not answer:
+            return
+        try:
+            self._cache.set(key, answer, expire=self.ttl)
+        except Exception as e:
+            logger.warning(f"Écriture du cache disque impossible: {e}")
+
+    def clear(self) -> None:
+        if self._cache is not None:
+            self._cache.clear()
@@ -0,0 +1,204 @@
+"""
+Mémoire des sessions de chat pour OrientaBot (API)
+Hiérarchie à trois niveaux:
+- L1: LRU en mémoire des sessions récentes (uniquement sans stockage disque)
+- L2: fenêtre de travail persistée sur disque (diskcache), partagée entre workers
+- L3: messages anciens archivés compressés, réhydratés à la demande
+
+Avec un stockage disque, le disque est la seule source de vérité: chaque lecture le relit et
+chaque écriture est une lecture-modification-écriture dans une transaction diskcache, donc
+les workers (WORKERS > 1) voient et complètent le même historique sans perdre de tours.
+"""
+
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière du nombre de tokens (~4 caractères par token)"""
+    return len(text) // 4 + 1
+
+
+class SessionMemory:
+    """Historique de conversation par session, borné en mémoire et persistant sur disque"""
+
+    def __init__(self,
+                 l1_sessions: int = 256,
+                 window_messages: int = 40,
+                 directory: Optional[str] = None,
+                 ttl: Optional[int] = None):
+        """
+        Args:
+            l1_sessions: Nombre de sessions gardées en mémoire (LRU, sans stockage disque)
+            window_messages: Taille de la fenêtre de travail; au-delà, les plus anciens
+                messages sont archivés en L3
+            directory: Dossier du stockage disque (None = mémoire uniquement)
+            ttl: Durée de vie des sessions sur disque en secondes (None = pas d'expiration)
+        """
+        self.l1_sessions = l1_sessions
+        self.window_messages = window_messages
+        self.ttl = ttl
+
+        self._l1: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+
+        if directory:
+            try:
+                import diskcache
+                self._disk = diskcache.Cache(directory)
+                logger.info(f"Mémoire des sessions persistée dans {directory}")
+            except ImportError:
+                logger.warning("diskcache non installé - mémoire des sessions en RAM uniquement")
+            except Exception as e:
+                logger.warning(f"Impossible d'ouvrir le stockage des sessions {directory}: {e}")
+
+    def append(self, session_id: str, role: str, content: str) -> None:
+        """Ajoute un message à la session (créée si besoin)"""
+        self._append(session_id, [(role, content)])
+
+    def record_turn(self, session_id: str, user_message: str, assistant_response: str) -> None:
+        """Ajoute un échange complet (question + réponse) en une seule écriture"""
+        self._append(session_id, [("user", user_message), ("assistant", assistant_response)])
+
+    def get(self, session_id: str, budget_tokens: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retourne la session avec ses messages récents
+
+        Args:
+            session_id: ID de session
+            budget_tokens: Budget de tokens; seuls les messages les plus récents qui y
+                tiennent sont retournés (None = toute la fenêtre de travail)
+
+        Returns:
+            Dict avec messages, created_at, last_activity et archived_messages, ou None
+        """
+        with self._lock:
+            record = self._load(session_id)
+        if record is None:
+            return None
+
+        messages = record["messages"]
+        omitted = record["archived"]
+        if budget_tokens is not None:
+            kept, used = [], 0
+            for msg in reversed(messages):
+                used += estimate_tokens(msg["content"])
+                if used > budget_tokens:
+                    break
+                kept.append(msg)
+            kept.reverse()
+            omitted += len(messages) - len(kept)
+            messages = kept
+
+        return {
+            "session_id": session_id,
+            "messages": list(messages),
+            "created_at": record["created_at"],
+            "last_activity": record["last_activity"],
+            "archived_messages": omitted
+        }
+
+    def expand(self, session_id: str, start: int = 0, count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Réhydrate les messages archivés (L3) à partir de l'indice `start`"""
+        if self._disk is None:
+            return []
+        blob = self._disk_get(f"archive:{session_id}")
+        if blob is None:
+            return []
+        archived = orjson.loads(zlib.decompress(blob))
+        end = None if count is None else start + count
+        return archived[start:end]
+
+    def clear(self, session_id: str) -> None:
+        """Efface la session à tous les niveaux"""
+        with self._lock:
+            self._l1.pop(session_id, None)
+        if self._disk is not None:
+            with self._disk.transact():
+                self._disk.delete(f"session:{session_id}")
+                self._disk.delete(f"archive:{session_id}")
+
+    def _append(self, session_id: str, entries: List[Tuple[str, str]]) -> None:
+        """Ajoute des messages (rôle, contenu); sur disque, sous transaction entre processus"""
+        if self._disk is None:
+            with self._lock:
+                self._append_locked(session_id, entries)
+            return
+        try:
+            with self._disk.transact():
+                self._append_locked(session_id, entries)
+        except Exception as e:
+            logger.warning(f"Écriture de la mémoire des sessions impossible: {e}")
+
+    def _append_locked(self, session_id: str, entries: List[Tuple[str, str]]) -> None:
+        """Lecture-modification-écriture de la session; appelé sous verrou ou transaction"""
+        now = datetime.now(timezone.utc).isoformat()
+        record = self._load(session_id)
+        if record is None:
+            record = {"messages": [], "created_at": now, "last_activity": now, "archived": 0}
+        for role, content in entries:
+            record["messages"].append({"role": role, "content": content, "timestamp": now})
+        record["last_activity"] = now
+
+        # Fenêtre pleine: archiver la moitié la plus ancienne en un seul bloc
+        if len(record["messages"]) > self.window_messages:
+            cut = len(record["messages"]) - self.window_messages // 2
+            self._archive(session_id, record["messages"][:cut])
+            del record["messages"][:cut]
+            record["archived"] += cut
+
+        if self._disk is None:
+            self._remember(session_id, record)
+        else:
+            self._disk_set(f"session:{session_id}", record)
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Disque s'il est configuré (source de vérité partagée), sinon L1; appelé sous verrou"""
+        if self._disk is not None:
+            return self._disk_get(f"session:{session_id}")
+        record = self._l1.get(session_id)
+        if record is not None:
+            self._l1.move_to_end(session_id)
+        return record
+
+    def _remember(self, session_id: str, record: Dict[str, Any]) -> None:
+        self._l1[session_id] = record
+        self._l1.move_to_end(session_id)
+        while len(self._l1) > self.l1_sessions:
+            self._l1.popitem(last=False)
+
+    def _archive(self, session_id: str, messages: List[Dict[str, Any]]) -> None:
+        """Ajoute des messages à l'archive compressée (sans disque, ils sont abandonnés)"""
+        if self._disk is None:
+            return
+        key = f"archive:{session_id}"
+        blob = self._disk_get(key)
+        archived = orjson.loads(zlib.decompress(blob)) if blob is not None else []
+        archived.extend(messages)
+        self._disk_set(key, zlib.compress(orjson.dumps(archived)))
+
+    def _disk_get(self, key: str) -> Any:
+        if self._disk is None:
+            return None
+        try:
+            return self._disk.get(key)
+        except Exception as e:
+            logger.warning(f"Lecture de la mémoire des sessions impossible: {e}")
+            return None
+
+    def _disk_set(self, key: str, value: Any) -> None:
+        if self._disk is None:
+            return
+        try:
+            self._disk.set(key, value, expire=self.ttl)
+        except Exception as e:
+            logger.warning(f"Écriture de la mémoire des sessions impossible: {e}")
@@ -7,7 +7,7 @@ from .manager import RAGManager
 from .vector_store import VectorStore
 from .pdf_processor import PDFProcessor, DocumentChunk
 from .hybrid_search import HybridSearchEngine
-from .semantic_processor import SemanticProcessor
+from .semantic_processor import SemanticDocumentProcessor
 
 __all__ = [
     'RAGManager', 
@@ -15,5 +15,5 @@ __all__ = [
     'PDFProcessor', 
     'DocumentChunk',
     'HybridSearchEngine',
-    'SemanticProcessor'
+    'SemanticDocumentProcessor'
 ]
\ No newline at end of file
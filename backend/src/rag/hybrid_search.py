@@ -3,6 +3,7 @@ Système de recherche hybride combinant recherche vectorielle et recherche par m
 Optimisé pour OrientaBot - données factuelles + recherche sémantique
 """
 
+import os
 import re
 import logging
 from typing import List, Dict, Any, Tuple, Optional, Set
@@ -11,12 +12,17 @@ from enum import Enum
 import math
 from collections import defaultdict, Counter
 
+import numpy as np
+
 # Import des modules existants
 from .vector_store import VectorStore, DocumentChunk
 from .semantic_processor import SemanticChunk, ContentType, InstitutionType
 
 logger = logging.getLogger(__name__)
 
+# Constante de lissage de la fusion par rangs (Reciprocal Rank Fusion)
+RRF_K = 60
+
 class SearchMode(Enum):
     """Modes de recherche disponibles"""
     VECTOR_ONLY = "vector_only"           # Recherche vectorielle uniquement
@@ -61,13 +67,28 @@ class HybridSearchEngine:
         # Mots-clés factuels pour recherche directe
         self.factual_keywords = self._initialize_factual_keywords()
         
-        # Index inversé pour recherche rapide par mots-clés
-        self.keyword_index = defaultdict(set)
-        self.tf_idf_cache = {}
+        # IDF du corpus en tableau contigu (terme -> id), pour la pondération des mots-clés d'une requête
+        self.vocabulary: Dict[str, int] = {}
+        
+        # Index inversé au format CSR: les documents du terme t (et leurs scores TF-IDF) sont
+        # posting_docs[posting_indptr[t]:posting_indptr[t + 1]]
+        self.posting_indptr: Optional[np.ndarray] = None
+        self.posting_docs: Optional[np.ndarray] = None
+        self.posting_scores: Optional[np.ndarray] = None
+        self.idf: Optional[np.ndarray] = None
+        self.unseen_idf = 0.0
+        self._factual_categories = {
+            keyword: category
+            for category, keywords in self.factual_keywords.items()
+            for keyword in keywords
+        }
         
         # Configuration de scoring
         self.vector_weight = 0.6        # Poids de la recherche vectorielle
         self.keyword_weight = 0.4       # Poids de la recherche par mots-clés
+        # Fusion des deux listes: 'weighted' (somme pondérée des scores) ou 'rrf' (par rangs,
+        # insensible aux échelles différentes des scores cosinus et TF-IDF)
+        self.fusion = os.getenv("HYBRID_FUSION", "weighted").lower()
         self.boost_factors = self._initialize_boost_factors()
         
         logger.info("Moteur de recherche hybride initialisé")
@@ -159,10 +180,6 @@ class HybridSearchEngine:
         """
         logger.info(f"Construction de l'index mots-clés pour {len(chunks)} chunks...")
         
-        # Réinitialiser l'index
-        self.keyword_index.clear()
-        self.tf_idf_cache.clear()
-        
         # Document frequencies pour TF-IDF
         doc_count = len(chunks)
         word_doc_count = defaultdict(int)
@@ -175,26 +192,38 @@ class HybridSearchEngine:
             for word in unique_words:
                 word_doc_count[word] += 1
         
-        # Deuxième passage : construire l'index avec scores TF-IDF
+        # Table IDF vectorisée (même formule que le TF-IDF ci-dessous); un terme absent
+        # du corpus reçoit l'IDF maximal log(N)
+        self.vocabulary = {word: i for i, word in enumerate(word_doc_count)}
+        doc_freq = np.fromiter(word_doc_count.values(), dtype=np.float32, count=len(word_doc_count))
+        self.idf = np.log(doc_count / (doc_freq + 1)).astype(np.float32)
+        self.unseen_idf = math.log(doc_count) if doc_count else 0.0
+        
+        # Deuxième passage : triplets (terme, document, TF) de l'index inversé
+        term_ids: List[int] = []
+        doc_ids: List[int] = []
+        term_freqs: List[float] = []
         for i, chunk in enumerate(chunks):
             words = self._extract_keywords(chunk.content)
             word_count = Counter(words)
             doc_length = len(words)
             
             for word, count in word_count.items():
-                # Calculer TF-IDF
-                tf = count / doc_length
-                idf = math.log(doc_count / (word_doc_count[word] + 1))
-                tf_idf = tf * idf
-                
-                # Ajouter au cache
-                if (i, word) not in self.tf_idf_cache:
-                    self.tf_idf_cache[(i, word)] = tf_idf
-                
-                # Ajouter à l'index inversé
-                self.keyword_index[word.lower()].add(i)
-        
-        logger.info(f"Index mots-clés construit: {len(self.keyword_index)} termes indexés")
+                term_ids.append(self.vocabulary[word])
+                doc_ids.append(i)
+                term_freqs.append(count / doc_length)
+        
+        # Regroupement par terme (tri stable: documents croissants dans chaque liste)
+        # et scores TF-IDF en float64, comme le calcul scalaire
+        terms = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(terms, kind="stable")
+        idf64 = np.log(doc_count / (doc_freq.astype(np.float64) + 1))
+        self.posting_indptr = np.zeros(len(self.vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(terms, minlength=len(self.vocabulary)), out=self.posting_indptr[1:])
+        self.posting_docs = np.asarray(doc_ids, dtype=np.int32)[order]
+        self.posting_scores = np.asarray(term_freqs, dtype=np.float64)[order] * idf64[terms[order]]
+        
+        logger.info(f"Index mots-clés construit: {len(self.vocabulary)} termes indexés")
     
     def _extract_keywords(self, text: str) -> List[str]:
         """
@@ -235,6 +264,40 @@ class HybridSearchEngine:
         
         return keywords
     
+    def weight_query_keywords(self, query: str, top_k: int = 10) -> List[Tuple[str, float, str]]:
+        """
+        Mots-clés les plus discriminants d'une requête (fréquence x IDF du corpus)
+        
+        Args:
+            query: Requête à analyser
+            top_k: Nombre max de mots-clés
+            
+        Returns:
+            Liste (terme, poids normalisé dans [0, 1], catégorie) par poids décroissant
+        """
+        if self.idf is None:
+            return []
+        
+        tokens = self._extract_keywords(query)
+        if not tokens:
+            return []
+        
+        terms, counts = np.unique(np.array(tokens), return_counts=True)
+        ids = np.fromiter((self.vocabulary.get(t, -1) for t in terms.tolist()), dtype=np.int64, count=len(terms))
+        idf = np.where(ids >= 0, self.idf[np.maximum(ids, 0)], self.unseen_idf)
+        weights = counts * idf
+        
+        k = min(top_k, len(weights))
+        top = np.argpartition(-weights, k - 1)[:k] if k < len(weights) else np.arange(len(weights))
+        top = top[np.argsort(-weights[top])]
+        
+        max_weight = float(weights[top[0]])
+        scale = 1.0 / max_weight if max_weight > 0 else 0.0
+        return [
+            (term, round(weight * scale, 3), self._factual_categories.get(term, "terme"))
+            for term, weight in zip(terms[top].tolist(), weights[top].tolist())
+        ]
+    
     def detect_query_type(self, query: str) -> QueryType:
         """
         Détecte le type de requête
@@ -310,7 +373,7 @@ class HybridSearchEngine:
         Returns:
             Liste des résultats de recherche
         """
-        if not self.keyword_index:
+        if self.posting_indptr is None or not self.vocabulary:
             logger.warning("Index mots-clés non construit")
             return []
         
@@ -320,46 +383,43 @@ class HybridSearchEngine:
         if not query_keywords:
             return []
         
-        # Scores des documents
-        doc_scores = defaultdict(float)
-        doc_matched_keywords = defaultdict(list)
+        # Listes de postings des mots-clés de la requête (une par occurrence, dans l'ordre),
+        # concaténées: documents, scores TF-IDF et mot-clé d'origine
+        spans = [
+            (position, self.posting_indptr[term], self.posting_indptr[term + 1])
+            for position, term in enumerate(map(self.vocabulary.get, query_keywords))
+            if term is not None
+        ]
+        if not spans:
+            logger.info("Recherche mots-clés pour '%.50s...': 0 résultat(s)", query)
+            return []
+        docs = np.concatenate([self.posting_docs[start:end] for _, start, end in spans])
+        scores = np.concatenate([self.posting_scores[start:end] for _, start, end in spans])
+        origins = np.concatenate([np.full(end - start, position, dtype=np.int32) for position, start, end in spans])
+        
+        # Score par document: une accumulation vectorisée au lieu d'une boucle par posting;
+        # seuls les documents présents dans la base vectorielle sont retenus
+        n_docs = len(self.vector_store.chunks)
+        in_store = docs < n_docs
+        docs, scores, origins = docs[in_store], scores[in_store], origins[in_store]
+        doc_scores = np.bincount(docs, weights=scores, minlength=n_docs)
+        candidates = np.flatnonzero(np.bincount(docs, minlength=n_docs))
+        
+        # Tri par score décroissant (stable: à score égal, ordre des documents) puis top_k;
+        # score normalisé par le nombre de mots-clés de la requête
+        ranked = candidates[np.argsort(-doc_scores[candidates], kind="stable")][:top_k]
+        results = [
+            SearchResult(
+                chunk=self.vector_store.chunks[doc_idx],
+                keyword_score=float(doc_scores[doc_idx]) / len(query_keywords),
+                matched_keywords=[query_keywords[position] for position in origins[docs == doc_idx].tolist()]
+            )
+            for doc_idx in ranked.tolist()
+        ]
         
-        # Calculer les scores pour chaque document
-        for keyword in query_keywords:
-            keyword_lower = keyword.lower()
-            
-            # Trouver les documents contenant ce mot-clé
-            if keyword_lower in self.keyword_index:
-                for doc_idx in self.keyword_index[keyword_lower]:
-                    # Score TF-IDF depuis le cache
-                    if (doc_idx, keyword_lower) in self.tf_idf_cache:
-                        score = self.tf_idf_cache[(doc_idx, keyword_lower)]
-                        doc_scores[doc_idx] += score
-                        doc_matched_keywords[doc_idx].append(keyword)
-        
-        # Normaliser les scores et créer les résultats
-        results = []
+        logger.info("Recherche mots-clés pour '%.50s...': %d résultat(s)", query, len(candidates))
         
-        for doc_idx, score in doc_scores.items():
-            if doc_idx < len(self.vector_store.chunks):
-                chunk = self.vector_store.chunks[doc_idx]
-                
-                # Normaliser le score par le nombre de mots-clés matchés
-                normalized_score = score / len(query_keywords)
-                
-                result = SearchResult(
-                    chunk=chunk,
-                    keyword_score=normalized_score,
-                    matched_keywords=doc_matched_keywords[doc_idx]
-                )
-                results.append(result)
-        
-        # Trier par score décroissant et retourner top_k
-        results.sort(key=lambda x: x.keyword_score, reverse=True)
-        
-        logger.info(f"Recherche mots-clés pour '{query[:50]}...': {len(results)} résultat(s)")
-        
-        return results[:top_k]
+        return results
     
     def vector_search(self, query: str, top_k: int = 10, score_threshold: float = 0.5) -> List[SearchResult]:
         """
@@ -385,7 +445,7 @@ class HybridSearchEngine:
             )
             results.append(result)
         
-        logger.info(f"Recherche vectorielle pour '{query[:50]}...': {len(results)} résultat(s)")
+        logger.info("Recherche vectorielle pour '%.50s...': %d résultat(s)", query, len(results))
         
         return results
     
@@ -420,6 +480,9 @@ class HybridSearchEngine:
         combined_results = self._merge_search_results(
             vector_results, keyword_results, vector_weight, keyword_weight
         )
+        if self.fusion == "rrf":
+            self._apply_rrf_scores(combined_results, vector_results, keyword_results,
+                                   vector_weight, keyword_weight)
         
         # Appliquer les facteurs de boost
         boosted_results = self._apply_content_boost(combined_results, query)
@@ -427,7 +490,7 @@ class HybridSearchEngine:
         # Trier par score hybride et retourner top_k
         boosted_results.sort(key=lambda x: x.hybrid_score, reverse=True)
         
-        logger.info(f"Recherche hybride pour '{query[:50]}...': {len(boosted_results)} résultat(s)")
+        logger.info("Recherche hybride pour '%.50s...': %d résultat(s)", query, len(boosted_results))
         
         return boosted_results[:top_k]
     
@@ -473,6 +536,29 @@ class HybridSearchEngine:
         
         return merged_results
     
+    def _apply_rrf_scores(self,
+                          merged_results: List[SearchResult],
+                          vector_results: List[SearchResult],
+                          keyword_results: List[SearchResult],
+                          vector_weight: float,
+                          keyword_weight: float) -> None:
+        """
+        Remplace le score hybride par la fusion par rangs w/(RRF_K + rang) de chaque liste,
+        calculée en un passage NumPy et ramenée à [0, 1] (1 = premier des deux listes)
+        """
+        position = {result.chunk.chunk_id: i for i, result in enumerate(merged_results)}
+        scores = np.zeros(len(merged_results))
+        for results, weight in ((vector_results, vector_weight), (keyword_results, keyword_weight)):
+            if not results:
+                continue
+            # Listes déjà triées par score décroissant: le rang est la position (à partir de 1)
+            ids = np.fromiter((position[r.chunk.chunk_id] for r in results), dtype=np.intp, count=len(results))
+            np.add.at(scores, ids, weight / (RRF_K + np.arange(1, len(results) + 1)))
+        scores *= (RRF_K + 1) / ((vector_weight + keyword_weight) or 1.0)
+        
+        for result, score in zip(merged_results, scores.tolist()):
+            result.hybrid_score = score
+    
     def _apply_content_boost(self, results: List[SearchResult], query: str) -> List[SearchResult]:
         """Applique les facteurs de boost selon le type de contenu"""
         
@@ -542,16 +628,16 @@ class HybridSearchEngine:
         Returns:
             Liste des résultats de recherche
         """
-        logger.info(f"Recherche: '{query[:50]}...', mode: {mode.value}")
+        logger.info("Recherche: '%.50s...', mode: %s", query, mode.value)
         
         # Détecter le type de requête
         query_type = self.detect_query_type(query)
-        logger.info(f"Type de requête détecté: {query_type.value}")
+        logger.info("Type de requête détecté: %s", query_type.value)
         
         # Sélectionner le mode de recherche si AUTO
         if mode == SearchMode.AUTO:
             mode = self.select_search_mode(query, query_type)
-            logger.info(f"Mode de recherche sélectionné: {mode.value}")
+            logger.info("Mode de recherche sélectionné: %s", mode.value)
         
         # Exécuter la recherche selon le mode
         if mode == SearchMode.VECTOR_ONLY:
@@ -566,8 +652,8 @@ class HybridSearchEngine:
         return {
             'vector_store_available': self.vector_store.ml_available,
             'total_documents': len(self.vector_store.chunks),
-            'keyword_index_terms': len(self.keyword_index),
-            'tf_idf_cache_size': len(self.tf_idf_cache),
+            'keyword_index_terms': len(self.vocabulary),
+            'tf_idf_cache_size': 0 if self.posting_scores is None else len(self.posting_scores),
             'boost_factors': self.boost_factors,
             'weights': {
                 'vector_weight': self.vector_weight,
@@ -12,9 +12,26 @@ import re
 # Fixed imports - use absolute imports from rag module
 from .pdf_processor import PDFProcessor, DocumentChunk
 from .vector_store import VectorStore
+from .proximity_cache import ProximityCache
 
 logger = logging.getLogger(__name__)
 
+# Abréviations courantes développées dans les requêtes (recherche sémantique plus précise)
+ABBREVIATIONS = {
+    'ensa': 'école nationale des sciences appliquées',
+    'emsi': 'école marocaine des sciences de l\'ingénieur',
+    'ensam': 'école nationale supérieure d\'arts et métiers',
+    'emi': 'école mohammadia d\'ingénieurs',
+    'ensias': 'école nationale supérieure d\'informatique et d\'analyse des systèmes',
+    'encg': 'école nationale de commerce et de gestion',
+    'fsjes': 'faculté des sciences juridiques économiques et sociales',
+    'fst': 'faculté des sciences et techniques',
+    'est': 'école supérieure de technologie',
+}
+
+# Une seule alternation compilée: un passage sur la requête au lieu d'un re.sub par abréviation
+_ABBREVIATION_RE = re.compile(r'\b(' + '|'.join(map(re.escape, ABBREVIATIONS)) + r')\b')
+
 class RAGManager:
     """Gestionnaire principal du système RAG pour OrientaBot"""
     
@@ -23,7 +40,9 @@ class RAGManager:
                  vector_db_path: str = "data/processed",
                  chunk_size: int = 800,
                  chunk_overlap: int = 150,
-                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2"):
+                 embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
+                 search_cache_threshold: float = 0.95,
+                 search_cache_size: int = 256):
         """
         Initialise le gestionnaire RAG
         
@@ -33,6 +52,9 @@ class RAGManager:
             chunk_size: Taille des chunks de texte
             chunk_overlap: Chevauchement entre chunks
             embedding_model: Modèle d'embeddings à utiliser
+            search_cache_threshold: Similarité cosinus minimale pour réutiliser les résultats
+                d'une requête proche déjà servie
+            search_cache_size: Nombre de requêtes conservées dans ce cache (0 = désactivé)
         """
         
         # Chemins
@@ -55,6 +77,13 @@ class RAGManager:
         self.min_relevance_score = 0.6
         self.context_window_size = 3000  # Taille max du contexte en caractères
         
+        # Nombre de PDFs, recompté seulement quand le dossier change (mtime)
+        self._pdf_count_cache: Optional[int] = None
+        self._pdf_folder_mtime: Optional[float] = None
+        
+        # Résultats des recherches récentes, réutilisés pour les requêtes proches
+        self.search_cache = ProximityCache(capacity=search_cache_size, threshold=search_cache_threshold)
+        
         logger.info("RAGManager initialisé")
         logger.info(f"📂 PDFs: {self.pdf_folder}")
         logger.info(f"🗄️ Base vectorielle: {self.vector_db_path}")
@@ -75,6 +104,9 @@ class RAGManager:
             return False
             
         try:
+            # Résultats calculés sur l'ancienne base: périmés
+            self.search_cache.clear()
+            
             # Vérifier si la base existe déjà 
             if not force_rebuild and self.vector_store._database_exists():
                 logger.info("Base vectorielle existante trouvée")
@@ -148,12 +180,24 @@ class RAGManager:
             # Préprocesser la requête
             processed_query = self._preprocess_query(query)
             
+            if self.vector_store.index is None or not self.vector_store.chunks:
+                logger.warning("Base vectorielle non initialisée")
+                return []
+            
+            # Requête proche d'une requête récente: mêmes résultats, sans parcours de l'index
+            query_embedding = self.vector_store.create_embeddings([processed_query], show_progress_bar=False)[0]
+            cached = self.search_cache.get(query_embedding, top_k)
+            if cached is not None:
+                logger.info(f"Recherche (cache): {len(cached)} résultat(s) pertinent(s)")
+                return list(cached)
+            
             # Rechercher dans la base vectorielle
-            results = self.vector_store.search(
-                processed_query,
+            results = self.vector_store.search_by_vector(
+                query_embedding,
                 top_k=top_k,
                 score_threshold=self.min_relevance_score
             )
+            self.search_cache.put(query_embedding, top_k, tuple(results))
             
             logger.info(f"Recherche: {len(results)} résultat(s) pertinent(s)")
             
@@ -163,6 +207,19 @@ class RAGManager:
             logger.error(f"Erreur lors de la recherche: {e}")
             return []
     
+    def retrieve(self, query: str) -> Tuple[List[Tuple[DocumentChunk, float]], Optional[str]]:
+        """
+        Recherche et contexte en une seule passe
+        
+        Args:
+            query: Question de l'utilisateur
+            
+        Returns:
+            (chunks pertinents avec leurs scores, contexte formaté ou None)
+        """
+        search_results = self.search_knowledge(query)
+        return search_results, self.build_context(search_results)
+    
     def get_context_for_query(self, query: str) -> Optional[str]:
         """
         Récupère le contexte pertinent pour une requête donnée
@@ -173,9 +230,18 @@ class RAGManager:
         Returns:
             Contexte formaté ou None si aucun contexte trouvé
         """
-        # Rechercher les chunks pertinents
-        search_results = self.search_knowledge(query)
+        return self.retrieve(query)[1]
+    
+    def build_context(self, search_results: List[Tuple[DocumentChunk, float]]) -> Optional[str]:
+        """
+        Construit le contexte à partir de résultats de recherche déjà obtenus
         
+        Args:
+            search_results: Chunks pertinents avec leurs scores
+            
+        Returns:
+            Contexte formaté ou None si aucun contexte trouvé
+        """
         if not search_results:
             logger.info("Aucun contexte pertinent trouvé")
             return None
@@ -225,8 +291,19 @@ class RAGManager:
         Returns:
             Prompt augmenté avec contexte ou prompt de base si pas de contexte
         """
-        context = self.get_context_for_query(user_query)
+        return self.build_augmented_prompt(base_prompt, self.get_context_for_query(user_query))
+    
+    def build_augmented_prompt(self, base_prompt: str, context: Optional[str]) -> str:
+        """
+        Augmente le prompt avec un contexte déjà construit
         
+        Args:
+            base_prompt: Prompt système de base
+            context: Contexte formaté (build_context), ou None
+            
+        Returns:
+            Prompt augmenté avec contexte ou prompt de base si pas de contexte
+        """
         if context:
             # Prompt avec contexte RAG
             augmented_prompt = f"""{base_prompt}
@@ -281,30 +358,16 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
         query = query.lower().strip()
         
         # Remplacer les abréviations courantes
-        abbreviations = {
-            'ensa': 'école nationale des sciences appliquées',
-            'emsi': 'école marocaine des sciences de l\'ingénieur',
-            'ensam': 'école nationale supérieure d\'arts et métiers',
-            'emi': 'école mohammadia d\'ingénieurs',
-            'ensias': 'école nationale supérieure d\'informatique et d\'analyse des systèmes',
-            'encg': 'école nationale de commerce et de gestion',
-            'fsjes': 'faculté des sciences juridiques économiques et sociales',
-            'fst': 'faculté des sciences et techniques',
-            'est': 'école supérieure de technologie',
-        }
-        
-        for abbrev, full_name in abbreviations.items():
-            query = re.sub(r'\b' + abbrev + r'\b', full_name, query)
-        
-        return query
+        return _ABBREVIATION_RE.sub(lambda match: ABBREVIATIONS[match.group(1)], query)
     
     def get_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques du système RAG"""
         return {
             'vector_store_stats': self.vector_store.get_stats(),
             'pdf_folder': str(self.pdf_folder),
-            'pdf_files_count': len(list(self.pdf_folder.glob("*.pdf"))) if self.pdf_folder.exists() else 0,
+            'pdf_files_count': self._pdf_files_count(),
             'ml_available': self.vector_store.ml_available,
+            'search_cache_stats': dict(self.search_cache.stats),
             'config': {
                 'chunk_size': self.pdf_processor.chunk_size,
                 'chunk_overlap': self.pdf_processor.chunk_overlap,
@@ -314,6 +377,19 @@ Tu réponds avec tes connaissances générales du système éducatif marocain en
             }
         }
     
+    def _pdf_files_count(self) -> int:
+        """Nombre de PDFs du dossier; le mtime du dossier change à chaque ajout/suppression de fichier"""
+        try:
+            mtime = self.pdf_folder.stat().st_mtime
+        except FileNotFoundError:
+            self._pdf_count_cache, self._pdf_folder_mtime = None, None
+            return 0
+        
+        if mtime != self._pdf_folder_mtime or self._pdf_count_cache is None:
+            self._pdf_count_cache = sum(1 for _ in self.pdf_folder.glob("*.pdf"))
+            self._pdf_folder_mtime = mtime
+        return self._pdf_count_cache
+    
     def rebuild_knowledge_base(self) -> bool:
         """Force la reconstruction complète de la base de connaissances"""
         logger.info("🔄 Reconstruction de la base de connaissances...")
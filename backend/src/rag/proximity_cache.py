@@ -0,0 +1,95 @@
+"""
+Cache de proximité des recherches RAG pour OrientaBot
+Une requête dont l'embedding est assez proche d'une requête déjà servie reprend ses résultats
+(pas de parcours de l'index vectoriel)
+"""
+
+import threading
+from typing import Any, Hashable, List, Optional
+
+import numpy as np
+
+
+class ProximityCache:
+    """
+    Cache approximatif indexé par embedding de requête.
+
+    Les embeddings (normalisés) des requêtes servies forment une matrice de `capacity` lignes;
+    une recherche est un produit matrice-vecteur suivi d'un argmax. Les entrées ne sont
+    comparées qu'à clé égale (ex: même top_k). Au-delà de la capacité, l'entrée utilisée le
+    moins récemment est remplacée.
+    """
+
+    def __init__(self, capacity: int = 256, threshold: float = 0.95):
+        """
+        Args:
+            capacity: Nombre maximum de requêtes conservées
+            threshold: Similarité cosinus minimale pour réutiliser des résultats
+        """
+        self.capacity = capacity
+        self.threshold = threshold
+
+        self._vectors: Optional[np.ndarray] = None
+        self._keys: List[Hashable] = []
+        self._results: List[Any] = []
+        self._last_used = np.zeros(capacity, dtype=np.int64)
+        self._clock = 0
+        self._lock = threading.Lock()
+
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, vector: np.ndarray, key: Hashable = None) -> Optional[Any]:
+        """Résultats d'une requête proche de même clé, ou None"""
+        query = _normalize(vector)
+        with self._lock:
+            size = len(self._results)
+            if size and self._vectors.shape[1] == query.shape[0]:
+                sims = self._vectors[:size] @ query
+                mask = np.fromiter((k == key for k in self._keys), dtype=bool, count=size)
+                sims = np.where(mask, sims, -1.0)
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self._clock += 1
+                    self._last_used[best] = self._clock
+                    self.stats["hits"] += 1
+                    return self._results[best]
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, vector: np.ndarray, key: Hashable, results: Any) -> None:
+        """Enregistre les résultats d'une requête (remplace l'entrée la moins récente si plein)"""
+        if self.capacity <= 0:
+            return
+        query = _normalize(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != query.shape[0]:
+                # Premier usage ou changement de modèle d'embeddings
+                self._vectors = np.zeros((self.capacity, query.shape[0]), dtype=np.float32)
+                self._keys, self._results = [], []
+
+            size = len(self._results)
+            if size < self.capacity:
+                slot = size
+                self._keys.append(key)
+                self._results.append(results)
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._keys[slot] = key
+                self._results[slot] = results
+
+            self._vectors[slot] = query
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+    def clear(self) -> None:
+        """Vide le cache (ex: après une reconstruction de l'index)"""
+        with self._lock:
+            self._vectors = None
+            self._keys, self._results = [], []
+            self._last_used[:] = 0
+
+
+def _normalize(vector: np.ndarray) -> np.ndarray:
+    query = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(query))
+    return query / norm if norm else query
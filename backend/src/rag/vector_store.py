@@ -3,12 +3,13 @@ Gestionnaire de base vectorielle pour la recherche sémantique dans le RAG
 """
 
 import os
-import json
 import pickle
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
+import orjson
 
 # Import the DocumentChunk from the same module
 from .pdf_processor import DocumentChunk
@@ -25,20 +26,42 @@ except ImportError as e:
 
 logger = logging.getLogger(__name__)
 
+# Paramètres du graphe HNSW (recherche approximative en O(log N) au lieu d'un parcours complet)
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+# Index IVF+PQ (vecteurs compressés ~8-32x) pour les gros corpus: en dessous de
+# IVFPQ_MIN_TRAINING vecteurs, l'entraînement des codebooks n'est pas fiable -> HNSW
+IVFPQ_NBITS = 8
+IVFPQ_NPROBE = 16
+IVFPQ_MIN_TRAINING = 39 * (1 << IVFPQ_NBITS)
+IVFPQ_TRAINING_SAMPLE = 100_000
+
+# Métadonnées filtrables dans l'index (un bitmap par valeur): les filtres sur ces clés sont
+# appliqués pendant le parcours FAISS (IDSelectorBitmap) au lieu d'un post-filtrage
+FILTERABLE_METADATA = ("source_file", "content_type", "institution_type", "type", "ville", "niveau", "domaine")
+FILTER_CACHE_SIZE = 128
+
 class VectorStore:
     """Gestionnaire de base vectorielle avec FAISS et sentence-transformers"""
     
     def __init__(self, 
                  embedding_model: str = "sentence-transformers/all-MiniLM-L6-v2",
-                 vector_db_path: str = "data/processed"):
+                 vector_db_path: str = "data/processed",
+                 index_type: str = None):
         """
         Initialise le store vectoriel
         
         Args:
             embedding_model: Modèle d'embeddings à utiliser
             vector_db_path: Chemin vers le dossier de la base vectorielle
+            index_type: Type d'index FAISS: 'hnsw' (graphe approximatif, défaut),
+                'ivfpq' (quantifié, pour les gros corpus) ou 'flat' (recherche exacte);
+                par défaut VECTOR_INDEX_TYPE
         """
         self.ml_available = ML_DEPENDENCIES_AVAILABLE
+        self.index_type = (index_type or os.getenv("VECTOR_INDEX_TYPE", "hnsw")).lower()
         self.embedding_model_name = embedding_model
         self.vector_db_path = Path(vector_db_path)
         self.vector_db_path.mkdir(parents=True, exist_ok=True)
@@ -52,6 +75,10 @@ class VectorStore:
         self.embedding_model = None
         self.embedding_dimension = None
         
+        # Cache optionnel des embeddings de chunks (objet exposant encode_many): un contenu
+        # déjà encodé n'est pas réencodé lors d'une reconstruction
+        self.embedding_cache = None
+        
         if self.ml_available:
             self._load_embedding_model()
         else:
@@ -63,6 +90,10 @@ class VectorStore:
         self.chunks = []
         self.metadata = {}
         
+        # Bitmaps (bits par id FAISS) par (clé, valeur) de métadonnée, et combinaisons récentes
+        self._filter_bitmaps: Dict[Tuple[str, str], np.ndarray] = {}
+        self._filter_cache: "OrderedDict[frozenset, Optional[np.ndarray]]" = OrderedDict()
+        
         if self._database_exists() and self.ml_available:
             try:
                 self.load_database()
@@ -90,12 +121,13 @@ class VectorStore:
                 self.chunks_path.exists() and 
                 self.metadata_path.exists())
     
-    def create_embeddings(self, texts: List[str]) -> np.ndarray:
+    def create_embeddings(self, texts: List[str], show_progress_bar: bool = True) -> np.ndarray:
         """
         Crée des embeddings pour une liste de textes
         
         Args:
             texts: Liste des textes à encoder
+            show_progress_bar: Afficher la progression (désactivé pour les requêtes)
             
         Returns:
             Array numpy des embeddings
@@ -106,7 +138,7 @@ class VectorStore:
         try:
             embeddings = self.embedding_model.encode(
                 texts, 
-                show_progress_bar=True,
+                show_progress_bar=show_progress_bar,
                 normalize_embeddings=True,
                 batch_size=32  # Add batch size to avoid memory issues
             )
@@ -138,22 +170,32 @@ class VectorStore:
         # Créer les embeddings
         logger.info("Création des embeddings...")
         try:
-            embeddings = self.create_embeddings(texts)
+            if self.embedding_cache is not None:
+                misses = self.embedding_cache.stats["misses"]
+                embeddings = np.stack(self.embedding_cache.encode_many(texts))
+                logger.info(f"Embeddings: {self.embedding_cache.stats['misses'] - misses} chunk(s) encodé(s), "
+                            f"les autres repris du cache")
+            else:
+                embeddings = self.create_embeddings(texts)
         except Exception as e:
             logger.error(f"Failed to create embeddings: {e}")
             return
         
         # Créer l'index FAISS
-        logger.info("Construction de l'index FAISS...")
+        logger.info(f"Construction de l'index FAISS ({self.index_type})...")
         try:
-            self.index = faiss.IndexFlatIP(self.embedding_dimension)  # Inner Product pour similarité cosine
-            self.index.add(embeddings.astype('float32'))
+            embeddings = np.ascontiguousarray(embeddings, dtype='float32')
+            self.index = self._create_index(self.embedding_dimension, len(embeddings))
+            if not self.index.is_trained:
+                self._train_index(embeddings)
+            self.index.add(embeddings)
         except Exception as e:
             logger.error(f"Failed to create FAISS index: {e}")
             return
         
         # Stocker les chunks
         self.chunks = chunks
+        self._build_filter_bitmaps()
         
         # Créer les métadonnées
         from datetime import datetime
@@ -161,6 +203,7 @@ class VectorStore:
             'total_chunks': len(chunks),
             'embedding_model': self.embedding_model_name,
             'embedding_dimension': self.embedding_dimension,
+            'index_type': self.effective_index_type,
             'sources': list(set(chunk.source for chunk in chunks)),
             'creation_time': datetime.now().isoformat()
         }
@@ -168,6 +211,78 @@ class VectorStore:
         logger.info(f"✅ Index vectoriel créé avec {len(chunks)} chunks")
         logger.info(f"📁 Sources: {', '.join(self.metadata['sources'])}")
     
+    def _create_index(self, dimension: int, n_vectors: int):
+        """
+        Crée un index vide en produit scalaire: les embeddings étant normalisés (L2),
+        le score retourné est directement la similarité cosine
+        """
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(dimension)
+        
+        if self.index_type == "ivfpq":
+            if n_vectors >= IVFPQ_MIN_TRAINING:
+                nlist = int(4 * np.sqrt(n_vectors))
+                # Sous-quantifieurs: ~d/4, qui doit diviser la dimension
+                m = max(1, dimension // 4)
+                while dimension % m:
+                    m -= 1
+                quantizer = faiss.IndexFlatIP(dimension)
+                index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, IVFPQ_NBITS,
+                                         faiss.METRIC_INNER_PRODUCT)
+                index.nprobe = IVFPQ_NPROBE
+                return index
+            logger.info(f"Corpus trop petit pour IVF+PQ ({n_vectors} vecteurs) - index HNSW utilisé")
+        
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+        return index
+    
+    def _train_index(self, embeddings: np.ndarray) -> None:
+        """Entraîne les centroïdes IVF et les codebooks PQ sur un échantillon du corpus"""
+        sample = embeddings
+        if len(embeddings) > IVFPQ_TRAINING_SAMPLE:
+            rng = np.random.default_rng(0)
+            sample = embeddings[rng.choice(len(embeddings), IVFPQ_TRAINING_SAMPLE, replace=False)]
+        logger.info(f"Entraînement de l'index IVF+PQ sur {len(sample)} vecteurs...")
+        self.index.train(sample)
+    
+    @property
+    def effective_index_type(self) -> str:
+        """Type effectif de l'index en mémoire (peut différer de index_type, ex: repli HNSW)"""
+        if self.index is None:
+            return self.index_type
+        if getattr(self.index, 'hnsw', None) is not None:
+            return "hnsw"
+        if faiss.try_extract_index_ivf(self.index) is not None:
+            return "ivfpq"
+        return "flat"
+    
+    def _configure_search(self) -> None:
+        """Applique les paramètres de recherche à un index chargé depuis le disque"""
+        hnsw = getattr(self.index, 'hnsw', None)
+        if hnsw is not None:
+            hnsw.efSearch = max(hnsw.efSearch, HNSW_EF_SEARCH)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            ivf.nprobe = max(ivf.nprobe, IVFPQ_NPROBE)
+    
+    def get_embedding_matrix(self) -> Optional[np.ndarray]:
+        """
+        Matrice contiguë (N x d) des embeddings normalisés du corpus, ligne i = self.chunks[i]
+        (reconstruction approchée depuis les codes PQ pour un index IVF+PQ)
+        """
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            ivf.make_direct_map()
+        matrix = np.ascontiguousarray(self.index.reconstruct_n(0, self.index.ntotal), dtype='float32')
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+    
     def save_database(self) -> None:
         """Sauvegarde la base vectorielle sur disque"""
         if not self.ml_available:
@@ -186,8 +301,9 @@ class VectorStore:
                 pickle.dump(self.chunks, f)
             
             # Sauvegarder les métadonnées
-            with open(self.metadata_path, 'w', encoding='utf-8') as f:
-                json.dump(self.metadata, f, ensure_ascii=False, indent=2)
+            self.metadata_path.write_bytes(
+                orjson.dumps(self.metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+            )
             
             logger.info("✅ Base vectorielle sauvegardée")
             
@@ -207,16 +323,17 @@ class VectorStore:
             # Charger l'index FAISS
             if self.index_path.exists():
                 self.index = faiss.read_index(str(self.index_path))
+                self._configure_search()
             
             # Charger les chunks
             if self.chunks_path.exists():
                 with open(self.chunks_path, 'rb') as f:
                     self.chunks = pickle.load(f)
+                self._build_filter_bitmaps()
             
             # Charger les métadonnées
             if self.metadata_path.exists():
-                with open(self.metadata_path, 'r', encoding='utf-8') as f:
-                    self.metadata = json.load(f)
+                self.metadata = orjson.loads(self.metadata_path.read_bytes())
             
             logger.info(f"✅ Base vectorielle chargée: {len(self.chunks)} chunks")
             if self.metadata.get('sources'):
@@ -249,16 +366,7 @@ class VectorStore:
         try:
             # Créer l'embedding de la requête
             query_embedding = self.create_embeddings([query])
-            
-            # Rechercher dans l'index
-            scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
-            
-            # Filtrer et formater les résultats
-            results = []
-            for score, idx in zip(scores[0], indices[0]):
-                if score >= score_threshold and idx < len(self.chunks):
-                    chunk = self.chunks[idx]
-                    results.append((chunk, float(score)))
+            results = self.search_by_vector(query_embedding, top_k, score_threshold)
             
             logger.info(f"Recherche pour '{query[:50]}...': {len(results)} résultat(s)")
             
@@ -268,12 +376,115 @@ class VectorStore:
             logger.error(f"Erreur lors de la recherche: {e}")
             return []
     
+    def search_by_vector(self, query_embedding: np.ndarray, top_k: int = 5,
+                         score_threshold: float = 0.5,
+                         filters: Optional[Dict[str, Any]] = None) -> List[Tuple[DocumentChunk, float]]:
+        """
+        Recherche à partir d'un embedding de requête déjà calculé (ex: encodé par lot)
+        
+        Args:
+            query_embedding: Embedding normalisé de la requête (1D ou 1 x d)
+            top_k: Nombre de résultats à retourner
+            score_threshold: Score minimum pour les résultats
+            filters: Égalités sur les métadonnées (valeur ou liste de valeurs acceptées)
+            
+        Returns:
+            Liste des chunks trouvés avec leurs scores
+        """
+        if self.index is None or not self.chunks:
+            return []
+        
+        query = np.ascontiguousarray(query_embedding, dtype='float32').reshape(1, -1)
+        pushed = {k: v for k, v in (filters or {}).items() if k in FILTERABLE_METADATA}
+        remaining = {k: v for k, v in (filters or {}).items() if k not in FILTERABLE_METADATA}
+        
+        if pushed:
+            bitmap = self._filter_bitmap(pushed)
+            if bitmap is None:
+                return []
+            # Seuls les ids du bitmap sont visités par FAISS (le bitmap doit vivre pendant la recherche)
+            selector = faiss.IDSelectorBitmap(len(self.chunks), faiss.swig_ptr(bitmap))
+            scores, indices = self.index.search(query, top_k, params=self._search_params(selector))
+        else:
+            scores, indices = self.index.search(query, top_k)
+        scores, indices = scores[0], indices[0]
+        
+        # Filtrage vectorisé: score minimum, ids valides (HNSW renvoie -1 s'il manque des voisins)
+        keep = (scores >= score_threshold) & (indices >= 0) & (indices < len(self.chunks))
+        results = [
+            (self.chunks[idx], score)
+            for idx, score in zip(indices[keep].tolist(), scores[keep].tolist())
+        ]
+        
+        # Clés non indexées: vérification sur les métadonnées des résultats
+        if remaining:
+            results = [
+                (chunk, score) for chunk, score in results
+                if all(_metadata_matches(chunk.metadata.get(k), v) for k, v in remaining.items())
+            ]
+        return results
+    
+    def _build_filter_bitmaps(self) -> None:
+        """Construit un bitmap (1 bit par chunk, ordre FAISS) par valeur de métadonnée filtrable"""
+        masks: Dict[Tuple[str, str], np.ndarray] = {}
+        for position, chunk in enumerate(self.chunks):
+            for key in FILTERABLE_METADATA:
+                value = (chunk.metadata or {}).get(key)
+                if value is None:
+                    continue
+                mask = masks.get((key, str(value)))
+                if mask is None:
+                    mask = masks[(key, str(value))] = np.zeros(len(self.chunks), dtype=bool)
+                mask[position] = True
+        
+        self._filter_bitmaps = {
+            key: np.packbits(mask, bitorder='little') for key, mask in masks.items()
+        }
+        self._filter_cache.clear()
+    
+    def _filter_bitmap(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """ET des bitmaps des filtres (OU entre les valeurs d'une liste); None si aucun chunk"""
+        cache_key = frozenset(
+            (k, tuple(sorted(map(str, v))) if isinstance(v, (list, tuple, set)) else str(v))
+            for k, v in filters.items()
+        )
+        if cache_key in self._filter_cache:
+            self._filter_cache.move_to_end(cache_key)
+            return self._filter_cache[cache_key]
+        
+        result = None
+        empty = np.zeros((len(self.chunks) + 7) // 8, dtype=np.uint8)
+        for key, value in cache_key:
+            values = value if isinstance(value, tuple) else (value,)
+            selected = empty
+            for v in values:
+                selected = selected | self._filter_bitmaps.get((key, v), empty)
+            result = selected if result is None else result & selected
+        
+        if result is not None and not result.any():
+            result = None
+        self._filter_cache[cache_key] = result
+        while len(self._filter_cache) > FILTER_CACHE_SIZE:
+            self._filter_cache.popitem(last=False)
+        return result
+    
+    def _search_params(self, selector):
+        """Paramètres de recherche FAISS portant le sélecteur, selon le type d'index"""
+        hnsw = getattr(self.index, 'hnsw', None)
+        if hnsw is not None:
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=hnsw.efSearch)
+        ivf = faiss.try_extract_index_ivf(self.index)
+        if ivf is not None:
+            return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        return faiss.SearchParameters(sel=selector)
+    
     def get_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques de la base vectorielle"""
         stats = {
             'total_chunks': len(self.chunks),
             'index_size': self.index.ntotal if self.index else 0,
             'embedding_dimension': self.embedding_dimension,
+            'index_type': self.effective_index_type,
             'sources': self.metadata.get('sources', []),
             'database_exists': self._database_exists(),
             'ml_available': self.ml_available
@@ -322,5 +533,14 @@ class VectorStore:
         self.index = None
         self.chunks = []
         self.metadata = {}
+        self._filter_bitmaps = {}
+        self._filter_cache.clear()
         
-        logger.info("✅ Base vectorielle supprimée")
\ No newline at end of file
+        logger.info("✅ Base vectorielle supprimée")
+
+
+def _metadata_matches(actual: Any, expected: Any) -> bool:
+    """Égalité de métadonnée (comparaison textuelle), ou appartenance si liste de valeurs"""
+    if isinstance(expected, (list, tuple, set)):
+        return str(actual) in {str(v) for v in expected}
+    return str(actual) == str(expected)
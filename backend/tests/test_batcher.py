@@ -0,0 +1,111 @@
+"""
+Micro-batchers: une requête lente ne retarde pas les autres, erreurs propagées à leur seul appelant
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from api.batcher import ChatBatcher, EmbeddingBatcher  # noqa: E402
+
+
+async def _process(delay, fail=False):
+    await asyncio.sleep(delay)
+    if fail:
+        raise ValueError("échec")
+    return delay
+
+
+async def _timed_submit(batcher, start, delay, **kwargs):
+    await batcher.submit(delay=delay, **kwargs)
+    return time.perf_counter() - start
+
+
+def test_slow_request_does_not_delay_others():
+    async def scenario():
+        batcher = ChatBatcher(_process, window_ms=20, max_batch=8)
+        start = time.perf_counter()
+        slow = asyncio.create_task(_timed_submit(batcher, start, 1.0))
+        await asyncio.sleep(0.005)
+        # Même fenêtre que la requête lente, puis fenêtres suivantes
+        fast = [asyncio.create_task(_timed_submit(batcher, start, 0.05)) for _ in range(12)]
+        fast_times = await asyncio.gather(*fast)
+        slow_time = await slow
+        await batcher.close()
+        return slow_time, fast_times
+
+    slow_time, fast_times = asyncio.run(scenario())
+    assert max(fast_times) < 0.5
+    assert slow_time >= 1.0
+
+
+def test_concurrency_is_not_capped_by_batch_size():
+    async def scenario():
+        batcher = ChatBatcher(_process, window_ms=5, max_batch=4)
+        start = time.perf_counter()
+        times = await asyncio.gather(*(_timed_submit(batcher, start, 0.3) for _ in range(16)))
+        await batcher.close()
+        return times
+
+    assert max(asyncio.run(scenario())) < 0.6
+
+
+def test_error_reaches_only_its_caller():
+    async def scenario():
+        batcher = ChatBatcher(_process)
+        results = await asyncio.gather(
+            batcher.submit(delay=0.01, fail=True),
+            batcher.submit(delay=0.01),
+            return_exceptions=True
+        )
+        await batcher.close()
+        return results
+
+    failed, ok = asyncio.run(scenario())
+    assert isinstance(failed, ValueError)
+    assert ok == 0.01
+
+
+def test_sync_process_function_runs_in_threadpool():
+    async def scenario():
+        batcher = ChatBatcher(lambda value: value * 2)
+        result = await batcher.submit(value=21)
+        await batcher.close()
+        return result
+
+    assert asyncio.run(scenario()) == 42
+
+
+def test_embedding_batcher_encodes_a_window_in_one_call():
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return [len(text) for text in texts]
+
+    async def scenario():
+        batcher = EmbeddingBatcher(encode, window_ms=20)
+        vectors = await asyncio.gather(*(batcher.submit(text) for text in ("a", "bb", "ccc")))
+        await batcher.close()
+        return vectors
+
+    assert asyncio.run(scenario()) == [1, 2, 3]
+    assert calls == [["a", "bb", "ccc"]]
+
+
+@pytest.mark.parametrize("window_ms", [0, 20])
+def test_close_cancels_pending_requests(window_ms):
+    async def scenario():
+        batcher = ChatBatcher(_process, window_ms=window_ms)
+        pending = asyncio.create_task(batcher.submit(delay=10))
+        await asyncio.sleep(0.05)
+        await batcher.close()
+        # Délai borné: un appelant resté en attente après close ferait échouer le test
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(pending, 1)
+
+    asyncio.run(scenario())
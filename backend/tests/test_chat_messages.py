@@ -0,0 +1,60 @@
+"""
+Construction des messages envoyés à Groq (historique dédupliqué) et trames SSE de /stream
+"""
+import sys
+from pathlib import Path
+
+import orjson
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from api import simple_chat_handler  # noqa: E402
+from api.routes.chat import _sse_frame  # noqa: E402
+
+PARAGRAPH = "Écoles d'ingénieurs publiques: ENSA, ENSAM, EMI, INPT, ENSIAS, EHTP. " * 4
+
+
+def test_repeated_paragraph_is_referenced_and_original_labelled():
+    history = [
+        {"role": "user", "content": "Quelles écoles ?"},
+        {"role": "assistant", "content": f"Voici la liste.\n\n{PARAGRAPH}"},
+        {"role": "assistant", "content": f"Rappel:\n\n{PARAGRAPH}"},
+    ]
+    deduped = simple_chat_handler._dedupe_blocks(history)
+
+    original = deduped[1]["content"].split("\n\n")[1]
+    copy = deduped[2]["content"].split("\n\n")[1]
+    assert copy.startswith("[ref:") and copy.endswith("]")
+    assert original == f"{copy} {PARAGRAPH}"
+    assert deduped[0] is history[0]
+
+
+def test_history_without_repeats_is_unchanged():
+    history = [{"role": "assistant", "content": PARAGRAPH}, {"role": "user", "content": "Merci"}]
+    assert simple_chat_handler._dedupe_blocks(history) == history
+
+
+def test_markers_only_point_to_paragraphs_kept_after_trimming(monkeypatch):
+    paragraph = PARAGRAPH.strip()
+    history = [
+        {"role": "assistant", "content": paragraph},
+        {"role": "user", "content": "Et ensuite ?"},
+        {"role": "assistant", "content": f"Rappel:\n\n{paragraph}"},
+        {"role": "assistant", "content": paragraph},
+    ]
+    # Budget couvrant les deux derniers tours seulement: le premier original est coupé
+    budget = sum(simple_chat_handler.estimate_tokens(turn["content"]) for turn in history[2:])
+    monkeypatch.setattr(simple_chat_handler, "HISTORY_TOKEN_BUDGET", budget)
+
+    messages = simple_chat_handler.SimpleChatHandler()._build_messages("Question", history)
+    sent = [m["content"] for m in messages[1:-1]]
+    assert len(sent) == 2
+    marker = sent[1]
+    assert sent[0] == f"Rappel:\n\n{marker} {paragraph}"
+
+
+def test_sse_frame():
+    frame = _sse_frame(b"done", {"done": True, "session_id": "abc"})
+    assert frame.startswith(b"event: done\r\ndata: ")
+    assert frame.endswith(b"\r\n\r\n")
+    assert orjson.loads(frame[len(b"event: done\r\ndata: "):-4]) == {"done": True, "session_id": "abc"}
@@ -0,0 +1,96 @@
+"""
+Recherche par mots-clés: l'index inversé CSR donne les mêmes scores que le calcul par dictionnaires
+"""
+import math
+import sys
+import types
+from collections import Counter, defaultdict
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from rag.hybrid_search import HybridSearchEngine  # noqa: E402
+from rag.pdf_processor import DocumentChunk  # noqa: E402
+
+TEXTS = [
+    "L'ENSA de Marrakech recrute après le bac sciences maths avec un seuil de 14/20.",
+    "Le concours de l'ENSAM est ouvert aux bacheliers sciences maths et sciences physiques.",
+    "Les classes préparatoires CPGE préparent aux concours des grandes écoles d'ingénieurs.",
+    "La faculté de médecine de Rabat sélectionne sur dossier puis concours écrit.",
+    "L'ENCG propose un cursus en commerce et gestion, accessible avec un seuil de 12/20.",
+    "Ingénieurs, médecins, commerciaux: chaque filière a ses concours et ses seuils.",
+    "Rabat, Casablanca et Marrakech accueillent la plupart des écoles d'ingénieurs publiques.",
+]
+
+QUERIES = [
+    "concours ENSA sciences maths",
+    "seuil 14/20 Marrakech",
+    "médecine Rabat concours concours",
+    "écoles d'ingénieurs publiques",
+    "informatique quantique",
+]
+
+
+def _reference_keyword_search(engine, chunks, query, top_k):
+    """Calcul de référence: index par ensembles et TF-IDF par (document, terme), comme avant le CSR"""
+    doc_count = len(chunks)
+    word_doc_count = defaultdict(int)
+    for chunk in chunks:
+        for word in set(engine._extract_keywords(chunk.content)):
+            word_doc_count[word] += 1
+
+    keyword_index = defaultdict(set)
+    tf_idf = {}
+    for i, chunk in enumerate(chunks):
+        words = engine._extract_keywords(chunk.content)
+        for word, count in Counter(words).items():
+            tf_idf[(i, word)] = count / len(words) * math.log(doc_count / (word_doc_count[word] + 1))
+            keyword_index[word].add(i)
+
+    query_keywords = engine._extract_keywords(query)
+    doc_scores = defaultdict(float)
+    matched = defaultdict(list)
+    for keyword in query_keywords:
+        for doc_idx in keyword_index.get(keyword, ()):
+            doc_scores[doc_idx] += tf_idf[(doc_idx, keyword)]
+            matched[doc_idx].append(keyword)
+
+    ranked = sorted(doc_scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return {
+        chunks[doc_idx].chunk_id: (score / len(query_keywords), matched[doc_idx])
+        for doc_idx, score in ranked
+    }
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    chunks = [
+        DocumentChunk(content=text, source="guide.pdf", page_number=i, chunk_id=f"c{i}", metadata={})
+        for i, text in enumerate(TEXTS)
+    ]
+    engine = HybridSearchEngine(types.SimpleNamespace(chunks=chunks))
+    engine.build_keyword_index(chunks)
+    return engine, chunks
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_csr_scores_match_dict_reference(corpus, query):
+    engine, chunks = corpus
+    expected = _reference_keyword_search(engine, chunks, query, top_k=len(chunks))
+    results = engine.keyword_search(query, top_k=len(chunks))
+
+    actual = {r.chunk.chunk_id: (r.keyword_score, r.matched_keywords) for r in results}
+    assert actual.keys() == expected.keys()
+    for chunk_id, (score, matched) in expected.items():
+        assert actual[chunk_id][0] == pytest.approx(score, rel=1e-12)
+        assert actual[chunk_id][1] == matched
+    scores = [r.keyword_score for r in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_top_k_and_unknown_terms(corpus):
+    engine, _ = corpus
+    assert len(engine.keyword_search("concours sciences", top_k=2)) == 2
+    assert engine.keyword_search("informatique quantique") == []
@@ -0,0 +1,108 @@
+"""
+Cache des réponses: portée des clés (modèle, température, max_tokens) et réponses tronquées
+"""
+import sys
+import types
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from api import simple_chat_handler  # noqa: E402
+from core.response_cache import PersistentResponseCache, ResponseCache, build_state_key  # noqa: E402
+
+QUESTION = "Quelles écoles d'ingénieurs au Maroc ?"
+
+
+def _messages(question=QUESTION):
+    return [{"role": "system", "content": "Conseillère"}, {"role": "user", "content": question}]
+
+
+def test_exact_tier_is_scoped():
+    cache = ResponseCache()
+    cache.set(_messages(), "réponse A", scope="model-a")
+
+    assert cache.get(_messages(), scope="model-a") == "réponse A"
+    assert cache.get(_messages(), scope="model-b") is None
+    assert cache.get(_messages()) is None
+
+
+def test_semantic_tier_is_scoped():
+    # Toutes les questions ont le même embedding: seule la portée peut les séparer
+    cache = ResponseCache(embed_fn=lambda text: np.ones(8, dtype=np.float32))
+    cache.set(_messages(), "réponse A", scope="model-a")
+
+    other_question = _messages("Quelles écoles d'ingénieur au Maroc ?")
+    assert cache.get(other_question, scope="model-a") == "réponse A"
+    assert cache.get(other_question, scope="model-b") is None
+
+
+@pytest.mark.parametrize("change", [
+    {"model": "llama-3.1-8b-instant"},
+    {"temperature": 0.2},
+    {"max_tokens": 256},
+])
+def test_state_key_depends_on_generation_parameters(change):
+    params = {"profile": None, "temperature": 0.7, "model": "llama-3.3-70b-versatile", "max_tokens": 1024}
+    assert build_state_key(_messages(), **params) == build_state_key(_messages(), **params)
+    assert build_state_key(_messages(), **params) != build_state_key(_messages(), **{**params, **change})
+
+
+class _FakeCompletions:
+    """Complétions Groq simulées: réponse et finish_reason dépendant des paramètres reçus"""
+
+    def __init__(self):
+        self.calls = []
+        self.finish_reason = "stop"
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        text = f"{kwargs['model']}/{kwargs['temperature']}/{kwargs['max_tokens']}"
+        choice = types.SimpleNamespace(
+            message=types.SimpleNamespace(content=text),
+            finish_reason=self.finish_reason
+        )
+        return types.SimpleNamespace(choices=[choice])
+
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = simple_chat_handler.SimpleChatHandler()
+    completions = _FakeCompletions()
+    # client est une cached_property: on fixe l'instance, Groq n'est jamais appelé
+    handler.__dict__["client"] = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    handler.async_client = object()  # lookup_cached ne consulte le cache qu'avec un client configuré
+    handler.cache_enabled = True
+    handler.response_cache = ResponseCache()
+    handler.persistent_cache = PersistentResponseCache(directory=str(tmp_path))
+    handler.completions = completions
+    return handler
+
+
+def test_handler_cache_is_scoped_by_generation_parameters(handler):
+    first = handler.process_message(QUESTION, [], 0.7, "s", model="a")
+    again = handler.process_message(QUESTION, [], 0.7, "s", model="a")
+    assert again["stats"].get("cache_hit") and again["response"] == first["response"]
+
+    for kwargs in ({"model": "b"}, {"model": "a", "temperature": 0.3}, {"model": "a", "max_tokens": 64}):
+        result = handler.process_message(QUESTION, [], kwargs.pop("temperature", 0.7), "s", **kwargs)
+        assert not result["stats"].get("cache_hit")
+    assert len(handler.completions.calls) == 4
+
+
+def test_handler_persistent_hit_is_promoted_under_its_scope(handler):
+    first = handler.process_message(QUESTION, [], 0.7, "s", model="a")
+    handler.response_cache = ResponseCache()
+
+    assert handler.process_message(QUESTION, [], 0.7, "s", model="a")["stats"].get("cache_hit")
+    assert handler.lookup_cached(QUESTION, [], 0.7, "s", model="a")["response"] == first["response"]
+    assert handler.lookup_cached(QUESTION, [], 0.7, "s", model="b") is None
+
+
+def test_handler_does_not_cache_truncated_answers(handler):
+    handler.completions.finish_reason = "length"
+    handler.process_message(QUESTION, [], 0.7, "s", model="a")
+    handler.process_message(QUESTION, [], 0.7, "s", model="a")
+    assert len(handler.completions.calls) == 2
@@ -0,0 +1,63 @@
+"""
+Garde-fou de la table de routage: aucune route (chemin + méthode) enregistrée deux fois
+"""
+import sys
+from collections import Counter
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from api.main import app  # noqa: E402
+from api.models import ChatRequest  # noqa: E402
+from api.routes import chat, profile, search, system  # noqa: E402
+from core.config import SPEED_MAP  # noqa: E402
+
+
+def _route_keys(routes):
+    """(chemin, méthode) de chaque route HTTP, routeurs inclus dépliés"""
+    keys = []
+    for route in routes:
+        if hasattr(route, "effective_route_contexts"):
+            # FastAPI récent: un routeur inclus reste un seul objet dans app.routes
+            keys.extend(
+                (context.path, method)
+                for context in route.effective_route_contexts()
+                for method in sorted(context.methods or ())
+            )
+        else:
+            keys.extend((route.path, method) for method in sorted(getattr(route, "methods", None) or ()))
+    return keys
+
+
+def _duplicates(routes):
+    return [key for key, count in Counter(_route_keys(routes)).items() if count > 1]
+
+
+@pytest.mark.parametrize("module", [chat, profile, search, system], ids=lambda m: m.__name__)
+def test_router_routes_are_unique(module):
+    keys = _route_keys(module.router.routes)
+    assert len(set(keys)) == len(keys)
+
+
+def test_app_routes_are_unique():
+    assert _duplicates(app.routes) == []
+
+
+def test_openai_compatibility_routes_are_mounted():
+    paths = set(app.openapi()["paths"])
+    assert {"/v1/models", "/v1/health", "/v1/stats", "/v1/config"} <= paths
+
+
+def test_reported_models_are_the_ones_chat_routes_use():
+    client = TestClient(app)
+    listed = [model["id"] for model in client.get("/v1/models").json()["data"]]
+    config = client.get("/api/system/config").json()["config"]
+
+    for message in ("Bonjour", "Je suis perdu " * 30):
+        assert chat.select_model(ChatRequest(message=message)) in listed
+    assert set(listed) == set(SPEED_MAP.values())
+    assert listed[0] == config["groq_model"] == SPEED_MAP["balanced"]
+    assert config["model_tiers"] == SPEED_MAP
@@ -0,0 +1,72 @@
+"""
+Mémoire des sessions: aller-retour complet via le disque, partagé entre instances (workers)
+"""
+import sys
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from core.session_memory import SessionMemory  # noqa: E402
+
+
+def test_round_trip_across_instances(tmp_path):
+    writer = SessionMemory(directory=str(tmp_path), window_messages=4)
+    reader = SessionMemory(directory=str(tmp_path), window_messages=4)
+
+    for i in range(3):
+        writer.record_turn("s1", f"question {i}", f"réponse {i}")
+
+    # Fenêtre de 4 dépassée (6 messages): on n'en garde que la moitié, le reste part en L3
+    history = reader.get("s1")
+    assert [m["content"] for m in history["messages"]] == ["question 2", "réponse 2"]
+    assert history["archived_messages"] == 4
+    assert [m["content"] for m in reader.expand("s1")] == ["question 0", "réponse 0", "question 1", "réponse 1"]
+    assert [m["content"] for m in reader.expand("s1", start=1, count=1)] == ["réponse 0"]
+
+    # Une écriture d'une autre instance est visible immédiatement (pas de copie L1 périmée)
+    reader.append("s1", "user", "question 3")
+    assert writer.get("s1")["messages"][-1]["content"] == "question 3"
+
+    writer.clear("s1")
+    assert reader.get("s1") is None
+    assert reader.expand("s1") == []
+
+
+def test_budget_tokens_keeps_most_recent_messages(tmp_path):
+    memory = SessionMemory(directory=str(tmp_path))
+    memory.record_turn("s1", "a" * 40, "b" * 40)
+
+    history = memory.get("s1", budget_tokens=11)
+    assert [m["content"] for m in history["messages"]] == ["b" * 40]
+    assert history["archived_messages"] == 1
+
+
+def test_concurrent_writers_do_not_lose_turns(tmp_path):
+    def work(worker):
+        memory = SessionMemory(directory=str(tmp_path), window_messages=10)
+        for i in range(20):
+            memory.record_turn("shared", f"q{worker}-{i}", f"r{worker}-{i}")
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    memory = SessionMemory(directory=str(tmp_path), window_messages=10)
+    messages = memory.expand("shared") + memory.get("shared")["messages"]
+    assert len(messages) == 160
+    # Chaque échange reste contigu: question puis réponse du même tour
+    for question, answer in zip(messages[::2], messages[1::2]):
+        assert (question["role"], answer["role"]) == ("user", "assistant")
+        assert question["content"][1:] == answer["content"][1:]
+
+
+def test_memory_only_mode():
+    memory = SessionMemory()
+    memory.record_turn("s1", "question", "réponse")
+    assert len(memory.get("s1")["messages"]) == 2
+    assert memory.expand("s1") == []
+    memory.clear("s1")
+    assert memory.get("s1") is None
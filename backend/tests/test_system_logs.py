@@ -0,0 +1,57 @@
+"""
+/api/system/logs: ordre chronologique des entrées, filtres et erreurs de lecture
+"""
+import sys
+from pathlib import Path
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from api.routes import system  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(system.router, prefix="/api/system")
+    return TestClient(app)
+
+
+def _entries(response):
+    return [orjson.loads(line) for line in response.content.splitlines()]
+
+
+def test_mock_logs_keep_oldest_first_order(client, monkeypatch):
+    monkeypatch.delenv("LOG_FILE", raising=False)
+    response = client.get("/api/system/logs", params={"level": "ALL", "lines": 2})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert _entries(response) == list(system._MOCK_LOGS[-2:])
+
+
+@pytest.mark.parametrize("backwards", [True, False], ids=["file_read_backwards", "deque"])
+def test_log_file_tail_is_filtered_and_chronological(client, monkeypatch, tmp_path, backwards):
+    if not backwards:
+        monkeypatch.setattr(system, "FileReadBackwards", None)
+    log_file = tmp_path / "api.log"
+    log_file.write_text("".join(
+        f"2024-01-01 10:00:0{i}\t{'ERROR' if i % 2 else 'INFO'}\tapi.routes\tmessage {i}\n"
+        for i in range(6)
+    ) + "Traceback (suite sans tabulations)\n", encoding="utf-8")
+    monkeypatch.setenv("LOG_FILE", str(log_file))
+
+    response = client.get("/api/system/logs", params={"level": "INFO", "lines": 2})
+    assert [entry["message"] for entry in _entries(response)] == ["message 2", "message 4"]
+    assert {entry["component"] for entry in _entries(response)} == {"api"}
+
+
+def test_unreadable_log_file_returns_500(client, monkeypatch, tmp_path):
+    # Un dossier existe mais ne peut pas être lu comme un fichier
+    monkeypatch.setenv("LOG_FILE", str(tmp_path))
+    response = client.get("/api/system/logs")
+    assert response.status_code == 500
@@ -0,0 +1,114 @@
+"""
+Recherche vectorielle filtrée: les filtres de métadonnées appliqués dans FAISS (bitmaps)
+"""
+import hashlib
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from rag import vector_store  # noqa: E402
+from rag.pdf_processor import DocumentChunk  # noqa: E402
+
+pytestmark = pytest.mark.skipif(
+    not vector_store.ML_DEPENDENCIES_AVAILABLE,
+    reason="sentence-transformers et faiss-cpu requis"
+)
+
+DIMENSION = 16
+VILLES = ["Rabat", "Casablanca", "Marrakech"]
+
+
+class _HashEncoder:
+    """Encodeur déterministe à la place du modèle (pas de téléchargement): un vecteur par texte"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def get_sentence_embedding_dimension(self):
+        return DIMENSION
+
+    def encode(self, texts, normalize_embeddings=True, **kwargs):
+        vectors = np.stack([
+            np.random.default_rng(int.from_bytes(hashlib.md5(t.encode()).digest()[:8], "little")).normal(size=DIMENSION)
+            for t in texts
+        ]).astype(np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture(params=["flat", "hnsw"])
+def store(request, tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "SentenceTransformer", _HashEncoder)
+    store = vector_store.VectorStore(vector_db_path=str(tmp_path), index_type=request.param)
+    chunks = [
+        DocumentChunk(
+            content=f"Document {i} sur les écoles de {VILLES[i % 3]}",
+            source=f"guide{i % 2}.pdf",
+            page_number=i,
+            chunk_id=f"c{i}",
+            metadata={"ville": VILLES[i % 3], "niveau": "bac" if i % 2 else "licence", "langue": "fr"}
+        )
+        for i in range(30)
+    ]
+    store.build_index(chunks)
+    return store
+
+
+def _query(store, text="écoles d'ingénieurs"):
+    return store.create_embeddings([text], show_progress_bar=False)
+
+
+def test_filter_returns_only_matching_chunks(store):
+    results = store.search_by_vector(_query(store), top_k=30, score_threshold=-1.0, filters={"ville": "Rabat"})
+    assert len(results) == 10
+    assert {chunk.metadata["ville"] for chunk, _ in results} == {"Rabat"}
+
+
+def test_filters_combine_and_accept_value_lists(store):
+    results = store.search_by_vector(
+        _query(store), top_k=30, score_threshold=-1.0,
+        filters={"ville": ["Rabat", "Marrakech"], "niveau": "bac"}
+    )
+    assert results
+    assert all(chunk.metadata["ville"] in ("Rabat", "Marrakech") for chunk, _ in results)
+    assert all(chunk.metadata["niveau"] == "bac" for chunk, _ in results)
+    assert len(results) == sum(1 for i in range(30) if i % 3 != 1 and i % 2)
+
+
+def test_filter_without_match_returns_empty_list(store):
+    assert store.search_by_vector(_query(store), top_k=5, score_threshold=-1.0, filters={"ville": "Agadir"}) == []
+    assert store.search_by_vector(
+        _query(store), top_k=5, score_threshold=-1.0, filters={"ville": "Rabat", "niveau": "master"}
+    ) == []
+
+
+def test_non_indexed_keys_are_post_filtered(store):
+    results = store.search_by_vector(_query(store), top_k=5, score_threshold=-1.0, filters={"langue": "en"})
+    assert results == []
+    results = store.search_by_vector(_query(store), top_k=5, score_threshold=-1.0, filters={"langue": "fr"})
+    assert len(results) == 5
+
+
+def test_unfiltered_search_finds_exact_document(store):
+    chunk, score = store.search_by_vector(_query(store, store.chunks[7].content), top_k=1, score_threshold=0.5)[0]
+    assert chunk.chunk_id == "c7"
+    assert score == pytest.approx(1.0, abs=1e-4)
+
+
+def test_effective_index_type(store):
+    assert store.effective_index_type == store.index_type
+    assert store.get_stats()["index_type"] == store.index_type
+
+
+def test_ivfpq_falls_back_to_hnsw_on_small_corpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(vector_store, "SentenceTransformer", _HashEncoder)
+    store = vector_store.VectorStore(vector_db_path=str(tmp_path), index_type="ivfpq")
+    assert store.effective_index_type == "ivfpq"
+    store.build_index([
+        DocumentChunk(content=f"Document {i}", source="guide.pdf", page_number=i, chunk_id=f"c{i}", metadata={})
+        for i in range(10)
+    ])
+    assert store.effective_index_type == "hnsw"
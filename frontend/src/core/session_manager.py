@@ -2,27 +2,53 @@
 Session state management for the OrientaBot application
 """
 import streamlit as st
+from collections import deque
+from itertools import islice
+from uuid import uuid4
 from backend.src.core.config import DEFAULT_TEMPERATURE
 
+# Messages kept in the session (display scrollback) and sent to the API as context
+MAX_SESSION_MESSAGES = 40
+MAX_HISTORY_MESSAGES = 20
+
 class SessionManager:
     @staticmethod
     def initialize_session():
         """Initialize session state variables"""
         if "messages" not in st.session_state:
-            st.session_state.messages = []
+            st.session_state.messages = deque(maxlen=MAX_SESSION_MESSAGES)
         if "temperature" not in st.session_state:
             st.session_state.temperature = DEFAULT_TEMPERATURE
     
     @staticmethod
     def clear_chat():
         """Clear chat history"""
-        st.session_state.messages = []
+        st.session_state.messages = deque(maxlen=MAX_SESSION_MESSAGES)
         st.rerun()
     
+    @staticmethod
+    def add_message(role, content):
+        """Append a message with a stable id so each turn can be identified across reruns"""
+        message = {"id": uuid4().hex, "role": role, "content": content}
+        st.session_state.messages.append(message)
+        return message
+    
     @staticmethod
     def get_messages():
-        """Get chat messages from session state"""
-        return st.session_state.messages
+        """Get chat messages from session state (as a list: the stored deque does not support slicing)"""
+        return list(st.session_state.messages)
+    
+    @staticmethod
+    def get_history_for_api(max_messages=MAX_HISTORY_MESSAGES):
+        """
+        Last messages to send as conversation context, oldest first,
+        excluding the user message that was just appended
+        """
+        messages = st.session_state.messages
+        recent = islice(reversed(messages), 1, max_messages + 1)
+        history = [{"role": msg["role"], "content": msg["content"]} for msg in recent]
+        history.reverse()
+        return history
     
     @staticmethod
     def get_temperature():
@@ -68,7 +68,7 @@ def process_user_message(prompt: str):
         prompt: Message de l'utilisateur
     """
     # Ajouter le message utilisateur à l'historique
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    SessionManager.add_message("user", prompt)
     
     with st.chat_message("user"):
         st.markdown(prompt)
@@ -80,10 +80,7 @@ def process_user_message(prompt: str):
             api_client = get_api_client()
             
             # Préparer l'historique de conversation pour l'API
-            conversation_history = [
-                {"role": msg["role"], "content": msg["content"]} 
-                for msg in st.session_state.messages[:-1]  # Exclure le dernier message (déjà ajouté)
-            ]
+            conversation_history = SessionManager.get_history_for_api()
             
             # Afficher un indicateur de chargement
             with st.spinner("💭 Réflexion en cours..."):
@@ -100,11 +97,11 @@ def process_user_message(prompt: str):
                 st.error(f"❌ Erreur: {response.error}")
                 error_response = "Désolé, une erreur s'est produite. Veuillez réessayer."
                 st.markdown(error_response)
-                st.session_state.messages.append({"role": "assistant", "content": error_response})
+                SessionManager.add_message("assistant", error_response)
             else:
                 # Afficher la réponse
                 st.markdown(response.response)
-                st.session_state.messages.append({"role": "assistant", "content": response.response})
+                SessionManager.add_message("assistant", response.response)
                 
                 # Afficher les recommandations si disponibles
                 if response.recommendations:
@@ -131,7 +128,7 @@ def process_user_message(prompt: str):
             st.error(f"❌ Erreur de communication: {str(e)}")
             error_response = "Impossible de communiquer avec le serveur. Veuillez vérifier votre connexion."
             st.markdown(error_response)
-            st.session_state.messages.append({"role": "assistant", "content": error_response})
+            SessionManager.add_message("assistant", error_response)
 
 def process_user_message_streaming(prompt: str):
     """
@@ -141,7 +138,7 @@ def process_user_message_streaming(prompt: str):
         prompt: Message de l'utilisateur
     """
     # Ajouter le message utilisateur à l'historique
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    SessionManager.add_message("user", prompt)
     
     with st.chat_message("user"):
         st.markdown(prompt)
@@ -153,10 +150,7 @@ def process_user_message_streaming(prompt: str):
             api_client = get_api_client()
             
             # Préparer l'historique de conversation pour l'API
-            conversation_history = [
-                {"role": msg["role"], "content": msg["content"]} 
-                for msg in st.session_state.messages[:-1]  # Exclure le dernier message (déjà ajouté)
-            ]
+            conversation_history = SessionManager.get_history_for_api()
             
             # Placeholder pour la réponse streaming
             response_placeholder = st.empty()
@@ -174,14 +168,14 @@ def process_user_message_streaming(prompt: str):
             
             # Finaliser l'affichage
             response_placeholder.markdown(full_response)
-            st.session_state.messages.append({"role": "assistant", "content": full_response})
+            SessionManager.add_message("assistant", full_response)
             
         except Exception as e:
             logger.error(f"Erreur lors du streaming: {e}")
             st.error(f"❌ Erreur de streaming: {str(e)}")
             error_response = "Erreur lors du streaming. Mode standard activé."
             st.markdown(error_response)
-            st.session_state.messages.append({"role": "assistant", "content": error_response})
+            SessionManager.add_message("assistant", error_response)
 
 def render_debug_panel():
     """Affiche le panneau de debug si activé"""
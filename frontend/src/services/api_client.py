@@ -280,11 +280,15 @@ class OrientaBotAPIClient:
             logger.error(f"Erreur lors de la récupération des stats: {e}")
             return {"error": str(e)}
 
-# Instance globale pour Streamlit
-@st.cache_resource
+# Instance globale pour Streamlit, partagée entre reruns et sessions
+@st.cache_resource(show_spinner=False)
+def _create_api_client(base_url: str) -> OrientaBotAPIClient:
+    """Crée le client API (une instance, et un pool de connexions, par URL de backend)"""
+    return OrientaBotAPIClient(base_url=base_url)
+
 def get_api_client() -> OrientaBotAPIClient:
-    """Retourne l'instance du client API (mise en cache)"""
-    return OrientaBotAPIClient()
+    """Retourne l'instance du client API (mise en cache, recréée si BACKEND_API_URL change)"""
+    return _create_api_client(os.getenv("BACKEND_API_URL", "http://localhost:8000"))
 
 def test_api_connection() -> bool:
     """Teste la connexion à l'API"""
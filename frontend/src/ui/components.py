@@ -28,20 +28,25 @@ def render_info_box():
     """Render the information box"""
     st.markdown(get_info_box_html(), unsafe_allow_html=True)
 
+@st.fragment
+def render_temperature_slider():
+    """Temperature slider, rerun as a fragment so moving it does not re-render the chat"""
+    temperature = st.slider(
+        "Créativité des réponses", 
+        min_value=0.0, 
+        max_value=1.0, 
+        value=SessionManager.get_temperature(), 
+        step=0.1,
+        help="Plus élevé = plus créatif, plus bas = plus factuel"
+    )
+    SessionManager.set_temperature(temperature)
+
 def render_sidebar():
     """Render the sidebar with settings"""
     with st.sidebar:
         st.header("⚙️ Paramètres")
         
-        temperature = st.slider(
-            "Créativité des réponses", 
-            min_value=0.0, 
-            max_value=1.0, 
-            value=SessionManager.get_temperature(), 
-            step=0.1,
-            help="Plus élevé = plus créatif, plus bas = plus factuel"
-        )
-        SessionManager.set_temperature(temperature)
+        render_temperature_slider()
         
         st.markdown("---")
         
@@ -56,6 +61,11 @@ def render_footer():
     """Render the footer"""
     st.markdown(get_footer_html(), unsafe_allow_html=True)
 
+@st.cache_data(show_spinner=False)
+def _cached_custom_css() -> str:
+    """Custom CSS built once per process instead of on every rerun"""
+    return get_custom_css()
+
 def apply_custom_styles():
     """Apply custom CSS styles"""
-    st.markdown(get_custom_css(), unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(_cached_custom_css(), unsafe_allow_html=True)
\ No newline at end of file
@@ -8,6 +8,7 @@ from typing import Optional, Dict, Any
 
 # Import des modules de base
 from .styles import get_custom_css, get_info_box_html, get_footer_html
+from .components import render_temperature_slider
 from backend.src.chat.prompts import get_tips_sidebar
 from core.session_manager import SessionManager
 
@@ -22,16 +23,8 @@ def render_enhanced_sidebar():
         st.markdown("### ⚙️ Paramètres Avancés")
         st.caption("🚀 Version Enrichie Activée")
         
-        # Paramètres existants
-        temperature = st.slider(
-            "Créativité des réponses", 
-            min_value=0.0, 
-            max_value=1.0, 
-            value=SessionManager.get_temperature(), 
-            step=0.1,
-            help="Plus élevé = plus créatif, plus bas = plus factuel"
-        )
-        SessionManager.set_temperature(temperature)
+        # Paramètres existants (fragment: pas de rerun complet de la page)
+        render_temperature_slider()
         
         st.markdown("---")
         
@@ -231,7 +224,8 @@ def render_conversation_insights():
         last_message = st.session_state.messages[-1]['content']
         
         # Profils détectés
-        profiles = detect_user_profiles(last_message, st.session_state.messages)
+        # messages est une deque bornée: detect_user_profiles attend une liste (découpage [-3:])
+        profiles = detect_user_profiles(last_message, list(st.session_state.messages))
         if profiles:
             st.markdown(f"**Profils:** {', '.join(profiles)}")
         
@@ -401,10 +395,11 @@ def get_enhanced_css():
     </style>
     """
 
+@st.cache_data(show_spinner=False)
+def get_all_css() -> str:
+    """CSS de base + CSS enrichi, construit une seule fois par processus"""
+    return get_custom_css() + get_enhanced_css()
+
 def apply_enhanced_styles():
     """Applique tous les styles enrichis"""
-    from .styles import get_custom_css
-    
-    # CSS de base + CSS enrichi
-    all_css = get_custom_css() + get_enhanced_css()
-    st.markdown(all_css, unsafe_allow_html=True)
\ No newline at end of file
+    st.markdown(get_all_css(), unsafe_allow_html=True)
\ No newline at end of file